@@ -0,0 +1,311 @@
+"""
+SQLite mirror of the feedback, KB and content-gap CSVs for the dashboard.
+
+The CSVs stay the source of truth; sync() copies what changed into
+data/analytics.db. Append-only files (feedback.csv, knowledge_base.csv) are
+read from the byte offset reached last time, so a sync after a few new rows
+costs a few rows however large the file is. content_gaps.csv is rewritten on
+every gap and holds one row per gap group, so it is reloaded whole when it
+changes. Queries push date filtering, aggregation and pagination into SQL,
+and iter_csv streams an export in batches instead of building it in memory.
+
+    python analytics_store.py --sync
+    python analytics_store.py --rebuild
+"""
+import os
+import io
+import csv
+import json
+import sqlite3
+import hashlib
+import argparse
+
+BASE_DIR = os.path.dirname(__file__)
+DATA_DIR = os.environ.get("TICKET_DATA_DIR", os.path.join(BASE_DIR, "data"))
+DB_PATH = os.path.join(DATA_DIR, "analytics.db")
+
+# table -> (csv file, columns (name, SQL type), how the file changes)
+TABLES = {
+    'feedback': ("feedback.csv", [('timestamp', 'TEXT'), ('original_text', 'TEXT'), ('final_category', 'TEXT'),
+                                  ('final_tags', 'TEXT'), ('final_priority', 'TEXT'), ('agent_note', 'TEXT')],
+                 'append'),
+    'kb': ("knowledge_base.csv", [('article_id', 'TEXT'), ('title', 'TEXT'), ('content', 'TEXT'), ('link', 'TEXT')],
+           'append'),
+    # same columns as content_gaps.COLUMNS (not imported: it pulls in scikit-learn)
+    'gaps': ("content_gaps.csv", [('gap_id', 'INTEGER'), ('first_seen', 'TEXT'), ('timestamp', 'TEXT'),
+                                  ('count', 'INTEGER'), ('ticket_excerpt', 'TEXT'), ('latest_excerpt', 'TEXT')],
+             'replace'),
+}
+# Tables with a timestamp column get a derived 'day' (YYYY-MM-DD) for date filters
+DATED = ('feedback', 'gaps')
+# Default page order
+ORDER = {'feedback': "rowid DESC", 'kb': "rowid", 'gaps': "count DESC, timestamp DESC"}
+GROUPABLE = {'feedback': ('final_category', 'final_priority'), 'gaps': (), 'kb': ()}
+
+READ_BLOCK = 8 * 1024 * 1024
+EXPORT_BATCH = 5000
+HEAD_BYTES = 4096
+
+
+def _connect():
+    os.makedirs(DATA_DIR, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sources (
+            name TEXT PRIMARY KEY,
+            offset INTEGER NOT NULL,
+            mtime_ns INTEGER,
+            head TEXT,
+            fieldnames TEXT
+        )""")
+    for table, (_, columns, _) in TABLES.items():
+        cols = ", ".join(f'"{c}" {t}' for c, t in columns)
+        if table in DATED:
+            cols += ", day TEXT"
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({cols})")
+    conn.execute("CREATE TABLE IF NOT EXISTS feedback_tags (day TEXT, tag TEXT)")
+    for table in TABLES:
+        _indexes(conn, table)
+    return conn
+
+
+def _indexes(conn, table, drop=False):
+    """Create (or drop, around a full reload) the table's indexes."""
+    names = {}
+    if table in DATED:
+        names[f"{table}_day"] = (table, "day")
+    # covering indexes: per-category counts over a date range never touch the rows
+    for col in GROUPABLE[table]:
+        names[f"{table}_day_{col}"] = (table, f"day, {col}")
+    if table == 'feedback':
+        names["feedback_tags_day"] = ("feedback_tags", "day, tag")
+    for name, (on, cols) in names.items():
+        if drop:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+        else:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {on}({cols})")
+
+
+# ------------------ ingest ------------------ #
+
+def _complete(data):
+    """Length of the leading whole CSV records in data (a newline inside quotes does not end a record)."""
+    end, quotes, pos = 0, 0, 0
+    while True:
+        nl = data.find(b"\n", pos)
+        if nl < 0:
+            return end
+        quotes += data.count(b'"', pos, nl)
+        pos = nl + 1
+        if quotes % 2 == 0:
+            end = pos
+
+
+def _names(cols):
+    return ", ".join(f'"{c}"' for c in cols)
+
+
+def _head(path, n):
+    """Hash of the first n (at most HEAD_BYTES) bytes, to notice a rewritten file."""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read(min(n, HEAD_BYTES))).hexdigest()
+
+
+def _rows(table, fieldnames, records):
+    columns = [c for c, _ in TABLES[table][1]]
+    for values in records:
+        rec = dict(zip(fieldnames, values))
+        row = [rec.get(c, '') for c in columns]
+        if table in DATED:
+            row.append((rec.get('timestamp') or '')[:10])
+        yield row
+
+
+def _insert(conn, table, fieldnames, records):
+    columns = [c for c, _ in TABLES[table][1]] + (['day'] if table in DATED else [])
+    marks = ", ".join("?" * len(columns))
+    rows = list(_rows(table, fieldnames, records))
+    conn.executemany(f"INSERT INTO {table} ({_names(columns)}) VALUES ({marks})", rows)
+    if table == 'feedback':
+        tag_col = columns.index('final_tags')
+        conn.executemany("INSERT INTO feedback_tags (day, tag) VALUES (?, ?)",
+                         ((r[-1], t.strip().lower()) for r in rows
+                          for t in str(r[tag_col] or '').replace(';', ',').split(',') if t.strip()))
+    return len(rows)
+
+
+def _clear(conn, table):
+    conn.execute(f"DELETE FROM {table}")
+    if table == 'feedback':
+        conn.execute("DELETE FROM feedback_tags")
+
+
+def _sync_table(conn, table, rebuild=False):
+    fname, _, kind = TABLES[table]
+    path = os.path.join(DATA_DIR, fname)
+    src = conn.execute("SELECT offset, mtime_ns, head, fieldnames FROM sources WHERE name = ?", (table,)).fetchone()
+    if not os.path.exists(path):
+        if src is not None:
+            conn.execute("BEGIN IMMEDIATE")
+            _clear(conn, table)
+            conn.execute("DELETE FROM sources WHERE name = ?", (table,))
+            conn.execute("COMMIT")
+        return 0
+    st = os.stat(path)
+    if src is not None and not rebuild and src[1] == st.st_mtime_ns and src[0] == st.st_size:
+        return 0
+    offset, fieldnames = 0, None
+    # an append-only file is read on from the last offset unless it was rewritten
+    if (src is not None and not rebuild and kind == 'append' and st.st_size >= src[0]
+            and src[2] == _head(path, src[0])):
+        offset, fieldnames = src[0], json.loads(src[3]) if src[3] else None
+    added, offset_start = 0, offset
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if offset_start == 0:
+            # bulk load without indexes and build them once at the end
+            _clear(conn, table)
+            _indexes(conn, table, drop=True)
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            carry = b""
+            while True:
+                block = f.read(READ_BLOCK)
+                data = carry + block
+                # a trailing partial record (still being written) waits for the next sync
+                end = _complete(data)
+                records = list(csv.reader(io.StringIO(data[:end].decode('utf-8', errors='ignore'), newline='')))
+                if fieldnames is None and records:
+                    fieldnames, records = records[0], records[1:]
+                added += _insert(conn, table, fieldnames or [], [r for r in records if r])
+                offset += end
+                carry = data[end:]
+                if not block:
+                    break
+        if offset_start == 0:
+            _indexes(conn, table)
+        conn.execute("INSERT OR REPLACE INTO sources (name, offset, mtime_ns, head, fieldnames) VALUES (?, ?, ?, ?, ?)",
+                     (table, offset, st.st_mtime_ns, _head(path, offset), json.dumps(fieldnames)))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return added
+
+
+def sync(rebuild=False):
+    """Bring the store up to date with the CSVs; returns rows added per table."""
+    conn = _connect()
+    try:
+        return {table: _sync_table(conn, table, rebuild) for table in TABLES}
+    finally:
+        conn.close()
+
+
+# ------------------ queries ------------------ #
+
+def _where(table, start=None, end=None):
+    """SQL filter on the day column; start/end are dates or YYYY-MM-DD strings (inclusive)."""
+    clauses, params = [], []
+    if table in DATED or table == 'feedback_tags':
+        if start:
+            clauses.append("day >= ?")
+            params.append(str(start))
+        if end:
+            clauses.append("day <= ?")
+            params.append(str(end))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _query(sql, params=()):
+    conn = _connect()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def date_bounds(table='feedback'):
+    """(first day, last day) present in table, or (None, None)."""
+    return tuple(_query(f"SELECT MIN(day), MAX(day) FROM {table} WHERE day != ''")[0])
+
+
+def count(table, start=None, end=None, **filters):
+    where, params = _where(table, start, end)
+    for col, value in filters.items():
+        if col not in GROUPABLE.get(table, ()):
+            raise ValueError(f"Cannot filter {table} on {col}")
+        where += (" AND " if where else " WHERE ") + f"{col} = ?"
+        params.append(value)
+    return _query(f"SELECT COUNT(*) FROM {table}{where}", params)[0][0]
+
+
+def counts(table, column, start=None, end=None):
+    """[(value, rows)] of one categorical column, most frequent first."""
+    if column not in GROUPABLE.get(table, ()):
+        raise ValueError(f"Cannot group {table} by {column}")
+    where, params = _where(table, start, end)
+    return _query(f"SELECT COALESCE({column}, ''), COUNT(*) AS n FROM {table}{where} "
+                  f"GROUP BY 1 ORDER BY n DESC", params)
+
+
+def timeline(table='feedback', start=None, end=None):
+    """[(day, rows)] in date order."""
+    where, params = _where(table, start, end)
+    where += (" AND " if where else " WHERE ") + "day != ''"
+    return _query(f"SELECT day, COUNT(*) FROM {table}{where} GROUP BY day ORDER BY day", params)
+
+
+def tag_counts(start=None, end=None, limit=50):
+    where, params = _where('feedback_tags', start, end)
+    return _query(f"SELECT tag, COUNT(*) AS n FROM feedback_tags{where} GROUP BY tag ORDER BY n DESC LIMIT ?",
+                  params + [limit])
+
+
+def gap_totals():
+    """(gap groups, tickets across them)."""
+    return tuple(_query("SELECT COUNT(*), COALESCE(SUM(count), 0) FROM gaps")[0])
+
+
+def columns(table):
+    return [c for c, _ in TABLES[table][1]]
+
+
+def page(table, start=None, end=None, offset=0, limit=50):
+    """One page of rows (dicts) in the table's default order."""
+    where, params = _where(table, start, end)
+    rows = _query(f"SELECT {_names(columns(table))} FROM {table}{where} ORDER BY {ORDER[table]} LIMIT ? OFFSET ?",
+                  params + [int(limit), int(offset)])
+    return [dict(zip(columns(table), r)) for r in rows]
+
+
+def iter_csv(table, start=None, end=None, batch=EXPORT_BATCH):
+    """Yield the (filtered) table as CSV text, EXPORT_BATCH rows at a time."""
+    where, params = _where(table, start, end)
+    conn = _connect()
+    try:
+        cur = conn.execute(f"SELECT {_names(columns(table))} FROM {table}{where} ORDER BY {ORDER[table]}", params)
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(columns(table))
+        while True:
+            rows = cur.fetchmany(batch)
+            writer.writerows(rows)
+            if buf.tell():
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+            if not rows:
+                break
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sync", action="store_true", help="ingest rows added to the CSVs")
+    ap.add_argument("--rebuild", action="store_true", help="reload every table from its CSV")
+    args = ap.parse_args()
+    print(json.dumps(sync(rebuild=args.rebuild), indent=2))
+    print(json.dumps({t: count(t) for t in TABLES}, indent=2))
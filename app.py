@@ -1,17 +1,27 @@
 import os
+import importlib
 from datetime import datetime
 from functools import wraps
 from time import time
-from flask import Flask, request, jsonify, render_template, send_file, Response
+from flask import Flask, request, jsonify, render_template, send_file, Response, stream_with_context
 from flask_cors import CORS
-from similarity import find_similar_tickets, recommend_articles
-import pandas as pd
-import PyPDF2
+import csv
 import json
 import html
+import similarity
+from similarity import find_similar_tickets, score_articles, add_ticket, reload_kb_index
 
-from llm_classifier import classify_text
-from similarity import find_similar_tickets
+from llm_classifier import classify_text, generate_kb_article, LLM_BREAKER, update_breaker_gauge
+import metrics
+import profiling
+import jobs
+import online_model
+import upload_cache
+import analytics_store
+
+# pandas, PyPDF2 and the numpy/scikit-learn backed modules (near_duplicates,
+# content_gaps, kb_jobs) are imported in the routes that use them, so worker
+# boot and routes like / and /feedback do not pay for them
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 # or simply: app = Flask(__name__)
@@ -19,7 +29,7 @@ app = Flask(__name__, template_folder='templates', static_folder='static')
 CORS(app)
 
 BASE_DIR = os.path.dirname(__file__)
-DATA_DIR = os.path.join(BASE_DIR, "data")
+DATA_DIR = os.environ.get("TICKET_DATA_DIR", os.path.join(BASE_DIR, "data"))
 os.makedirs(DATA_DIR, exist_ok=True)
 FEEDBACK_CSV = os.path.join(DATA_DIR, "feedback.csv")
 
@@ -44,29 +54,17 @@ def requires_auth(f):
         return f(*args, **kwargs)
     return decorated
 
+STAGE_SECONDS = metrics.histogram('ticket_analyze_stage_seconds', 'Time spent per /analyze stage', ['stage'])
+ANALYZE_TOTAL = metrics.counter('ticket_analyze_requests_total', 'Analyzed uploads by outcome', ['outcome'])
+DEDUP_LOOKUPS = metrics.counter('ticket_near_duplicate_lookups_total', 'Near-duplicate cluster lookups', ['result'])
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def generate_kb_article_from_text(text):
-    prompt = f"""
-    You are a support knowledge-base writer.
-    Write a clear support article to solve this issue:
-
-    Issue:
-    {text}
-
-    Respond in JSON with fields:
-    - title
-    - content (full detailed solution)
-    """
-
     try:
-        result = classify_text(prompt)  # using your existing LLM wrapper
-        return {
-            "title": result.get("title", "Support Article"),
-            "content": result.get("content", "")
-        }
-    except:
+        return generate_kb_article(text)
+    except Exception:
         return None
 
 def extract_text(file):
@@ -76,6 +74,7 @@ def extract_text(file):
         return file.read().decode('utf-8', errors='ignore')
     elif ext == 'csv':
         try:
+            import pandas as pd
             df_local = pd.read_csv(file)
             return " ".join(df_local.astype(str).values.flatten())
         except Exception:
@@ -83,6 +82,7 @@ def extract_text(file):
             return file.read().decode('utf-8', errors='ignore')
     elif ext == 'pdf':
         try:
+            import PyPDF2
             reader = PyPDF2.PdfReader(file)
             texts = []
             for page in reader.pages:
@@ -99,8 +99,8 @@ def extract_text(file):
 def home():
     return render_template('index.html')
 
-@app.route('/analyze', methods=['POST'])
-def analyze_file():
+def _upload_error():
+    """Validate request.files['file']; returns an error response or None."""
     if 'file' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
     file = request.files['file']
@@ -108,39 +108,116 @@ def analyze_file():
         return jsonify({'error': 'No file selected'}), 400
     if not allowed_file(file.filename):
         return jsonify({'error': 'Unsupported file type'}), 400
+    return None
 
-    text = extract_text(file)
-    if not text or not text.strip():
+@app.route('/analyze', methods=['POST'])
+@profiling.profiled
+def analyze_file():
+    error = _upload_error()
+    if error:
+        return error
+    file = request.files['file']
+    response = analyze_upload(file, file.read())
+    if response is None:
         return jsonify({'error': 'Could not read text from file'}), 400
+    return jsonify(response)
 
-    combined_text = text.strip()
-    llm_result = {}
-    try:
-        llm_result = classify_text(combined_text)
-    except Exception as e:
-        llm_result = {'error': f'LLM error: {str(e)}'}
+# The expensive part of an /analyze response, reused for repeat uploads and near-duplicates
+ANALYSIS_KEYS = ('llm_result', 'similar_tickets', 'recommended_articles', 'kb_match_stats')
+
+def analyze_upload(file, data):
+    """
+    /analyze response for an uploaded file, or None when no text could be read.
+    Repeat uploads of the same bytes reuse the extracted text and analysis
+    from the upload cache; the per-ticket bookkeeping in analyze_text (gap
+    log, index, duplicate clusters) runs for every upload.
+    """
+    cache_key = upload_cache.key(data, file.filename)
+    with STAGE_SECONDS.time(stage='cache_lookup'):
+        cached = upload_cache.get(cache_key)
+    # entries cached before the extracted text was stored are recomputed
+    if cached is not None and 'text' in cached:
+        response = analyze_text(cached['text'], analysis=cached)
+        response['cache'] = cached['cache']
+        return response
+
+    with STAGE_SECONDS.time(stage='extract'):
+        text = extract_text(file)
+    if not text or not text.strip():
+        ANALYZE_TOTAL.inc(outcome='unreadable')
+        return None
+    text = text.strip()
+    response = analyze_text(text)
+    upload_cache.put(cache_key, dict({k: response[k] for k in ANALYSIS_KEYS}, text=text))
+    return response
 
-    # add similarity if available and not already provided by llm_result
-    similar = []
-    if not isinstance(llm_result, dict) or 'similar_tickets' not in llm_result:
-        similar = find_similar_tickets(combined_text, top_k=3)
+def analyze_text(combined_text, analysis=None):
+    """
+    Run classification, retrieval and gap logging on ticket text; returns the /analyze response dict.
+    analysis: the ANALYSIS_KEYS results of an earlier identical upload, used instead of recomputing.
+    """
+    import near_duplicates
+    import content_gaps
+    # Near-duplicates of a recent ticket (outage bursts) reuse its analysis
+    # while the KB/index version it was computed against is current
+    with STAGE_SECONDS.time(stage='dedup_lookup'):
+        version = upload_cache.version()
+        cluster, cached, signature = near_duplicates.lookup(combined_text, version)
+    DEDUP_LOOKUPS.inc(result='hit' if cached is not None else 'stale' if cluster is not None else 'miss')
+    if analysis is not None or cached is not None:
+        known = analysis if analysis is not None else cached
+        llm_result = known['llm_result']
+        similar = known['similar_tickets']
+        articles = known['recommended_articles']
+        kb_stats = known['kb_match_stats']
+        # gap groups count tickets, not clusters or cache entries
+        if len(articles) == 0:
+            with STAGE_SECONDS.time(stage='gap_log'):
+                content_gaps.log_gap(combined_text)
+        if analysis is not None and not similarity.has_ticket(combined_text):
+            # already indexed unless the first upload ran in another worker
+            with STAGE_SECONDS.time(stage='index_append'):
+                add_ticket(combined_text, category=llm_result.get('category') if isinstance(llm_result, dict) else None)
+        if cached is None:
+            near_duplicates.register(signature, combined_text, {k: known[k] for k in ANALYSIS_KEYS},
+                                     version=version, cluster_id=cluster['cluster_id'] if cluster is not None else None)
     else:
-        similar = llm_result.get('similar_tickets', [])
-
-    # ✅ Always recommend articles (must not be inside if/else)
-    articles = recommend_articles(combined_text, top_k=3)
-
-    # ✅ Content Gap Logging
-    GAP_LOG = os.path.join(DATA_DIR, "content_gaps.csv")
-    if len(articles) == 0:
-        gap_entry = pd.DataFrame([{
-            "timestamp": datetime.now().isoformat(),
-            "ticket_excerpt": combined_text[:200]
-        }])
-        if not os.path.exists(GAP_LOG):
-            gap_entry.to_csv(GAP_LOG, index=False)
+        llm_result = {}
+        try:
+            with STAGE_SECONDS.time(stage='classify'):
+                llm_result = classify_text(combined_text)
+        except Exception as e:
+            llm_result = {'error': f'LLM error: {str(e)}'}
+
+        # add similarity if available and not already provided by llm_result
+        similar = []
+        if not isinstance(llm_result, dict) or 'similar_tickets' not in llm_result:
+            with STAGE_SECONDS.time(stage='similar_tickets'):
+                # the predicted category's shard is searched first
+                category = llm_result.get('category') if isinstance(llm_result, dict) else None
+                similar = find_similar_tickets(combined_text, top_k=3, category=category)
         else:
-            gap_entry.to_csv(GAP_LOG, mode='a', header=False, index=False)
+            similar = llm_result.get('similar_tickets', [])
+
+        # ✅ Always recommend articles (must not be inside if/else)
+        with STAGE_SECONDS.time(stage='recommend_articles'):
+            articles, kb_stats = score_articles(combined_text, top_k=3)
+
+        # ✅ Content Gap Logging (clustered into gap groups)
+        if len(articles) == 0:
+            with STAGE_SECONDS.time(stage='gap_log'):
+                content_gaps.log_gap(combined_text)
+
+        # Make this ticket searchable for the next similarity lookups
+        with STAGE_SECONDS.time(stage='index_append'):
+            add_ticket(combined_text, category=llm_result.get('category') if isinstance(llm_result, dict) else None)
+
+        near_duplicates.register(signature, combined_text, {
+            'llm_result': llm_result,
+            'similar_tickets': similar,
+            'recommended_articles': articles,
+            'kb_match_stats': kb_stats
+        }, version=version, cluster_id=cluster['cluster_id'] if cluster is not None else None)
 
     # ✅ Final structured response
     response = {
@@ -148,8 +225,11 @@ def analyze_file():
         'analyzed_at': datetime.now().isoformat(),
         'llm_result': llm_result,
         'similar_tickets': similar,
-        'recommended_articles': articles
+        'recommended_articles': articles,
+        'kb_match_stats': kb_stats
     }
+    if cluster is not None:
+        response['duplicate_cluster'] = {'cluster_id': cluster['cluster_id'], 'size': cluster['size']}
 
     # ✅ Add convenience top-level fields
     if isinstance(llm_result, dict):
@@ -157,7 +237,28 @@ def analyze_file():
             if k in llm_result:
                 response[k] = llm_result[k]
 
-    return jsonify(response)
+    ANALYZE_TOTAL.inc(outcome='cached' if analysis is not None else 'duplicate' if cached is not None else 'analyzed')
+    return response
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue an upload for background analysis; poll GET /jobs/<id> for the result"""
+    error = _upload_error()
+    if error:
+        return error
+    file = request.files['file']
+    try:
+        job_id = jobs.enqueue(file.filename, file.read())
+    except jobs.QueueFull:
+        return jsonify({'error': 'Analysis queue is full, retry later'}), 503, {'Retry-After': str(jobs.RETRY_AFTER)}
+    return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': f'/jobs/{job_id}'}), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'not found'}), 404
+    return jsonify(job)
 
 @app.route('/feedback', methods=['POST'])
 def receive_feedback():
@@ -173,11 +274,19 @@ def receive_feedback():
         'final_priority': payload.get('final_priority',''),
         'agent_note': payload.get('agent_note','')
     }
-    df_row = pd.DataFrame([row])
-    if not os.path.exists(FEEDBACK_CSV):
-        df_row.to_csv(FEEDBACK_CSV, index=False)
-    else:
-        df_row.to_csv(FEEDBACK_CSV, index=False, header=False, mode='a')
+    new_file = not os.path.exists(FEEDBACK_CSV)
+    with open(FEEDBACK_CSV, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(row))
+        if new_file:
+            writer.writeheader()
+        writer.writerow(row)
+
+    # Corrected tickets take their final category in the similarity index;
+    # the row /analyze added for the same text is relabelled, not duplicated
+    if row['original_text']:
+        add_ticket(row['original_text'], category=row['final_category'], source="feedback", replace=True)
+    # Learn the correction in the background; workers pick the new model up by mtime
+    online_model.schedule_update()
     return jsonify({'status':'ok'})
 
 # Admin Home (Dashboard)
@@ -190,16 +299,22 @@ def admin_ui():
 @app.route("/admin/gaps")
 @requires_auth
 def view_gaps():
-    GAP_LOG = os.path.join(DATA_DIR, "content_gaps.csv")
-    if not os.path.exists(GAP_LOG):
+    import content_gaps
+    df = content_gaps.load_groups()
+    if df.empty:
         return "<h3>No content gaps recorded yet.</h3>"
 
-    import pandas as pd
-    df = pd.read_csv(GAP_LOG)
+    df = df[['gap_id', 'count', 'first_seen', 'timestamp', 'ticket_excerpt', 'latest_excerpt']].rename(
+        columns={'count': 'tickets', 'timestamp': 'last_seen'})
+    for col in ['ticket_excerpt', 'latest_excerpt']:
+        df[col] = df[col].fillna('').astype(str).apply(html.escape)
+
+    df.insert(0, 'select', df['gap_id'].apply(
+        lambda g: f"<input type=\"checkbox\" class=\"gap-select\" value=\"{int(g)}\">"))
 
     # Add Generate KB button column
-    df['action'] = df['ticket_excerpt'].apply(
-    lambda t: f"<button onclick=\"generateKB('{html.escape(str(t))}')\">Generate KB</button>"
+    df['action'] = df['gap_id'].apply(
+    lambda g: f"<button onclick=\"generateKB({int(g)})\">Generate KB</button>"
      )
     
     # Convert table to HTML and allow buttons to render
@@ -218,17 +333,21 @@ def view_gaps():
     </head>
     <body>
         <h2>📌 Content Gaps (Tickets With No Matching KB Articles)</h2>
+        <p>{len(df)} distinct problems across {int(df['tickets'].sum())} tickets.</p>
+        <button onclick="generateSelected()">Generate KB for selected</button>
+        <span id="jobStatus"></span>
+        <br><br>
         {table_html}
         <br><br>
         <a href="/admin">⬅ Back to Admin Dashboard</a>
 
         <!-- ✅ JS to trigger KB generation -->
         <script>
-        function generateKB(text) {{
+        function generateKB(gapId) {{
           fetch('/admin/generate_kb', {{
             method: 'POST',
             headers: {{'Content-Type':'application/json'}},
-            body: JSON.stringify({{ticket_excerpt: text}})
+            body: JSON.stringify({{gap_id: gapId}})
           }})
           .then(res => res.json())
           .then(data => {{
@@ -236,6 +355,36 @@ def view_gaps():
             location.reload();
           }});
         }}
+
+        function generateSelected() {{
+          const ids = Array.from(document.querySelectorAll('.gap-select:checked')).map(c => parseInt(c.value));
+          if (!ids.length) {{ alert('Select at least one gap'); return; }}
+          fetch('/admin/kb_jobs', {{
+            method: 'POST',
+            headers: {{'Content-Type':'application/json'}},
+            body: JSON.stringify({{gap_ids: ids}})
+          }})
+          .then(res => res.json())
+          .then(job => {{
+            if (job.error) {{ alert(job.error); return; }}
+            pollJob(job.job_id);
+          }});
+        }}
+
+        function pollJob(jobId) {{
+          fetch('/admin/kb_jobs/' + jobId)
+          .then(res => res.json())
+          .then(job => {{
+            const status = document.getElementById('jobStatus');
+            status.textContent = `Job ${{job.job_id}}: ${{job.status}} (${{job.completed}}/${{job.total}})`;
+            if (job.status === 'queued' || job.status === 'running') {{
+              setTimeout(() => pollJob(jobId), 1500);
+              return;
+            }}
+            alert(`Created ${{job.created.length}} articles, ${{job.duplicates.length}} duplicates skipped, ${{job.failed.length}} failed` + (job.error ? `: ${{job.error}}` : ''));
+            location.reload();
+          }});
+        }}
         </script>
 
     </body>
@@ -247,10 +396,18 @@ def view_gaps():
 @app.route("/admin/generate_kb", methods=['POST'])
 @requires_auth
 def generate_kb():
-    GAP_LOG = os.path.join(DATA_DIR, "content_gaps.csv")
+    import pandas as pd
+    import content_gaps
     KB_PATH = os.path.join(DATA_DIR, "knowledge_base.csv")
 
-    ticket_text = request.json.get("ticket_excerpt", "").strip()
+    gap_id = request.json.get("gap_id")
+    if gap_id is not None:
+        groups = content_gaps.get_groups([gap_id])
+        if not groups:
+            return jsonify({"error": "Unknown gap"}), 404
+        ticket_text = str(groups[0]['ticket_excerpt']).strip()
+    else:
+        ticket_text = request.json.get("ticket_excerpt", "").strip()
     if not ticket_text:
         return jsonify({"error": "Missing ticket text"}), 400
 
@@ -270,10 +427,39 @@ def generate_kb():
         df_row.to_csv(KB_PATH, index=False)
     else:
         df_row.to_csv(KB_PATH, mode="a", header=False, index=False)
+    reload_kb_index()
+
+    # The gap group is covered now
+    if gap_id is not None:
+        content_gaps.remove_groups([gap_id])
 
     return jsonify({"message": "Article created successfully"}), 200
 
 
+@app.route("/admin/kb_jobs", methods=['POST'])
+@requires_auth
+def submit_kb_job():
+    import content_gaps
+    import kb_jobs
+    payload = request.get_json(silent=True) or {}
+    gap_ids = payload.get("gap_ids") or []
+    if payload.get("all"):
+        gap_ids = content_gaps.load_groups()['gap_id'].tolist()
+    if not gap_ids:
+        return jsonify({"error": "No gaps selected"}), 400
+    job = kb_jobs.submit(gap_ids)
+    return jsonify(job), 202
+
+@app.route("/admin/kb_jobs/<job_id>")
+@requires_auth
+def kb_job_status(job_id):
+    import kb_jobs
+    job = kb_jobs.get_job(job_id)
+    if job is None:
+        return jsonify({"error": "not found"}), 404
+    return jsonify(job)
+
+
 @app.route('/admin/logs')
 @requires_auth
 def admin_logs():
@@ -292,6 +478,7 @@ def admin_logs():
 @app.route('/admin/feedback')
 @requires_auth
 def admin_feedback():
+    import pandas as pd
     fb_path = os.path.join(DATA_DIR, 'feedback.csv')
     if not os.path.exists(fb_path):
         return jsonify([])
@@ -312,6 +499,7 @@ def admin_feedback():
 @requires_auth
 def api_feedback():
     """API endpoint for feedback data"""
+    import pandas as pd
     fb_path = os.path.join(DATA_DIR, 'feedback.csv')
     if not os.path.exists(fb_path):
         return jsonify([])
@@ -326,12 +514,11 @@ def api_feedback():
 @app.route('/admin/api/gaps')
 @requires_auth
 def api_gaps():
-    """API endpoint for content gaps data"""
-    GAP_LOG = os.path.join(DATA_DIR, "content_gaps.csv")
-    if not os.path.exists(GAP_LOG):
-        return jsonify([])
+    """API endpoint for content gaps data (one record per gap group)"""
+    import pandas as pd
+    import content_gaps
     try:
-        df = pd.read_csv(GAP_LOG)
+        df = content_gaps.load_groups()
         if 'timestamp' in df.columns:
             df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
         df = df.where(pd.notnull(df), None)
@@ -344,6 +531,7 @@ def api_gaps():
 @requires_auth
 def api_knowledge_base():
     """API endpoint for knowledge base data"""
+    import pandas as pd
     KB_PATH = os.path.join(DATA_DIR, "knowledge_base.csv")
     if not os.path.exists(KB_PATH):
         return jsonify([])
@@ -355,41 +543,131 @@ def api_knowledge_base():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/admin/api/clusters')
+@requires_auth
+def api_clusters():
+    """API endpoint for near-duplicate ticket clusters (incident signal)"""
+    import near_duplicates
+    min_size = request.args.get('min_size', default=1, type=int)
+    limit = request.args.get('limit', default=100, type=int)
+    return jsonify(near_duplicates.clusters(min_size=min_size, limit=limit))
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint (per worker process)"""
+    similarity.update_index_gauges()
+    update_breaker_gauge()
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/api/metrics')
+@requires_auth
+def api_metrics():
+    """Metrics summary for the admin panel"""
+    similarity.update_index_gauges()
+    update_breaker_gauge()
+    snap = metrics.snapshot()
+    lookups = snap.get('ticket_near_duplicate_lookups_total', {})
+    kb_cache = snap.get('kb_index_cache_total', {})
+    classify = snap.get('llm_classify_total', {})
+    uploads = snap.get('upload_cache_lookups_total', {})
+    snap['derived'] = {
+        'near_duplicate_hit_ratio': metrics.ratio(lookups.get('hit', 0), lookups.get('miss', 0) + lookups.get('stale', 0)),
+        'kb_index_cache_hit_ratio': metrics.ratio(kb_cache.get('hit', 0), kb_cache.get('miss', 0)),
+        'upload_cache_hit_ratio': metrics.ratio(uploads.get('hit', 0), uploads.get('miss', 0) + uploads.get('stale', 0)),
+        'llm_fallback_rate': metrics.ratio(classify.get('rule_based', 0) + classify.get('local', 0), classify.get('llm', 0)),
+    }
+    return jsonify(snap)
+
+@app.route('/admin/api/llm_breaker')
+@requires_auth
+def api_llm_breaker():
+    """OpenAI circuit breaker state (this worker process)"""
+    return jsonify(LLM_BREAKER.snapshot())
+
+@app.route('/admin/api/llm_breaker/reset', methods=['POST'])
+@requires_auth
+def api_llm_breaker_reset():
+    LLM_BREAKER.reset()
+    return jsonify(LLM_BREAKER.snapshot())
+
+@app.route('/admin/api/profiles')
+@requires_auth
+def api_profiles():
+    """Sampled /analyze profiles (slowest first) and the current sample rate"""
+    limit = request.args.get('limit', default=20, type=int)
+    order = request.args.get('order', default='slowest')
+    return jsonify({
+        'sample_rate': profiling.get_sample_rate(),
+        'profiles': profiling.list_profiles(limit=limit, order=order)
+    })
+
+@app.route('/admin/api/profiling', methods=['POST'])
+@requires_auth
+def api_set_profiling():
+    payload = request.get_json(silent=True) or {}
+    try:
+        rate = profiling.set_sample_rate(payload.get('sample_rate', 0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'sample_rate must be a number between 0 and 1'}), 400
+    return jsonify({'sample_rate': rate})
+
+@app.route('/admin/profiles/<request_id>')
+@requires_auth
+def download_profile(request_id):
+    path = profiling.profile_path(request_id)
+    if path is None:
+        return jsonify({'error': 'not found'}), 404
+    return send_file(path, as_attachment=True)
+
 @app.route('/admin/api/stats')
 @requires_auth
 def api_stats():
     """API endpoint for dashboard statistics"""
     try:
-        # Load all data
-        fb_path = os.path.join(DATA_DIR, 'feedback.csv')
-        gaps_path = os.path.join(DATA_DIR, 'content_gaps.csv')
-        kb_path = os.path.join(DATA_DIR, 'knowledge_base.csv')
-        
+        analytics_store.sync()
+        groups, gap_tickets = analytics_store.gap_totals()
         stats = {
-            'total_tickets': 0,
-            'content_gaps': 0,
-            'kb_articles': 0,
-            'high_priority_tickets': 0
+            'total_tickets': analytics_store.count('feedback'),
+            'content_gaps': groups,
+            'gap_tickets': gap_tickets,
+            'kb_articles': analytics_store.count('kb'),
+            'high_priority_tickets': analytics_store.count('feedback', final_priority='High')
         }
-        
-        if os.path.exists(fb_path):
-            df_fb = pd.read_csv(fb_path)
-            stats['total_tickets'] = len(df_fb)
-            if 'final_priority' in df_fb.columns:
-                stats['high_priority_tickets'] = len(df_fb[df_fb['final_priority'] == 'High'])
-        
-        if os.path.exists(gaps_path):
-            df_gaps = pd.read_csv(gaps_path)
-            stats['content_gaps'] = len(df_gaps)
-        
-        if os.path.exists(kb_path):
-            df_kb = pd.read_csv(kb_path)
-            stats['kb_articles'] = len(df_kb)
-        
         return jsonify(stats)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    
+
+@app.route('/admin/api/query/<table>')
+@requires_auth
+def api_query(table):
+    """One page of feedback/kb/gaps rows, optionally limited to ?start=&end= (YYYY-MM-DD)"""
+    if table not in analytics_store.TABLES:
+        return jsonify({'error': 'unknown table'}), 404
+    start, end = request.args.get('start'), request.args.get('end')
+    offset = max(request.args.get('offset', default=0, type=int), 0)
+    limit = min(max(request.args.get('limit', default=50, type=int), 1), 1000)
+    try:
+        analytics_store.sync()
+        return jsonify({
+            'rows': analytics_store.page(table, start, end, offset, limit),
+            'total': analytics_store.count(table, start, end),
+            'offset': offset,
+            'limit': limit
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/api/export/<table>.csv')
+@requires_auth
+def api_export(table):
+    """Stream feedback/kb/gaps as CSV, optionally limited to ?start=&end= (YYYY-MM-DD)"""
+    if table not in analytics_store.TABLES:
+        return jsonify({'error': 'unknown table'}), 404
+    analytics_store.sync()
+    rows = analytics_store.iter_csv(table, request.args.get('start'), request.args.get('end'))
+    return Response(stream_with_context(rows), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={table}.csv'})
+
 @app.route('/admin/download/<path:fname>')
 @requires_auth
 def admin_download(fname):
@@ -399,6 +677,16 @@ def admin_download(fname):
         return send_file(path, as_attachment=True)
     return jsonify({'error': 'not found'}), 404
 
+# Imported on first use by the request handlers; warm_up loads them up front
+DEFERRED_IMPORTS = ('pandas', 'PyPDF2', 'near_duplicates', 'content_gaps', 'kb_jobs')
+
+def warm_up():
+    """Import the deferred dependencies and build the ticket and KB indexes (gunicorn preload)."""
+    for name in DEFERRED_IMPORTS:
+        importlib.import_module(name)
+    similarity._build_index()
+    similarity._load_kb_index()
+
 if __name__ == '__main__':
     print("🚀 Server running on http://localhost:5000")
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Dashboard rerun cost: pandas over the raw CSV vs analytics_store queries.
+
+Writes a synthetic feedback.csv per size and times what one dashboard
+rerun does with a one-month date filter:
+
+  * pandas: read_csv, filter by date, value_counts for category/priority,
+    daily timeline, tag split, to_csv of the filtered rows (download payload),
+  * store: the same aggregates as SQL queries plus one 50-row page
+    (the download is streamed by Flask, so it is not part of a rerun),
+
+plus the one-time initial sync and an incremental sync after 100 new rows.
+
+    python benchmarks/bench_dashboard_queries.py --sizes 10000 100000 1000000
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIELDS = ['timestamp', 'original_text', 'final_category', 'final_tags', 'final_priority', 'agent_note']
+
+
+def write_feedback(path, n, rng, mode='w'):
+    with open(path, mode, newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if mode == 'w':
+            writer.writerow(FIELDS)
+        for i in range(n):
+            ts = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00"
+            writer.writerow([ts, f"Ticket {i}: cannot log in after password reset", rng.choice(
+                ['authentication', 'payment', 'technical', 'feature']), rng.choice(['urgent,login', 'billing', '']),
+                rng.choice(['High', 'Medium', 'Low']), ''])
+
+
+def pandas_rerun(path, start, end):
+    import pandas as pd
+    df = pd.read_csv(path)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    df = df[(df['timestamp'].dt.date >= start) & (df['timestamp'].dt.date <= end)]
+    df['final_category'].value_counts()
+    df['final_priority'].value_counts()
+    df.groupby(df['timestamp'].dt.date).size()
+    ' '.join(df['final_tags'].dropna().astype(str)).replace(',', ' ').split()
+    df.to_csv(index=False)
+
+
+def store_rerun(store, start, end):
+    store.sync()
+    store.count('feedback', start, end)
+    store.count('feedback', start, end, final_priority='High')
+    store.counts('feedback', 'final_category', start, end)
+    store.counts('feedback', 'final_priority', start, end)
+    store.timeline('feedback', start, end)
+    store.tag_counts(start, end)
+    store.page('feedback', start, end, 0, 50)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from datetime import date
+    start, end = date(2025, 6, 1), date(2025, 6, 30)
+    print(f"{'rows':>9s} {'pandas rerun s':>15s} {'store rerun ms':>15s} {'initial sync s':>15s} {'+100 sync ms':>13s}")
+    for n in args.sizes:
+        data_dir = tempfile.mkdtemp(prefix="ticket-dash-")
+        os.environ["TICKET_DATA_DIR"] = data_dir
+        sys.modules.pop('analytics_store', None)
+        import analytics_store
+        rng = random.Random(args.seed)
+        path = os.path.join(data_dir, "feedback.csv")
+        write_feedback(path, n, rng)
+
+        t0 = time.perf_counter()
+        analytics_store.sync()
+        initial = time.perf_counter() - t0
+        write_feedback(path, 100, rng, mode='a')
+        t0 = time.perf_counter()
+        analytics_store.sync()
+        incremental = time.perf_counter() - t0
+
+        pd_best = store_best = float('inf')
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            pandas_rerun(path, start, end)
+            pd_best = min(pd_best, time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            store_rerun(analytics_store, start, end)
+            store_best = min(store_best, time.perf_counter() - t0)
+        print(f"{n:9d} {pd_best:15.3f} {store_best * 1000:15.1f} {initial:15.2f} {incremental * 1000:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
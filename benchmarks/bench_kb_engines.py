@@ -0,0 +1,103 @@
+"""
+KB retrieval benchmark: TF-IDF cosine (KB_ENGINE=tfidf) vs the BM25 engine.
+
+Builds a synthetic KB (see bench_pipeline.py; an article is relevant when its
+title names the query's category) and reports, per engine, build time,
+p50/p95 query latency, hit-rate@k, postings scored and the cost of adding a
+handful of new articles (TF-IDF refits, BM25 indexes only the new ones).
+
+    python benchmarks/bench_kb_engines.py --kb 5000 --queries 300
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--kb", type=int, default=2000, help="KB articles")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--add", type=int, default=10, help="articles added after the initial build")
+    ap.add_argument("--top-k", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    from bench_pipeline import summarize, synth_ticket
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+    import bm25
+    import similarity
+
+    rng = random.Random(args.seed)
+    articles = []
+    for i in range(args.kb + args.add):
+        cat, text = synth_ticket(rng, n_words=120)
+        articles.append((f"KB{i}", f"{cat.title()} guide {i}", text))
+    base, extra = articles[:args.kb], articles[args.kb:]
+    queries = [synth_ticket(rng, n_words=20) for _ in range(args.queries)]
+
+    def relevant(title, category):
+        return title.lower().startswith(category)
+
+    # TF-IDF: the current KB_ENGINE=tfidf configuration
+    t0 = time.perf_counter()
+    vectorizer = TfidfVectorizer(max_features=20000, ngram_range=(1, 2), stop_words='english')
+    matrix = vectorizer.fit_transform([a[2] for a in base])
+    tfidf_build = time.perf_counter() - t0
+
+    def tfidf_search(q):
+        sims = cosine_similarity(vectorizer.transform([q]), matrix)[0]
+        return [base[i][1] for i in similarity._top_k(sims, args.top_k, similarity.KB_MIN_SIMILARITY)]
+
+    t0 = time.perf_counter()
+    TfidfVectorizer(max_features=20000, ngram_range=(1, 2), stop_words='english').fit_transform([a[2] for a in articles])
+    tfidf_add = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    index = bm25.BM25Index(weights={'title': similarity.KB_TITLE_WEIGHT})
+    for aid, title, content in base:
+        index.add(aid, {'title': title, 'content': content})
+    bm25_build = time.perf_counter() - t0
+    titles = {aid: title for aid, title, _ in articles}
+    postings = {True: 0, False: 0}
+
+    def bm25_search(q, prune):
+        hits, stats = index.search(q, k=args.top_k, min_score=similarity.KB_MIN_BM25_SCORE, prune=prune)
+        postings[prune] += stats['postings']
+        return [titles[aid] for aid, _ in hits]
+
+    engines = [
+        ('tfidf', tfidf_search, tfidf_build),
+        ('bm25', lambda q: bm25_search(q, True), bm25_build),
+        ('bm25-noprune', lambda q: bm25_search(q, False), bm25_build),
+    ]
+    print(f"kb={args.kb} queries={args.queries} top_k={args.top_k}")
+    print(f"{'engine':13s} {'build s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'hit@k':>7s} {'postings/q':>11s}")
+    for name, search, build in engines:
+        timings, hits, returned = [], 0, 0
+        for cat, q in queries:
+            t0 = time.perf_counter()
+            found = search(q)
+            timings.append(time.perf_counter() - t0)
+            returned += len(found)
+            hits += sum(1 for title in found if relevant(title, cat))
+        st = summarize(timings)
+        scored = '-' if name == 'tfidf' else f"{postings[name == 'bm25'] / len(queries):.0f}"
+        print(f"{name:13s} {build:8.2f} {st['p50_ms']:8.3f} {st['p95_ms']:8.3f} "
+              f"{hits / returned if returned else 0:7.3f} {scored:>11s}")
+
+    t0 = time.perf_counter()
+    for aid, title, content in extra:
+        index.add(aid, {'title': title, 'content': content})
+    bm25_add = time.perf_counter() - t0
+    print(f"adding {args.add} articles: tfidf refit {tfidf_add * 1000:.1f} ms, bm25 incremental {bm25_add * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
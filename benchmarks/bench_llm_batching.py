@@ -0,0 +1,96 @@
+"""
+Cost/latency report: classify_text one ticket per call vs classify_batch.
+
+Runs both modes against the local OpenAI stub (simulated per-call latency)
+and reports LLM calls, prompt tokens (counted locally with the same
+tokenizer used for budgeting), estimated cost and wall time.
+
+    python benchmarks/bench_llm_batching.py --tickets 200 --latency-ms 400
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tickets", type=int, default=100)
+    ap.add_argument("--long-share", type=float, default=0.1, help="fraction of long tickets (not batched)")
+    ap.add_argument("--latency-ms", type=float, default=300.0, help="simulated latency per LLM call")
+    ap.add_argument("--price-per-1k", type=float, default=0.0005, help="prompt price per 1k tokens (USD)")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--output", help="write the report as JSON")
+    args = ap.parse_args()
+
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    import openai_stub
+    from bench_pipeline import synth_ticket
+    server, state, base_url = openai_stub.start(latency_ms=args.latency_ms)
+    os.environ["TICKET_DATA_DIR"] = tempfile.mkdtemp(prefix="ticket-llm-bench-")
+    os.environ["OPENAI_API_BASE"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    import llm_classifier as llm
+    if not llm.OPENAI_AVAILABLE:
+        print("openai (<1.0) is not installed; both modes would fall back to rule-based classification.")
+        sys.exit(1)
+
+    rng = random.Random(args.seed)
+    texts = []
+    for _ in range(args.tickets):
+        n_words = 900 if rng.random() < args.long_share else rng.randint(20, 80)
+        texts.append(synth_ticket(rng, n_words=n_words)[1])
+
+    def prompt_tokens(messages):
+        return sum(llm.count_tokens(m["content"]) for m in messages)
+
+    report = {}
+
+    calls0 = state.calls
+    t0 = time.perf_counter()
+    for t in texts:
+        llm.classify_text(t)
+    single_s = time.perf_counter() - t0
+    single_tokens = sum(prompt_tokens(llm._classify_messages(t)) for t in texts)
+    report['single'] = {'calls': state.calls - calls0, 'prompt_tokens': single_tokens, 'wall_s': single_s}
+
+    calls0 = state.calls
+    t0 = time.perf_counter()
+    results = llm.classify_batch(texts)
+    batch_s = time.perf_counter() - t0
+    batches, singles = llm._pack(texts, llm.BATCH_ITEM_TOKENS, llm.BATCH_TOKEN_BUDGET, llm.BATCH_MAX_ITEMS)
+    batch_tokens = sum(prompt_tokens(llm._batch_messages([texts[i] for i in b])) for b in batches if len(b) > 1)
+    batch_tokens += sum(prompt_tokens(llm._classify_messages(texts[b[0]])) for b in batches if len(b) == 1)
+    batch_tokens += sum(prompt_tokens(llm._classify_messages(texts[i])) for i in singles)
+    report['batched'] = {'calls': state.calls - calls0, 'prompt_tokens': batch_tokens, 'wall_s': batch_s,
+                         'batches': sum(1 for b in batches if len(b) > 1), 'results': len(results)}
+    server.shutdown()
+
+    for mode in ('single', 'batched'):
+        r = report[mode]
+        r['est_cost_usd'] = r['prompt_tokens'] / 1000.0 * args.price_per_1k
+        r['ms_per_ticket'] = r['wall_s'] / len(texts) * 1000.0
+
+    print(f"{len(texts)} tickets, {args.latency_ms:.0f} ms simulated latency per call, "
+          f"budgets: input {llm.INPUT_TOKEN_BUDGET}, batch item {llm.BATCH_ITEM_TOKENS}, "
+          f"batch {llm.BATCH_TOKEN_BUDGET} tokens / {llm.BATCH_MAX_ITEMS} tickets")
+    print(f"{'mode':8s} {'calls':>6s} {'prompt tok':>11s} {'cost $':>9s} {'wall s':>8s} {'ms/ticket':>10s}")
+    for mode in ('single', 'batched'):
+        r = report[mode]
+        print(f"{mode:8s} {r['calls']:6d} {r['prompt_tokens']:11d} {r['est_cost_usd']:9.4f} "
+              f"{r['wall_s']:8.2f} {r['ms_per_ticket']:10.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Memory of the similar-ticket index: snippet store vs the old DataFrame.
+
+Builds a synthetic history (see bench_pipeline.py) and reports
+
+  * the history DataFrame the index used to keep vs the packed snippet store,
+  * per-row category strings vs the array of category codes,
+  * snippet + result assembly time per hit (DataFrame .iloc vs store),
+  * anonymous/file-backed RSS of a worker after building the index, with
+    and without the memory-mapped snippet file (Linux /proc only).
+
+    python benchmarks/bench_memory.py --history 50000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _rss():
+    """{'anon_mb', 'file_mb'} from /proc/self/status, or {} where unavailable."""
+    out = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("RssAnon:", "RssFile:")):
+                    key = 'anon_mb' if line.startswith("RssAnon") else 'file_mb'
+                    out[key] = int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return out
+
+
+def worker(history):
+    """Child process: build the index and print its RSS as JSON."""
+    sys.path.insert(0, ROOT)
+    import similarity
+    before = _rss()
+    similarity._build_index(limit_rows=history)
+    similarity.find_similar_tickets("password reset login locked", top_k=3)
+    after = _rss()
+    print(json.dumps({k: after[k] - before.get(k, 0.0) for k in after}))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--history", type=int, default=20000)
+    ap.add_argument("--lookups", type=int, default=20000, help="snippet/result lookups timed")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.worker:
+        return worker(args.history)
+
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    from bench_pipeline import build_corpus
+    data_dir = tempfile.mkdtemp(prefix="ticket-mem-")
+    build_corpus(data_dir, args.history, 1, args.seed)
+    os.environ["TICKET_DATA_DIR"] = data_dir
+
+    import random
+    from array import array
+    import pandas as pd
+    import similarity
+
+    df = pd.read_csv(similarity.HIST_PATH)
+    df_bytes = df.memory_usage(deep=True, index=True).sum()
+    store = similarity._SnippetStore.build(df['text'].astype(str))
+    categories = [similarity._norm_category(c) for c in df['Category']]
+    names = sorted(set(categories))
+    codes = array('H', (names.index(c) for c in categories))
+    cat_list_bytes = sys.getsizeof(categories) + sum(sys.getsizeof(c) for c in categories)
+
+    print(f"history={args.history}")
+    print(f"  history DataFrame (deep)   {df_bytes / 1e6:9.2f} MB")
+    print(f"  snippet store              {store.nbytes / 1e6:9.2f} MB")
+    print(f"  categories as str list     {cat_list_bytes / 1e6:9.2f} MB")
+    print(f"  categories as code array   {codes.itemsize * len(codes) / 1e6:9.2f} MB")
+
+    rng = random.Random(args.seed)
+    rows = [rng.randrange(len(df)) for _ in range(args.lookups)]
+    t0 = time.perf_counter()
+    for r in rows:
+        {'id': r, 'similarity': 0.5, 'score': 0.5, 'category': categories[r],
+         'snippet': str(df['text'].iloc[r])[:400]}
+    old = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for r in rows:
+        similarity.SimilarTicket(r, 0.5, 0.5, names[codes[r]], store.get(r))
+    new = time.perf_counter() - t0
+    print(f"  result assembly per hit    {old / len(rows) * 1e6:9.2f} us (.iloc)  "
+          f"{new / len(rows) * 1e6:.2f} us (store + record)")
+
+    for mmap_on in ("0", "1"):
+        env = dict(os.environ, SIMILARITY_SNIPPETS_MMAP=mmap_on)
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", "--history", str(args.history)],
+                             env=env, capture_output=True, text=True)
+        lines = out.stdout.strip().splitlines()
+        rss = json.loads(lines[-1]) if lines and lines[-1].startswith("{") else {}
+        label = "mmap" if mmap_on == "1" else "heap"
+        if rss:
+            print(f"  worker index RSS ({label})    anon {rss.get('anon_mb', 0):7.1f} MB  file {rss.get('file_mb', 0):7.1f} MB")
+        else:
+            print(f"  worker index RSS ({label})    unavailable on this platform")
+
+
+if __name__ == "__main__":
+    main()
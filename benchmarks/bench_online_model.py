@@ -0,0 +1,110 @@
+"""
+Online model benchmark: update cost per feedback row and accuracy over time.
+
+Streams synthetic feedback (see bench_pipeline.py; priority is High when the
+ticket mentions an outage-like word, Low for feature requests, Medium
+otherwise) into a temporary feedback.csv and, prequentially, predicts each
+row with the current model before it is learned. Reports
+
+  * update() cost per row when called after every row and after every batch,
+  * a full --rebuild over the whole log for comparison,
+  * rolling category/priority accuracy of the online model vs the keyword rules.
+
+    python benchmarks/bench_online_model.py --rows 2000 --batch 50
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+URGENT = {"crash", "charged", "locked", "declined", "broken", "delayed"}
+
+
+def priority_of(category, text):
+    if category == 'feature':
+        return 'Low'
+    return 'High' if URGENT & set(text.split()) else 'Medium'
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=2000, help="feedback rows streamed")
+    ap.add_argument("--batch", type=int, default=50, help="rows per update in the mini-batch pass")
+    ap.add_argument("--window", type=int, default=250, help="rows per accuracy report")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    from bench_pipeline import summarize, synth_ticket
+    os.environ["TICKET_DATA_DIR"] = tempfile.mkdtemp(prefix="ticket-online-")
+    os.environ["ONLINE_MIN_FEEDBACK"] = "1"
+    import online_model
+    import llm_classifier
+
+    rng = random.Random(args.seed)
+    stream = []
+    for _ in range(args.rows):
+        cat, text = synth_ticket(rng, n_words=25)
+        stream.append({'timestamp': '', 'original_text': text, 'final_category': cat, 'final_tags': '',
+                       'final_priority': priority_of(cat, text), 'agent_note': ''})
+    fields = list(stream[0])
+
+    def reset():
+        for path in (online_model.FEEDBACK_CSV, online_model.MODEL_PATH):
+            if os.path.exists(path):
+                os.remove(path)
+        with open(online_model.FEEDBACK_CSV, 'w', newline='', encoding='utf-8') as f:
+            csv.DictWriter(f, fieldnames=fields).writeheader()
+
+    def append(rows):
+        with open(online_model.FEEDBACK_CSV, 'a', newline='', encoding='utf-8') as f:
+            csv.DictWriter(f, fieldnames=fields).writerows(rows)
+
+    print(f"rows={args.rows} batch={args.batch}")
+    print(f"{'window':>11s} {'local cat':>10s} {'rules cat':>10s} {'local prio':>11s} {'rules prio':>11s} {'local used':>11s}")
+    reset()
+    per_row, correct = [], {'lc': 0, 'rc': 0, 'lp': 0, 'rp': 0, 'used': 0}
+    for i, row in enumerate(stream, 1):
+        pred = online_model.predict(row['original_text'], min_confidence=0.0) or {}
+        rule = llm_classifier._rule_based(row['original_text'])
+        correct['lc'] += pred.get('category') == row['final_category']
+        correct['rc'] += rule['category'] == row['final_category']
+        correct['lp'] += pred.get('suggested_priority') == row['final_priority']
+        correct['rp'] += rule['suggested_priority'] == row['final_priority']
+        correct['used'] += online_model.predict(row['original_text']) is not None
+        append([row])
+        t0 = time.perf_counter()
+        online_model.update()
+        per_row.append(time.perf_counter() - t0)
+        if i % args.window == 0 or i == len(stream):
+            n = (i - 1) % args.window + 1
+            print(f"{i - n + 1:5d}-{i:<5d} {correct['lc'] / n:10.3f} {correct['rc'] / n:10.3f} "
+                  f"{correct['lp'] / n:11.3f} {correct['rp'] / n:11.3f} {correct['used'] / n:11.3f}")
+            correct = dict.fromkeys(correct, 0)
+
+    reset()
+    per_batch = []
+    for start in range(0, len(stream), args.batch):
+        append(stream[start:start + args.batch])
+        t0 = time.perf_counter()
+        online_model.update()
+        per_batch.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    online_model.update(rebuild=True)
+    rebuild = time.perf_counter() - t0
+
+    row_st, batch_st = summarize(per_row), summarize(per_batch)
+    print(f"update per row:        p50 {row_st['p50_ms']:.2f} ms  p95 {row_st['p95_ms']:.2f} ms")
+    print(f"update per {args.batch}-row batch: p50 {batch_st['p50_ms']:.2f} ms  "
+          f"({batch_st['p50_ms'] / args.batch:.3f} ms/row)")
+    print(f"full rebuild of {len(stream)} rows: {rebuild * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
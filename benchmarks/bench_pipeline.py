@@ -0,0 +1,237 @@
+"""
+End-to-end benchmark of the ticket analysis pipeline.
+
+Builds a synthetic ticket history and KB of the requested sizes in a temp
+data dir, starts the local OpenAI stub, then times each stage of /analyze
+(extract_text, classify_text, find_similar_tickets, recommend_articles)
+and the full route through the Flask test client.
+
+    python benchmarks/bench_pipeline.py --history 20000 --kb 500 --queries 200
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/<old>.json
+
+Results (throughput, p50/p95/p99 latency, peak traced memory per stage) are
+written as JSON to benchmarks/results/<commit>.json for comparison.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+TOPICS = {
+    'authentication': "login password account locked reset sign in access denied two factor code email",
+    'payment': "payment card charged twice invoice billing refund transaction declined bank receipt",
+    'technical': "error crash bug timeout server broken page blank upload fails stack trace app",
+    'feature': "feature request enhancement dark mode export report integration api suggestion",
+    'shipping': "order delivery tracking package delayed courier address warehouse shipped",
+}
+FILLER = "please help customer since yesterday urgent again still tried support team thanks".split()
+
+
+def synth_ticket(rng, category=None, n_words=40):
+    category = category or rng.choice(list(TOPICS))
+    words = TOPICS[category].split()
+    body = [rng.choice(words) if rng.random() < 0.6 else rng.choice(FILLER) for _ in range(n_words)]
+    # a random id keeps tickets from being near-duplicates of each other
+    return category, f"Ticket {rng.randint(0, 10**9)}: " + " ".join(body)
+
+
+def build_corpus(data_dir, n_history, n_kb, seed):
+    import pandas as pd
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n_history):
+        cat, text = synth_ticket(rng)
+        rows.append({'text': text, 'text_clean': text.lower(), 'Category': cat})
+    pd.DataFrame(rows).to_csv(os.path.join(data_dir, "processed_tickets.csv"), index=False)
+    kb = []
+    for i in range(n_kb):
+        cat, text = synth_ticket(rng, n_words=120)
+        kb.append({'article_id': f"KB{i}", 'title': f"{cat.title()} guide {i}", 'content': text, 'link': '#'})
+    pd.DataFrame(kb).to_csv(os.path.join(data_dir, "knowledge_base.csv"), index=False)
+
+
+def summarize(samples, peak_bytes=None):
+    s = sorted(samples)
+    n = len(s)
+
+    def pct(p):
+        return s[min(n - 1, int(round(p / 100.0 * (n - 1))))] * 1000.0
+
+    total = sum(s)
+    out = {
+        'n': n,
+        'throughput_per_s': n / total if total else 0.0,
+        'mean_ms': total / n * 1000.0 if n else 0.0,
+        'p50_ms': pct(50),
+        'p95_ms': pct(95),
+        'p99_ms': pct(99),
+    }
+    if peak_bytes is not None:
+        out['peak_mem_mb'] = peak_bytes / 1e6
+    return out
+
+
+def run_stage(fn, inputs, warmup, mem_samples):
+    for x in inputs[:warmup]:
+        fn(x)
+    timings = []
+    for x in inputs:
+        t0 = time.perf_counter()
+        fn(x)
+        timings.append(time.perf_counter() - t0)
+    # memory in a separate, shorter pass so tracing does not skew latency
+    tracemalloc.start()
+    for x in inputs[:mem_samples]:
+        fn(x)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summarize(timings, peak)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current, baseline_path, threshold):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = []
+    print(f"\nvs {baseline_path} ({baseline['meta'].get('commit')})")
+    for stage, cur in current['stages'].items():
+        old = baseline['stages'].get(stage)
+        if not old:
+            continue
+        for key in ('p50_ms', 'p95_ms'):
+            if old[key] <= 0:
+                continue
+            delta = (cur[key] - old[key]) / old[key]
+            flag = "  REGRESSION" if delta > threshold else ""
+            print(f"  {stage:22s} {key}: {old[key]:9.3f} -> {cur[key]:9.3f} ms ({delta:+.1%}){flag}")
+            if flag:
+                regressions.append((stage, key))
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--history", type=int, default=5000, help="historical tickets in the similarity index")
+    ap.add_argument("--kb", type=int, default=200, help="KB articles")
+    ap.add_argument("--queries", type=int, default=100, help="timed calls per stage")
+    ap.add_argument("--warmup", type=int, default=5)
+    ap.add_argument("--mem-samples", type=int, default=10)
+    ap.add_argument("--stub-latency-ms", type=float, default=0.0, help="simulated LLM latency")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--output", help="result JSON path (default benchmarks/results/<commit>.json)")
+    ap.add_argument("--compare", help="baseline result JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.2, help="relative slowdown reported as regression")
+    args = ap.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="ticket-bench-")
+    build_corpus(data_dir, args.history, args.kb, args.seed)
+
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    import openai_stub
+    server, stub_state, base_url = openai_stub.start(latency_ms=args.stub_latency_ms)
+
+    # modules read these at import time
+    os.environ["TICKET_DATA_DIR"] = data_dir
+    os.environ["OPENAI_API_BASE"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    from werkzeug.datastructures import FileStorage
+    import llm_classifier
+    import similarity
+    from app import app, extract_text
+
+    rng = random.Random(args.seed + 1)
+    queries = [synth_ticket(rng)[1] for _ in range(args.queries + args.warmup)]
+
+    pdfs = sorted(f for f in os.listdir(ROOT) if f.lower().endswith(".pdf"))
+    uploads = []
+    for i, q in enumerate(queries):
+        if pdfs and i % 3 == 0:
+            name = pdfs[i % len(pdfs)]
+            with open(os.path.join(ROOT, name), 'rb') as f:
+                uploads.append((f.read(), name))
+        elif i % 3 == 1:
+            uploads.append((("subject,body\nHelp," + q + "\n").encode(), "ticket.csv"))
+        else:
+            uploads.append((q.encode(), "ticket.txt"))
+
+    t0 = time.perf_counter()
+    similarity._build_index(limit_rows=args.history)
+    index_build_s = time.perf_counter() - t0
+
+    stages = {}
+    stages['extract_text'] = run_stage(
+        lambda u: extract_text(FileStorage(stream=io.BytesIO(u[0]), filename=u[1])),
+        uploads, args.warmup, args.mem_samples)
+    stages['classify_text'] = run_stage(llm_classifier.classify_text, queries, args.warmup, args.mem_samples)
+    stages['find_similar_tickets'] = run_stage(
+        lambda q: similarity.find_similar_tickets(q, top_k=3), queries, args.warmup, args.mem_samples)
+    stages['recommend_articles'] = run_stage(
+        lambda q: similarity.recommend_articles(q, top_k=3), queries, args.warmup, args.mem_samples)
+
+    client = app.test_client()
+
+    def post(q):
+        r = client.post('/analyze', data={'file': (io.BytesIO(q.encode()), 'ticket.txt')})
+        assert r.status_code == 200, r.data
+
+    # fresh tickets so the route is not served from the near-duplicate clusters
+    route_queries = [synth_ticket(rng)[1] for _ in range(args.queries + args.warmup + args.mem_samples)]
+    stages['analyze_route'] = run_stage(post, route_queries, args.warmup, args.mem_samples)
+    server.shutdown()
+
+    result = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'history': args.history,
+            'kb': args.kb,
+            'queries': args.queries,
+            'stub_latency_ms': args.stub_latency_ms,
+            'llm_path': 'openai-stub' if llm_classifier.OPENAI_AVAILABLE else 'rule-based (openai not installed)',
+            'stub_calls': stub_state.calls,
+            'index_build_s': index_build_s,
+        },
+        'stages': stages,
+    }
+
+    print(f"history={args.history} kb={args.kb} queries={args.queries} "
+          f"index_build={index_build_s:.2f}s llm={result['meta']['llm_path']}")
+    print(f"{'stage':22s} {'ops/s':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'peak MB':>8s}")
+    for name, st in stages.items():
+        print(f"{name:22s} {st['throughput_per_s']:9.1f} {st['p50_ms']:9.3f} {st['p95_ms']:9.3f} "
+              f"{st['p99_ms']:9.3f} {st['peak_mem_mb']:8.2f}")
+
+    out = args.output or os.path.join(RESULTS_DIR, f"{result['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print("Saved", out)
+
+    if args.compare:
+        regressions = compare(result, args.compare, args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
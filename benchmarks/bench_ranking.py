@@ -0,0 +1,92 @@
+"""
+Similar-ticket ranking benchmark: latency, candidates scanned and hit-rate.
+
+Builds a synthetic categorised history (see bench_pipeline.py) and compares
+find_similar_tickets in three modes:
+
+    cosine        TF-IDF cosine over every ticket (the previous behaviour)
+    hybrid        cosine + BM25 fusion over every ticket
+    hybrid+shard  fusion, searching the predicted category's shard first
+                  (rule-based classifier prediction, falls back to global)
+
+hit-rate@k is the share of returned tickets whose category matches the
+query's true category. Queries mix in words of another category (--noise)
+so the ranking has something to get wrong.
+
+    python benchmarks/bench_ranking.py --history 20000 --queries 300
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def noisy_query(rng, noise, n_words):
+    from bench_pipeline import TOPICS, synth_ticket
+    category, text = synth_ticket(rng, n_words=n_words)
+    other = TOPICS[rng.choice([c for c in TOPICS if c != category])].split()
+    words = [rng.choice(other) if rng.random() < noise else w for w in text.split()]
+    return category, " ".join(words)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--history", type=int, default=10000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--query-words", type=int, default=12, help="words per query ticket (short = harder)")
+    ap.add_argument("--noise", type=float, default=0.4, help="share of query words taken from another category")
+    ap.add_argument("--top-k", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    from bench_pipeline import build_corpus, summarize
+
+    data_dir = tempfile.mkdtemp(prefix="ticket-rank-")
+    build_corpus(data_dir, args.history, 1, args.seed)
+    os.environ["TICKET_DATA_DIR"] = data_dir
+
+    import similarity
+    from llm_classifier import _rule_based
+
+    similarity._build_index(limit_rows=args.history)
+    rng = random.Random(args.seed + 1)
+    queries = [noisy_query(rng, args.noise, args.query_words) for _ in range(args.queries)]
+    hybrid_weight = similarity.BM25_WEIGHT
+
+    modes = [
+        ('cosine', 0.0, lambda q: None),
+        ('hybrid', hybrid_weight, lambda q: None),
+        ('hybrid+shard', hybrid_weight, lambda q: _rule_based(q)['category']),
+    ]
+    print(f"history={args.history} queries={args.queries} top_k={args.top_k} "
+          f"shards={len(similarity._shards)} bm25_weight={hybrid_weight}")
+    print(f"{'mode':14s} {'p50 ms':>8s} {'p95 ms':>8s} {'cand/query':>11s} {'hit@k':>7s}  scopes")
+    for name, weight, predict in modes:
+        similarity.BM25_WEIGHT = weight
+        before = similarity.CANDIDATES.value()
+        scopes = {s: similarity.SEARCHES.value(scope=s) for s in ('shard', 'fallback', 'global')}
+        timings, hits, returned = [], 0, 0
+        for true_cat, text in queries:
+            category = predict(text)
+            t0 = time.perf_counter()
+            results = similarity.find_similar_tickets(text, top_k=args.top_k, category=category)
+            timings.append(time.perf_counter() - t0)
+            returned += len(results)
+            # results carry the normalised (aliased) category name
+            hits += sum(1 for r in results if r['category'] == similarity._norm_category(true_cat))
+        st = summarize(timings)
+        scanned = (similarity.CANDIDATES.value() - before) / len(queries)
+        used = {s: similarity.SEARCHES.value(scope=s) - n for s, n in scopes.items()}
+        print(f"{name:14s} {st['p50_ms']:8.3f} {st['p95_ms']:8.3f} {scanned:11.0f} "
+              f"{hits / returned if returned else 0:7.3f}  "
+              + " ".join(f"{s}={n}" for s, n in used.items() if n))
+
+
+if __name__ == "__main__":
+    main()
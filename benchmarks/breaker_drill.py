@@ -0,0 +1,82 @@
+"""
+Fault-injection drill for the OpenAI circuit breaker.
+
+Drives classify_text through phases against the local stub - healthy,
+hard failures, slow responses, recovery - and prints per-phase latency and
+breaker state, showing that calls fall back immediately while the breaker
+is open and that it closes again once the stub is healthy.
+
+    python benchmarks/breaker_drill.py --calls 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--calls", type=int, default=20, help="classify_text calls per phase")
+    ap.add_argument("--slow-ms", type=float, default=1500.0, help="stub latency in the slow phase")
+    args = ap.parse_args()
+
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    import openai_stub
+    server, stub, base_url = openai_stub.start(latency_ms=20)
+
+    os.environ["TICKET_DATA_DIR"] = tempfile.mkdtemp(prefix="ticket-breaker-drill-")
+    os.environ["OPENAI_API_BASE"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    # short timings so the drill finishes quickly
+    os.environ.setdefault("LLM_BREAKER_SLOW_SECONDS", str(args.slow_ms / 2000.0))
+    os.environ.setdefault("LLM_BREAKER_OPEN_SECONDS", "2")
+    os.environ.setdefault("LLM_TIMEOUT_SECONDS", "5")
+
+    import llm_classifier as llm
+    if not llm.OPENAI_AVAILABLE:
+        print("openai (<1.0) is not installed; nothing to drill.")
+        sys.exit(1)
+
+    # (name, stub config, reset breaker first, seconds to wait first)
+    phases = [
+        ("healthy", dict(latency_ms=20, fail_rate=0.0), True, 0),
+        ("failing", dict(latency_ms=20, fail_rate=1.0), True, 0),
+        ("slow", dict(latency_ms=args.slow_ms, fail_rate=0.0), True, 0),
+        ("recovered", dict(latency_ms=20, fail_rate=0.0), False, float(os.environ["LLM_BREAKER_OPEN_SECONDS"]) + 0.2),
+    ]
+    failures = []
+    print(f"{'phase':10s} {'stub calls':>10s} {'mean ms':>8s} {'max ms':>8s} {'short-circuited':>16s}  breaker")
+    for name, cfg, reset, wait_s in phases:
+        if reset:
+            llm.LLM_BREAKER.reset()
+        stub.latency_ms = cfg['latency_ms']
+        stub.fail_rate = cfg['fail_rate']
+        if wait_s:
+            time.sleep(wait_s)
+        calls0 = stub.calls
+        rejected0 = llm.LLM_BREAKER.rejected
+        timings = []
+        for i in range(args.calls):
+            t0 = time.perf_counter()
+            llm.classify_text(f"drill ticket {name} {i}: cannot login")
+            timings.append((time.perf_counter() - t0) * 1000.0)
+        snap = llm.LLM_BREAKER.snapshot()
+        print(f"{name:10s} {stub.calls - calls0:10d} {sum(timings) / len(timings):8.1f} {max(timings):8.1f} "
+              f"{llm.LLM_BREAKER.rejected - rejected0:16d}  {snap['state']} (trips {snap['trips']})")
+        if name in ("failing", "slow") and snap['state'] != 'open':
+            failures.append(f"breaker should be open after the {name} phase")
+        if name == "recovered" and snap['state'] != 'closed':
+            failures.append("breaker should close after recovery")
+    server.shutdown()
+
+    for f in failures:
+        print("FAIL:", f)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
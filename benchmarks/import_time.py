@@ -0,0 +1,79 @@
+"""
+Import-time budget check for app.py.
+
+Imports the app in a fresh interpreter under `python -X importtime`, prints
+the total and the slowest modules, and exits non-zero when the import
+exceeds the budget or pulls in a dependency that should only load on first
+use (pandas, scikit-learn, numpy, scipy, PyPDF2, openai, tiktoken).
+
+The budget is either absolute (--budget-ms) or relative to the import time
+of a baseline module measured on the same machine (--baseline), which keeps
+the check meaningful on slow CI runners.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-ms 300 --top 15
+    python benchmarks/import_time.py --baseline flask_cors --factor 2 --repeat 3
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFERRED = ('pandas', 'sklearn', 'numpy', 'scipy', 'PyPDF2', 'openai', 'tiktoken')
+
+
+def measure(module="app"):
+    """Return (total_us, [(self_us, cumulative_us, name)], loaded deferred modules)."""
+    code = (f"import sys; import {module}; "
+            f"print(','.join(m for m in {DEFERRED!r} if m in sys.modules))")
+    env = dict(os.environ, TICKET_DATA_DIR=tempfile.mkdtemp(prefix="ticket-import-"))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cum_us), name.rstrip()))
+    total = next((cum for _, cum, name in rows if name.strip() == module), 0)
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return total, rows, loaded
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--module", default="app")
+    ap.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", "500")))
+    ap.add_argument("--baseline", help="budget relative to this module's import time instead of --budget-ms")
+    ap.add_argument("--factor", type=float, default=float(os.environ.get("IMPORT_BUDGET_FACTOR", "2")),
+                    help="with --baseline, allowed multiple of the baseline import time")
+    ap.add_argument("--repeat", type=int, default=1, help="measure this many times and keep the fastest")
+    ap.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    args = ap.parse_args()
+
+    total, rows, loaded = min((measure(args.module) for _ in range(args.repeat)), key=lambda m: m[0])
+    if args.baseline:
+        baseline = min(measure(args.baseline)[0] for _ in range(args.repeat))
+        args.budget_ms = args.factor * baseline / 1000.0
+        print(f"import {args.baseline}: {baseline / 1000.0:.1f} ms (baseline)")
+    print(f"import {args.module}: {total / 1000.0:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"{'self ms':>9s} {'cum ms':>9s}  module")
+    for self_us, cum_us, name in sorted(rows, key=lambda r: r[0], reverse=True)[:args.top]:
+        print(f"{self_us / 1000.0:9.1f} {cum_us / 1000.0:9.1f}  {name.strip()}")
+
+    failed = False
+    if total / 1000.0 > args.budget_ms:
+        print(f"FAIL: import took {total / 1000.0:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if loaded:
+        print("FAIL: loaded at import time, should be deferred:", ", ".join(loaded))
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Local OpenAI-compatible chat completions server for benchmarks and drills.
+
+    python benchmarks/openai_stub.py --port 8765 --latency-ms 300
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python app.py
+
+Answers every /chat/completions request with a canned JSON answer (a JSON
+array of them for batched "[n]"-numbered prompts) after an artificial delay.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED = {
+    "category": "technical",
+    "tags": ["bug"],
+    "suggested_priority": "Medium",
+    "solution": "Clear cache, update the app and collect logs.",
+    "confidence": 0.8,
+    "title": "Troubleshooting guide",
+    "content": "1. Clear cache. 2. Update the app. 3. Collect logs and contact support."
+}
+
+
+class StubState:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, fail_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fail_rate = fail_rate
+        self.calls = 0
+        self.prompt_chars = 0
+        self.lock = threading.Lock()
+
+
+def _completion(content):
+    return {
+        "id": "stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "stub",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    }
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                payload = {}
+            prompt = " ".join(str(m.get("content", "")) for m in payload.get("messages", []))
+            with state.lock:
+                state.calls += 1
+                state.prompt_chars += len(prompt)
+
+            delay = state.latency_ms + random.uniform(0, state.jitter_ms)
+            if delay:
+                time.sleep(delay / 1000.0)
+            if state.fail_rate and random.random() < state.fail_rate:
+                self.send_response(500)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(json.dumps({"error": {"message": "injected failure"}}).encode())
+                return
+
+            # batched prompts number their tickets as "[n]"
+            n_items = len(re.findall(r"^\[\d+\]", prompt, flags=re.MULTILINE))
+            if n_items:
+                content = json.dumps([dict(CANNED, index=i) for i in range(n_items)])
+            else:
+                content = json.dumps(CANNED)
+            out = json.dumps(_completion(content)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+    return Handler
+
+
+def start(port=0, latency_ms=0.0, jitter_ms=0.0, fail_rate=0.0):
+    """Start the stub in a daemon thread; returns (server, state, base_url)."""
+    state = StubState(latency_ms, jitter_ms, fail_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    server, _, url = start(args.port, args.latency_ms, args.jitter_ms, args.fail_rate)
+    print("OpenAI stub listening on", url)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
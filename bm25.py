@@ -0,0 +1,247 @@
+"""
+Inverted-index BM25F engine for short multi-field documents (KB articles).
+
+Each term has a postings list of document numbers stored as delta-encoded
+unsigned ints in an array('I'), with per-field term frequencies in parallel
+array('H')s and a skip list holding the absolute document number of every
+SKIP_INTERVAL-th posting. Documents can be added and deleted without a rebuild: deletes
+are tombstoned and the postings compacted once enough of them pile up.
+Top-k search uses MaxScore pruning: terms are processed by decreasing score
+upper bound and, once the k-th best score reaches the bound of the remaining
+terms, no new candidates are admitted and hopeless ones are dropped. The
+remaining terms are then only looked up for the surviving candidates, by
+decoding just the skip blocks those candidates fall in.
+"""
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she should so some such than that the
+their theirs them themselves then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+# Compact postings once this share of documents is deleted
+COMPACT_RATIO = 0.25
+# Postings per skip block (a candidate lookup decodes at most one block)
+SKIP_INTERVAL = 64
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if len(t) > 1 and t not in STOP_WORDS]
+
+
+class BM25Index:
+    """
+    BM25F over named fields. weights scale each field's term frequency,
+    b is applied per field against that field's average length.
+    """
+
+    def __init__(self, fields=('title', 'content'), weights=None, k1=1.2, b=0.75):
+        self.fields = tuple(fields)
+        self.weights = tuple((weights or {}).get(f, 1.0) for f in self.fields)
+        self.k1 = k1
+        self.b = b
+        self._vocab = {}          # term -> term number
+        self._postings = []       # term number -> array('I') of doc-number gaps
+        self._last_doc = []       # term number -> last doc number in its postings (for delta encoding)
+        self._skips = []          # term number -> array('I') of doc numbers at every SKIP_INTERVAL-th posting
+        self._tfs = []            # term number -> one array('H') of frequencies per field
+        self._df = []             # term number -> live documents containing it
+        self._max_wtf = []        # term number -> max field-weighted tf seen (score upper bound)
+        self._ids = []            # doc number -> external id (None once deleted)
+        self._lengths = [array('I') for _ in self.fields]
+        self._doc_terms = []      # doc number -> array('I') of its term numbers
+        self._doc_of = {}         # external id -> doc number
+        self._total_len = [0] * len(self.fields)
+        self._deleted = 0
+
+    def __len__(self):
+        return len(self._doc_of)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._doc_of
+
+    def ids(self):
+        return list(self._doc_of)
+
+    # ------------------ updates ------------------ #
+
+    def add(self, doc_id, fields):
+        """Index fields ({name: text}) under doc_id, replacing an existing document with that id."""
+        if doc_id in self._doc_of:
+            self.delete(doc_id)
+        doc = len(self._ids)
+        counts = {}
+        for fi, name in enumerate(self.fields):
+            tokens = tokenize(fields.get(name))
+            self._lengths[fi].append(len(tokens))
+            self._total_len[fi] += len(tokens)
+            for tok in tokens:
+                tf = counts.get(tok)
+                if tf is None:
+                    tf = counts[tok] = [0] * len(self.fields)
+                tf[fi] += 1
+        terms = array('I')
+        for tok, tf in counts.items():
+            t = self._vocab.get(tok)
+            if t is None:
+                t = self._vocab[tok] = len(self._postings)
+                self._postings.append(array('I'))
+                self._last_doc.append(0)
+                self._skips.append(array('I'))
+                self._tfs.append([array('H') for _ in self.fields])
+                self._df.append(0)
+                self._max_wtf.append(0.0)
+            if len(self._postings[t]) % SKIP_INTERVAL == 0:
+                self._skips[t].append(doc)
+            self._postings[t].append(doc - self._last_doc[t])
+            self._last_doc[t] = doc
+            for fi, n in enumerate(tf):
+                self._tfs[t][fi].append(min(n, 65535))
+            self._df[t] += 1
+            self._max_wtf[t] = max(self._max_wtf[t], sum(w * n for w, n in zip(self.weights, tf)))
+            terms.append(t)
+        self._ids.append(doc_id)
+        self._doc_terms.append(terms)
+        self._doc_of[doc_id] = doc
+
+    def delete(self, doc_id):
+        """Remove doc_id; returns False if it is not indexed."""
+        doc = self._doc_of.pop(doc_id, None)
+        if doc is None:
+            return False
+        self._ids[doc] = None
+        for t in self._doc_terms[doc]:
+            self._df[t] -= 1
+        for fi in range(len(self.fields)):
+            self._total_len[fi] -= self._lengths[fi][doc]
+        self._deleted += 1
+        if self._deleted > COMPACT_RATIO * len(self._ids):
+            self._compact()
+        return True
+
+    def _compact(self):
+        """Drop tombstoned documents from the postings and renumber the rest."""
+        remap = {}
+        for doc, doc_id in enumerate(self._ids):
+            if doc_id is not None:
+                remap[doc] = len(remap)
+        for t in range(len(self._postings)):
+            gaps, skips, tfs = array('I'), array('I'), [array('H') for _ in self.fields]
+            last = 0
+            for i, doc in enumerate(accumulate(self._postings[t])):
+                new = remap.get(doc)
+                if new is None:
+                    continue
+                if len(gaps) % SKIP_INTERVAL == 0:
+                    skips.append(new)
+                gaps.append(new - last)
+                last = new
+                for fi in range(len(self.fields)):
+                    tfs[fi].append(self._tfs[t][fi][i])
+            self._postings[t], self._skips[t], self._tfs[t], self._last_doc[t] = gaps, skips, tfs, last
+        keep = sorted(remap)
+        self._ids = [self._ids[d] for d in keep]
+        self._doc_terms = [self._doc_terms[d] for d in keep]
+        self._lengths = [array('I', (lengths[d] for d in keep)) for lengths in self._lengths]
+        self._doc_of = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        self._deleted = 0
+
+    # ------------------ search ------------------ #
+
+    def _lookup(self, t, docs):
+        """(position, doc) for each of the sorted doc numbers docs in t's postings, decoding only their skip blocks."""
+        gaps, skips = self._postings[t], self._skips[t]
+        found, block, block_docs = [], -1, None
+        for doc in docs:
+            j = bisect_right(skips, doc) - 1
+            if j < 0:
+                continue
+            start = j * SKIP_INTERVAL
+            if j != block:
+                block = j
+                block_docs = list(accumulate(gaps[start + 1:start + SKIP_INTERVAL], initial=skips[j]))
+            i = bisect_left(block_docs, doc)
+            if i < len(block_docs) and block_docs[i] == doc:
+                found.append((start + i, doc))
+        return found
+
+    def _idf(self, t):
+        n = len(self._doc_of)
+        return math.log(1 + (n - self._df[t] + 0.5) / (self._df[t] + 0.5))
+
+    def search(self, query, k=3, min_score=0.0, prune=True):
+        """
+        Top-k (doc_id, score) pairs scoring at least min_score, best first,
+        and stats: query terms, fully scored candidates (with how many reach
+        min_score and their mean), postings scored and candidates pruned.
+        """
+        stats = {'terms': 0, 'candidates': 0, 'above_min': 0, 'mean': 0.0, 'postings': 0, 'pruned': 0}
+        n_docs = len(self._doc_of)
+        if not n_docs:
+            return [], stats
+        terms = [t for t in {self._vocab.get(tok) for tok in tokenize(query)} if t is not None and self._df[t] > 0]
+        stats['terms'] = len(terms)
+        if not terms:
+            return [], stats
+
+        k1, b, weights = self.k1, self.b, self.weights
+        avg = [max(total / n_docs, 1e-9) for total in self._total_len]
+        # per-document length normalisation, computed lazily
+        norms = {}
+        bounds = {}
+        for t in terms:
+            # the field length factor is at least (1 - b), which bounds the weighted tf
+            x = self._max_wtf[t] / max(1 - b, 1e-9)
+            bounds[t] = self._idf(t) * x * (k1 + 1) / (x + k1)
+        terms.sort(key=lambda t: bounds[t], reverse=True)
+        remaining = sum(bounds.values())
+
+        acc = {}
+        threshold = min_score
+        admitting = True
+        for t in terms:
+            if prune and len(acc) >= k:
+                threshold = max(min_score, heapq.nlargest(k, acc.values())[-1])
+            if prune and admitting and threshold > 0 and remaining <= threshold:
+                # no document scoring 0 so far can reach the top k any more
+                admitting = False
+            if prune and not admitting:
+                for doc in [d for d, s in acc.items() if s + remaining < threshold]:
+                    del acc[doc]
+                    stats['pruned'] += 1
+                if not acc:
+                    break
+            remaining -= bounds[t]
+
+            idf = self._idf(t)
+            tfs = self._tfs[t]
+            if admitting:
+                postings = enumerate(accumulate(self._postings[t]))
+            else:
+                # only the surviving candidates need this term's contribution
+                postings = self._lookup(t, sorted(acc))
+            for i, doc in postings:
+                if self._ids[doc] is None:
+                    continue
+                norm = norms.get(doc)
+                if norm is None:
+                    norm = norms[doc] = [1 - b + b * self._lengths[fi][doc] / avg[fi] for fi in range(len(weights))]
+                wtf = sum(weights[fi] * tfs[fi][i] / norm[fi] for fi in range(len(weights)))
+                acc[doc] = acc.get(doc, 0.0) + idf * wtf * (k1 + 1) / (wtf + k1)
+                stats['postings'] += 1
+
+        stats['candidates'] = len(acc)
+        stats['above_min'] = sum(1 for s in acc.values() if s >= min_score)
+        stats['mean'] = sum(acc.values()) / len(acc) if acc else 0.0
+        top = heapq.nlargest(k, ((s, d) for d, s in acc.items() if s >= min_score))
+        return [(self._ids[d], s) for s, d in top], stats
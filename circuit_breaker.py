@@ -0,0 +1,125 @@
+import threading
+from collections import deque
+from datetime import datetime
+from time import monotonic
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Error-rate / slow-call circuit breaker.
+
+    closed:    calls pass; the last `window` outcomes are tracked and the
+               breaker opens once at least `min_calls` were seen and the
+               error or slow-call rate reaches its threshold.
+    open:      calls are rejected (allow() is False) for `open_seconds`.
+    half_open: up to `probes` trial calls pass; a healthy one closes the
+               breaker, a failed or slow one opens it again.
+    """
+
+    def __init__(self, name, window=20, min_calls=5, error_rate=0.5,
+                 slow_call_seconds=10.0, slow_rate=0.5, open_seconds=30.0, probes=1):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.probes = probes
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)   # (failed, slow)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probes_in_flight = 0
+        self.trips = 0
+        self.rejected = 0
+        self.last_change = datetime.now().isoformat()
+
+    def _set(self, state):
+        self._state = state
+        self.last_change = datetime.now().isoformat()
+        if state == OPEN:
+            self._opened_at = monotonic()
+            self._probes_in_flight = 0
+            self.trips += 1
+        elif state == CLOSED:
+            self._outcomes.clear()
+            self._opened_at = None
+            self._probes_in_flight = 0
+
+    def allow(self):
+        """True if a call may go to the dependency now."""
+        with self._lock:
+            if self._state == OPEN and monotonic() - self._opened_at >= self.open_seconds:
+                self._set(HALF_OPEN)
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_in_flight < self.probes:
+                self._probes_in_flight += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def _record(self, failed, latency):
+        slow = latency is not None and latency >= self.slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                self._set(OPEN if (failed or slow) else CLOSED)
+                return
+            if self._state == OPEN:
+                return
+            self._outcomes.append((failed, slow))
+            n = len(self._outcomes)
+            if n >= self.min_calls:
+                errors = sum(1 for f, _ in self._outcomes if f) / n
+                slows = sum(1 for _, s in self._outcomes if s) / n
+                if errors >= self.error_rate or slows >= self.slow_rate:
+                    self._set(OPEN)
+
+    def record_success(self, latency=None):
+        self._record(False, latency)
+
+    def record_failure(self, latency=None):
+        self._record(True, latency)
+
+    def reset(self):
+        with self._lock:
+            self._set(CLOSED)
+
+    def _current(self):
+        # an open breaker whose open_seconds have passed lets the next call probe
+        if self._state == OPEN and monotonic() - self._opened_at >= self.open_seconds:
+            return HALF_OPEN
+        return self._state
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current()
+
+    def snapshot(self):
+        with self._lock:
+            n = len(self._outcomes)
+            state = self._current()
+            retry_in = None
+            if state == OPEN:
+                retry_in = self.open_seconds - (monotonic() - self._opened_at)
+            return {
+                'name': self.name,
+                'state': state,
+                'window_calls': n,
+                'error_rate': sum(1 for f, _ in self._outcomes if f) / n if n else 0.0,
+                'slow_rate': sum(1 for _, s in self._outcomes if s) / n if n else 0.0,
+                'retry_in_seconds': retry_in,
+                'trips': self.trips,
+                'rejected': self.rejected,
+                'last_change': self.last_change,
+                'config': {
+                    'window': self.window, 'min_calls': self.min_calls, 'error_rate': self.error_rate,
+                    'slow_call_seconds': self.slow_call_seconds, 'slow_rate': self.slow_rate,
+                    'open_seconds': self.open_seconds
+                }
+            }
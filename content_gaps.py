@@ -0,0 +1,151 @@
+import os
+import threading
+from datetime import datetime
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from file_lock import file_lock
+
+
+BASE_DIR = os.path.dirname(__file__)
+DATA_DIR = os.environ.get("TICKET_DATA_DIR", os.path.join(BASE_DIR, "data"))
+GAP_LOG = os.path.join(DATA_DIR, "content_gaps.csv")
+
+# A gap joins an existing group when its TF-IDF cosine to the group's
+# representative excerpt is at least this high
+CLUSTER_THRESHOLD = float(os.environ.get("GAP_CLUSTER_THRESHOLD", "0.5"))
+
+COLUMNS = ['gap_id', 'first_seen', 'timestamp', 'count', 'ticket_excerpt', 'latest_excerpt']
+
+_lock = threading.Lock()
+_groups = None       # DataFrame of gap groups (one row per distinct problem)
+_mtime = None        # GAP_LOG (mtime_ns, size, inode) _groups was loaded from
+_vectorizer = None
+_matrix = None       # TF-IDF rows aligned with _groups
+
+
+def _refit():
+    global _vectorizer, _matrix
+    if _groups is None or _groups.empty:
+        _vectorizer, _matrix = None, None
+        return
+    _vectorizer = TfidfVectorizer(ngram_range=(1, 2), stop_words='english')
+    try:
+        _matrix = _vectorizer.fit_transform(_groups['ticket_excerpt'].fillna('').astype(str))
+    except ValueError:
+        # only stop words / empty excerpts so far
+        _vectorizer, _matrix = None, None
+
+
+def _match(text):
+    """Index of the group text belongs to, or None."""
+    if _vectorizer is None or _matrix is None:
+        return None
+    sims = cosine_similarity(_vectorizer.transform([text]), _matrix)[0]
+    best = int(sims.argmax())
+    return best if sims[best] >= CLUSTER_THRESHOLD else None
+
+
+def _new_group(text, ts):
+    next_id = int(_groups['gap_id'].max()) + 1 if not _groups.empty else 1
+    return {
+        'gap_id': next_id,
+        'first_seen': ts,
+        'timestamp': ts,
+        'count': 1,
+        'ticket_excerpt': text,
+        'latest_excerpt': text
+    }
+
+
+def _add(text, ts):
+    """Merge one excerpt into the in-memory groups; returns the group row."""
+    global _groups
+    i = _match(text)
+    if i is not None:
+        _groups.at[i, 'count'] = int(_groups.at[i, 'count']) + 1
+        _groups.at[i, 'timestamp'] = ts
+        _groups.at[i, 'latest_excerpt'] = text
+        return _groups.iloc[i].to_dict()
+    row = _new_group(text, ts)
+    _groups = pd.concat([_groups, pd.DataFrame([row])], ignore_index=True)
+    _refit()
+    return row
+
+
+def _load():
+    """(Re)load groups from disk when the file changed; migrates the old one-row-per-ticket log."""
+    global _groups, _mtime
+    if not os.path.exists(GAP_LOG):
+        if _groups is None or _mtime is not None:
+            _groups, _mtime = pd.DataFrame(columns=COLUMNS), None
+            _refit()
+        return
+    if _groups is not None and _stamp() == _mtime:
+        return
+    df = pd.read_csv(GAP_LOG)
+    if 'gap_id' in df.columns:
+        _groups = df.reindex(columns=COLUMNS).reset_index(drop=True)
+        _refit()
+    else:
+        _groups = pd.DataFrame(columns=COLUMNS)
+        _refit()
+        for _, r in df.iterrows():
+            _add(str(r.get('ticket_excerpt', '')), str(r.get('timestamp', '')))
+        _save()
+    _mtime = _stamp()
+
+
+def _stamp():
+    st = os.stat(GAP_LOG)
+    # every save replaces the file, so the inode changes even when mtime and size do not
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def _save():
+    global _mtime
+    tmp = f"{GAP_LOG}.{os.getpid()}.tmp"
+    _groups.to_csv(tmp, index=False)
+    os.replace(tmp, GAP_LOG)
+    _mtime = _stamp()
+
+
+def log_gap(text):
+    """Record a ticket with no KB match, merged into its gap group."""
+    excerpt = (text or "")[:200]
+    with _lock, file_lock(GAP_LOG):
+        _load()
+        row = _add(excerpt, datetime.now().isoformat())
+        _save()
+        return row
+
+
+def load_groups():
+    """All gap groups, most frequent first."""
+    with _lock, file_lock(GAP_LOG):
+        _load()
+        df = _groups.copy()
+    if df.empty:
+        return df
+    df['count'] = df['count'].astype(int)
+    return df.sort_values(['count', 'timestamp'], ascending=False).reset_index(drop=True)
+
+
+def get_groups(gap_ids):
+    """Gap group rows (dicts) for the given ids, in the given order."""
+    df = load_groups()
+    by_id = {int(r['gap_id']): r for r in df.to_dict(orient='records')}
+    return [by_id[int(g)] for g in gap_ids if int(g) in by_id]
+
+
+def remove_groups(gap_ids):
+    """Drop resolved gap groups (e.g. once a KB article covers them)."""
+    global _groups
+    ids = {int(g) for g in gap_ids}
+    with _lock, file_lock(GAP_LOG):
+        _load()
+        if _groups.empty:
+            return
+        _groups = _groups[~_groups['gap_id'].astype(int).isin(ids)].reset_index(drop=True)
+        _refit()
+        _save()
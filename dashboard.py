@@ -1,13 +1,11 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import datetime
 import requests
-import json
-import os
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
+import analytics_store
 
 # Configuration
 FLASK_API_URL = "http://localhost:5000"  # Your Flask app URL
@@ -85,64 +83,46 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 class TicketAnalytics:
-    def __init__(self, data_dir="data"):
-        self.data_dir = data_dir
-        self.feedback_csv = os.path.join(data_dir, "feedback.csv")
-        self.gaps_csv = os.path.join(data_dir, "content_gaps.csv")
-        self.kb_csv = os.path.join(data_dir, "knowledge_base.csv")
-        self.logs_jsonl = os.path.join(data_dir, "llm_logs.jsonl")
-    
-    def load_feedback_data(self):
-        """Load and process feedback data"""
-        if not os.path.exists(self.feedback_csv):
-            return pd.DataFrame()
-        
-        df = pd.read_csv(self.feedback_csv)
-        # Clean the data
-        if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-        return df
-    
-    def load_gaps_data(self):
-        """Load content gaps data"""
-        if not os.path.exists(self.gaps_csv):
-            return pd.DataFrame()
-        
-        df = pd.read_csv(self.gaps_csv)
-        if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-        return df
-    
-    def load_kb_data(self):
-        """Load knowledge base data"""
-        if not os.path.exists(self.kb_csv):
-            return pd.DataFrame()
-        
-        df = pd.read_csv(self.kb_csv)
-        return df
-    
-    def load_logs_data(self):
-        """Load LLM logs data"""
-        if not os.path.exists(self.logs_jsonl):
-            return pd.DataFrame()
-        
-        logs = []
-        with open(self.logs_jsonl, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    logs.append(json.loads(line))
-                except:
-                    continue
-        
-        return pd.DataFrame(logs)
+    """
+    Dashboard queries against analytics_store (data/analytics.db), so a rerun
+    costs a handful of aggregate queries and one page of rows instead of
+    reading every CSV into a DataFrame.
+    """
+    def __init__(self, api_url=FLASK_API_URL):
+        self.api_url = api_url
+        analytics_store.sync()
+
+    def date_bounds(self):
+        first, last = analytics_store.date_bounds('feedback')
+        if first is None:
+            return None, None
+        return datetime.strptime(first, '%Y-%m-%d').date(), datetime.strptime(last, '%Y-%m-%d').date()
 
-def create_category_chart(df):
+    def counts(self, column, start=None, end=None):
+        rows = analytics_store.counts('feedback', column, start, end)
+        return pd.DataFrame(rows, columns=['value', 'Count'])
+
+    def timeline(self, start=None, end=None):
+        return pd.DataFrame(analytics_store.timeline('feedback', start, end), columns=['Date', 'Count'])
+
+    def tag_counts(self, start=None, end=None):
+        return dict(analytics_store.tag_counts(start, end))
+
+    def page(self, table, start=None, end=None, page=1, page_size=50):
+        return pd.DataFrame(analytics_store.page(table, start, end, (page - 1) * page_size, page_size),
+                            columns=analytics_store.columns(table))
+
+    def export_url(self, table, start=None, end=None):
+        """Flask endpoint that streams the table as CSV."""
+        query = f"?start={start}&end={end}" if start and end else ""
+        return f"{self.api_url}/admin/api/export/{table}.csv{query}"
+
+def create_category_chart(counts):
     """Create bar chart for ticket categories"""
-    if df.empty or 'final_category' not in df.columns:
+    if counts.empty:
         return None
     
-    category_counts = df['final_category'].value_counts().reset_index()
-    category_counts.columns = ['Category', 'Count']
+    category_counts = counts.rename(columns={'value': 'Category'})
     
     fig = px.bar(
         category_counts,
@@ -159,13 +139,12 @@ def create_category_chart(df):
     )
     return fig
 
-def create_priority_chart(df):
+def create_priority_chart(counts):
     """Create pie chart for priority distribution"""
-    if df.empty or 'final_priority' not in df.columns:
+    if counts.empty:
         return None
     
-    priority_counts = df['final_priority'].value_counts().reset_index()
-    priority_counts.columns = ['Priority', 'Count']
+    priority_counts = counts.rename(columns={'value': 'Priority'})
     
     # Define color mapping for priorities
     color_map = {
@@ -186,27 +165,19 @@ def create_priority_chart(df):
     fig.update_traces(textposition='inside', textinfo='percent+label')
     return fig
 
-def create_tags_wordcloud(df):
+def create_tags_wordcloud(tag_counts):
     """Create word cloud for most frequent tags"""
-    if df.empty or 'final_tags' not in df.columns:
-        return None
-    
-    # Combine all tags
-    all_tags = ' '.join(df['final_tags'].dropna().astype(str))
-    if not all_tags.strip():
+    if not tag_counts:
         return None
     
-    # Clean and process tags
-    tags_clean = all_tags.replace(',', ' ').replace(';', ' ')
-    
-    # Create word cloud
+    # Create word cloud from the aggregated tag frequencies
     wordcloud = WordCloud(
         width=800,
         height=400,
         background_color='white',
         colormap='viridis',
         max_words=50
-    ).generate(tags_clean)
+    ).generate_from_frequencies(tag_counts)
     
     # Display using matplotlib
     fig, ax = plt.subplots(figsize=(10, 5))
@@ -216,16 +187,11 @@ def create_tags_wordcloud(df):
     
     return fig
 
-def create_timeline_chart(df):
+def create_timeline_chart(timeline_data):
     """Create line chart for tickets over time"""
-    if df.empty or 'timestamp' not in df.columns:
+    if timeline_data.empty:
         return None
     
-    # Group by date
-    df['date'] = df['timestamp'].dt.date
-    timeline_data = df.groupby('date').size().reset_index()
-    timeline_data.columns = ['Date', 'Count']
-    
     fig = px.line(
         timeline_data,
         x='Date',
@@ -245,49 +211,51 @@ def create_gaps_table(df):
         return None
     
     # Select relevant columns and format
-    display_cols = ['timestamp', 'ticket_excerpt']
+    display_cols = ['timestamp', 'count', 'ticket_excerpt']
     available_cols = [col for col in display_cols if col in df.columns]
     
     gaps_display = df[available_cols].copy()
     if 'timestamp' in gaps_display.columns:
-        gaps_display['timestamp'] = gaps_display['timestamp'].dt.strftime('%Y-%m-%d %H:%M')
+        gaps_display['timestamp'] = pd.to_datetime(gaps_display['timestamp'], errors='coerce').dt.strftime('%Y-%m-%d %H:%M')
     
     return gaps_display
 
+def show_page(analytics, table, label, start=None, end=None, page_size=50):
+    """Paginated table plus a streamed CSV download link; returns False when the table is empty."""
+    total = analytics_store.count(table, start, end)
+    if total == 0:
+        return False
+    pages = max((total + page_size - 1) // page_size, 1)
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"page_{table}")
+    st.dataframe(analytics.page(table, start, end, page, page_size), use_container_width=True, hide_index=True)
+    st.caption(f"{total} rows")
+    st.markdown(f"[📥 Download {label}]({analytics.export_url(table, start, end)})")
+    return True
+
 def main():
     # Header
     st.markdown('<h1 class="main-header">🎫 AI Ticket System Analytics Dashboard</h1>', unsafe_allow_html=True)
     
-    # Initialize analytics
-    analytics = TicketAnalytics()
-    
-    # Load data
+    # Initialize analytics (syncs the store with the CSVs)
     with st.spinner('Loading data...'):
-        feedback_df = analytics.load_feedback_data()
-        gaps_df = analytics.load_gaps_data()
-        kb_df = analytics.load_kb_data()
+        analytics = TicketAnalytics()
     
     # Sidebar filters
     st.sidebar.title("🔧 Filters")
     
-    # Date range filter
-    if not feedback_df.empty and 'timestamp' in feedback_df.columns:
-      start_default = feedback_df['timestamp'].min().date()
-      end_default = datetime.today().date()
-
-      date_range = st.sidebar.date_input(
-        "Date Range",
-        value=(start_default, end_default),
-        min_value=start_default,
-        max_value=end_default
-      )
-
-    if len(date_range) == 2:
-        start_date, end_date = date_range
-        feedback_df = feedback_df[
-            (feedback_df['timestamp'].dt.date >= start_date) & 
-            (feedback_df['timestamp'].dt.date <= end_date)
-        ]
+    # Date range filter (applied in the SQL queries)
+    start_date, end_date = None, None
+    first_day, last_day = analytics.date_bounds()
+    if first_day is not None:
+        end_default = max(datetime.today().date(), last_day)
+        date_range = st.sidebar.date_input(
+            "Date Range",
+            value=(first_day, end_default),
+            min_value=first_day,
+            max_value=end_default
+        )
+        if len(date_range) == 2:
+            start_date, end_date = date_range
 
     
     # Key Metrics
@@ -296,36 +264,30 @@ def main():
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_tickets = len(feedback_df) if not feedback_df.empty else 0
-        st.metric("Total Tickets", total_tickets)
+        st.metric("Total Tickets", analytics_store.count('feedback', start_date, end_date))
     
     with col2:
-        content_gaps = len(gaps_df) if not gaps_df.empty else 0
-        st.metric("Content Gaps", content_gaps)
+        st.metric("Content Gaps", analytics_store.gap_totals()[0])
     
     with col3:
-        kb_articles = len(kb_df) if not kb_df.empty else 0
-        st.metric("KB Articles", kb_articles)
+        st.metric("KB Articles", analytics_store.count('kb'))
     
     with col4:
-        if not feedback_df.empty and 'final_priority' in feedback_df.columns:
-            high_priority = len(feedback_df[feedback_df['final_priority'] == 'High'])
-            st.metric("High Priority Tickets", high_priority)
-        else:
-            st.metric("High Priority Tickets", 0)
+        st.metric("High Priority Tickets",
+                  analytics_store.count('feedback', start_date, end_date, final_priority='High'))
     
     # Charts Row 1
     col1, col2 = st.columns(2)
     
     with col1:
-        category_chart = create_category_chart(feedback_df)
+        category_chart = create_category_chart(analytics.counts('final_category', start_date, end_date))
         if category_chart:
             st.plotly_chart(category_chart, use_container_width=True)
         else:
             st.info("No category data available")
     
     with col2:
-        priority_chart = create_priority_chart(feedback_df)
+        priority_chart = create_priority_chart(analytics.counts('final_priority', start_date, end_date))
         if priority_chart:
             st.plotly_chart(priority_chart, use_container_width=True)
         else:
@@ -335,22 +297,22 @@ def main():
     col1, col2 = st.columns(2)
     
     with col1:
-        timeline_chart = create_timeline_chart(feedback_df)
+        timeline_chart = create_timeline_chart(analytics.timeline(start_date, end_date))
         if timeline_chart:
             st.plotly_chart(timeline_chart, use_container_width=True)
         else:
             st.info("No timeline data available")
     
     with col2:
-        tags_wordcloud = create_tags_wordcloud(feedback_df)
+        tags_wordcloud = create_tags_wordcloud(analytics.tag_counts(start_date, end_date))
         if tags_wordcloud:
             st.pyplot(tags_wordcloud)
         else:
             st.info("No tags data available")
     
-    # Content Gaps Table
+    # Content Gaps Table (most frequent groups)
     st.subheader("📋 Content Gaps (Missing KB Articles)")
-    gaps_table = create_gaps_table(gaps_df)
+    gaps_table = create_gaps_table(analytics.page('gaps', page_size=100))
     if gaps_table is not None and not gaps_table.empty:
         st.dataframe(
             gaps_table,
@@ -358,57 +320,56 @@ def main():
             hide_index=True
         )
         
-        # Download button for gaps data
-        csv_gaps = gaps_df.to_csv(index=False)
-        st.download_button(
-            label="📥 Download Content Gaps Data",
-            data=csv_gaps,
-            file_name="content_gaps.csv",
-            mime="text/csv"
-        )
+        # Download link for gaps data (streamed by the Flask app)
+        st.markdown(f"[📥 Download Content Gaps Data]({analytics.export_url('gaps')})")
     else:
         st.info("No content gaps recorded yet")
     
-    # Raw Data Section
+    # Bulk re-classification runs (reclassify.py)
+    st.subheader("🔁 Bulk Re-classification")
+    import reclassify
+    runs = reclassify.list_runs()
+    if runs:
+        run_name = st.selectbox("Run", runs, index=len(runs) - 1)
+        # running counts kept in the run's checkpoint; the part files are not read
+        report = reclassify.report(run_name)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Rows Classified", report['rows'])
+        with col2:
+            st.metric("Labelled Rows", report['labelled'])
+        with col3:
+            st.metric("Agreement with Labels",
+                      f"{report['accuracy']:.1%}" if report['accuracy'] is not None else "n/a")
+        if report['aliases']:
+            st.caption("Predictions count as agreeing through the category aliases: "
+                       + ", ".join(f"{k} → {v}" for k, v in sorted(report['aliases'].items())))
+        if report['rows']:
+            counts = pd.Series(report['categories']).sort_values(ascending=False)
+            fig = px.bar(x=counts.index, y=counts.values, title="Predicted Categories",
+                         labels={'x': 'Category', 'y': 'Tickets'})
+            st.plotly_chart(fig, use_container_width=True)
+            crosstab = pd.DataFrame(report['crosstab']).T.fillna(0).astype(int)
+            st.dataframe(crosstab.sort_index().sort_index(axis=1), use_container_width=True)
+    else:
+        st.info("No re-classification runs yet (python reclassify.py)")
+
+    # Raw Data Section (one page at a time)
     st.subheader("📁 Raw Data Preview")
     
     tab1, tab2, tab3 = st.tabs(["Feedback Data", "Content Gaps", "Knowledge Base"])
     
     with tab1:
-        if not feedback_df.empty:
-            st.dataframe(feedback_df, use_container_width=True)
-            
-            # Download button for feedback data
-            csv_feedback = feedback_df.to_csv(index=False)
-            st.download_button(
-                label="📥 Download Feedback Data",
-                data=csv_feedback,
-                file_name="feedback_data.csv",
-                mime="text/csv"
-            )
-        else:
+        if not show_page(analytics, 'feedback', "Feedback Data", start_date, end_date):
             st.info("No feedback data available")
     
     with tab2:
-        if not gaps_df.empty:
-            st.dataframe(gaps_df, use_container_width=True)
-        else:
+        if not show_page(analytics, 'gaps', "Content Gaps Data"):
             st.info("No content gaps data available")
     
     with tab3:
-        if not kb_df.empty:
-            st.dataframe(kb_df, use_container_width=True)
-            
-            # Download button for KB data
-            csv_kb = kb_df.to_csv(index=False)
-            st.download_button(
-                label="📥 Download KB Data",
-                data=csv_kb,
-                file_name="knowledge_base.csv",
-                mime="text/csv"
-            )
-        else:
+        if not show_page(analytics, 'kb', "KB Data"):
             st.info("No knowledge base data available")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,49 @@
+"""Cross-process exclusive lock on a sidecar "<path>.lock" file.
+
+Used by modules that rewrite a shared file under data/ (gap log, online model,
+profile index) so web, job and KB workers do not lose each other's updates.
+flock on POSIX, msvcrt byte-range locking on Windows.
+"""
+import os
+from contextlib import contextmanager
+from time import sleep
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+def _acquire(fh):
+    if fcntl is not None:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            # LK_LOCK itself gives up after ~10 s of retries; keep waiting like flock does
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            sleep(0.1)
+
+
+def _release(fh):
+    if fcntl is not None:
+        fcntl.flock(fh, fcntl.LOCK_UN)
+    else:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path + ".lock" for the duration of the block."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + ".lock", 'a') as fh:
+        _acquire(fh)
+        try:
+            yield
+        finally:
+            _release(fh)
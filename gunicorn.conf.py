@@ -0,0 +1,26 @@
+"""
+gunicorn settings; picked up automatically when gunicorn starts in this directory.
+
+With PRELOAD_INDEX=1 the app is imported in the master and the similarity/KB
+indexes are built there before workers fork, so every worker starts warm and
+shares the index pages copy-on-write. Without it each worker imports the heavy
+dependencies and builds its indexes on the first request that needs them.
+"""
+import os
+
+# workers, timeout etc. keep gunicorn's defaults (or its own flags / GUNICORN_CMD_ARGS)
+preload_app = os.environ.get("PRELOAD_INDEX", "0") == "1"
+
+
+def when_ready(server):
+    # runs in the master after the app is loaded and before workers are spawned
+    if not preload_app:
+        return
+    import time
+    import app
+    t0 = time.perf_counter()
+    try:
+        app.warm_up()
+        server.log.info("Indexes preloaded in %.1fs", time.perf_counter() - t0)
+    except Exception as e:
+        server.log.warning("Index preload failed: %s", e)
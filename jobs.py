@@ -0,0 +1,235 @@
+"""
+SQLite-backed analysis job queue and its worker processes.
+
+The web app enqueues uploads (POST /jobs) and answers polls (GET /jobs/<id>);
+workers started with
+
+    python jobs.py --workers 4
+
+claim queued jobs, run the /analyze pipeline and store the result. A worker
+refreshes its running job's heartbeat while the job runs; a running job whose
+heartbeat stopped (the worker died) is requeued for another worker.
+"""
+import os
+import io
+import json
+import signal
+import sqlite3
+import argparse
+import multiprocessing
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from time import sleep
+
+BASE_DIR = os.path.dirname(__file__)
+DATA_DIR = os.environ.get("TICKET_DATA_DIR", os.path.join(BASE_DIR, "data"))
+os.makedirs(DATA_DIR, exist_ok=True)
+DB_PATH = os.path.join(DATA_DIR, "jobs.db")
+
+# Queued + running jobs accepted before POST /jobs answers 503
+QUEUE_MAX = int(os.environ.get("JOB_QUEUE_MAX", "100"))
+WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+RETRY_AFTER = int(os.environ.get("JOB_RETRY_AFTER", "5"))
+# Workers refresh a running job's heartbeat this often ...
+HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", "10"))
+# ... and a running job without one for this long is assumed orphaned by a dead worker and requeued
+STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", "60"))
+# Finished jobs are deleted after this long
+RETENTION_HOURS = int(os.environ.get("JOB_RETENTION_HOURS", "24"))
+POLL_INTERVAL = 0.5
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            filename TEXT,
+            payload BLOB,
+            result TEXT,
+            error TEXT,
+            worker TEXT,
+            created_at TEXT,
+            started_at TEXT,
+            finished_at TEXT,
+            heartbeat_at TEXT
+        )""")
+    if 'heartbeat_at' not in {r['name'] for r in conn.execute("PRAGMA table_info(jobs)")}:
+        # jobs.db created before heartbeats
+        conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created_at)")
+    return conn
+
+
+def enqueue(filename, data):
+    """Store an upload as a queued job and return its id; raises QueueFull."""
+    now = datetime.now()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        depth = conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+        if depth >= QUEUE_MAX:
+            conn.execute("ROLLBACK")
+            raise QueueFull()
+        job_id = uuid.uuid4().hex[:16]
+        conn.execute(
+            "INSERT INTO jobs (id, status, filename, payload, created_at) VALUES (?, 'queued', ?, ?, ?)",
+            (job_id, filename, sqlite3.Binary(data), now.isoformat()))
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            ((now - timedelta(hours=RETENTION_HOURS)).isoformat(),))
+        conn.execute("COMMIT")
+        return job_id
+    finally:
+        conn.close()
+
+
+def get(job_id):
+    """Job status dict (with result once done), or None."""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT id, status, filename, result, error, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+            (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['job_id'] = job.pop('id')
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        if job['status'] == 'queued':
+            job['queue_position'] = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at <= ?",
+                (job['created_at'],)).fetchone()[0]
+        return job
+    finally:
+        conn.close()
+
+
+def depth():
+    conn = _connect()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _claim(conn, worker):
+    conn.execute("BEGIN IMMEDIATE")
+    now = datetime.now()
+    stale = (now - timedelta(seconds=STALE_SECONDS)).isoformat()
+    conn.execute(
+        "UPDATE jobs SET status = 'queued', worker = NULL "
+        "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < ?", (stale,))
+    row = conn.execute(
+        "SELECT id, filename, payload FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+    if row is None:
+        conn.execute("COMMIT")
+        return None
+    conn.execute(
+        "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+        (worker, now.isoformat(), now.isoformat(), row['id']))
+    conn.execute("COMMIT")
+    return row
+
+
+@contextmanager
+def _heartbeat(job_id):
+    """Refresh job_id's heartbeat every HEARTBEAT_SECONDS from a side thread while the block runs."""
+    done = threading.Event()
+
+    def beat():
+        conn = _connect()
+        try:
+            while not done.wait(HEARTBEAT_SECONDS):
+                try:
+                    conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                                 (datetime.now().isoformat(), job_id))
+                except sqlite3.Error as e:
+                    print("Job heartbeat failed:", e)
+        finally:
+            conn.close()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+def _finish(conn, job_id, result=None, error=None):
+    conn.execute(
+        "UPDATE jobs SET status = ?, result = ?, error = ?, payload = NULL, finished_at = ? WHERE id = ?",
+        ('failed' if error else 'done', json.dumps(result) if result is not None else None,
+         error, datetime.now().isoformat(), job_id))
+
+
+def _process(filename, data):
+    from werkzeug.datastructures import FileStorage
+    from app import analyze_upload
+    response = analyze_upload(FileStorage(stream=io.BytesIO(data), filename=filename), data)
+    if response is None:
+        raise ValueError('Could not read text from file')
+    return response
+
+
+def worker_loop():
+    """Claim and run jobs until SIGTERM/SIGINT."""
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *a: stopping.append(True))
+    name = f"{os.uname().nodename}:{os.getpid()}" if hasattr(os, 'uname') else str(os.getpid())
+    conn = _connect()
+    print(f"Job worker {name} started")
+    try:
+        while not stopping:
+            job = _claim(conn, name)
+            if job is None:
+                sleep(POLL_INTERVAL)
+                continue
+            try:
+                with _heartbeat(job['id']):
+                    result = _process(job['filename'], bytes(job['payload']))
+                _finish(conn, job['id'], result=result)
+            except Exception as e:
+                _finish(conn, job['id'], error=str(e))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+
+def start_workers(n=WORKERS):
+    """Start n worker processes; returns them."""
+    ctx = multiprocessing.get_context('spawn')
+    procs = [ctx.Process(target=worker_loop, daemon=True) for _ in range(n)]
+    for p in procs:
+        p.start()
+    return procs
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description="Run analysis job workers")
+    ap.add_argument("--workers", type=int, default=WORKERS, help="worker processes (JOB_WORKERS)")
+    args = ap.parse_args()
+    _connect().close()
+    procs = start_workers(args.workers)
+
+    def _stop(*_):
+        for p in procs:
+            p.terminate()
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        _stop()
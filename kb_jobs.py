@@ -0,0 +1,170 @@
+import os
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from time import time, sleep
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+import content_gaps
+import similarity
+from llm_classifier import generate_kb_article
+
+BASE_DIR = os.path.dirname(__file__)
+DATA_DIR = os.environ.get("TICKET_DATA_DIR", os.path.join(BASE_DIR, "data"))
+KB_PATH = os.path.join(DATA_DIR, "knowledge_base.csv")
+# one JSON status file per job so any worker process can answer polls
+JOBS_DIR = os.path.join(DATA_DIR, "kb_jobs")
+
+# Concurrent LLM calls per job and overall request rate towards the LLM
+MAX_WORKERS = int(os.environ.get("KB_JOB_WORKERS", "4"))
+RATE_PER_MIN = float(os.environ.get("KB_JOB_RATE_PER_MIN", "30"))
+# Generated articles this similar to an existing (or earlier batch) article are skipped
+DEDUP_THRESHOLD = float(os.environ.get("KB_DEDUP_THRESHOLD", "0.8"))
+
+# Jobs run one at a time; articles inside a job are generated concurrently
+_runner = ThreadPoolExecutor(max_workers=1)
+_lock = threading.Lock()
+
+
+class _RateLimiter:
+    """Spaces calls at least 60/rate_per_min seconds apart across threads."""
+
+    def __init__(self, rate_per_min):
+        self.interval = 60.0 / rate_per_min if rate_per_min > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            sleep(slot - now)
+
+
+_limiter = _RateLimiter(RATE_PER_MIN)
+
+
+def _job_path(job_id):
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _save(job):
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    tmp = _job_path(job['job_id']) + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(job, f)
+    os.replace(tmp, _job_path(job['job_id']))
+
+
+def get_job(job_id):
+    """Job status dict, or None for unknown ids."""
+    safe = "".join(c for c in str(job_id) if c.isalnum())
+    path = _job_path(safe)
+    if not safe or not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def submit(gap_ids):
+    """Queue KB generation for the given gap groups; returns the job dict."""
+    groups = content_gaps.get_groups(gap_ids)
+    job = {
+        'job_id': uuid.uuid4().hex[:12],
+        'status': 'queued',
+        'created_at': datetime.now().isoformat(),
+        'finished_at': None,
+        'total': len(groups),
+        'completed': 0,
+        'created': [],       # article ids appended to the KB
+        'duplicates': [],    # gap ids whose article matched existing content
+        'failed': [],        # gap ids the LLM could not write an article for
+        'error': None
+    }
+    _save(job)
+    _runner.submit(_run, job, groups)
+    return job
+
+
+def _generate(job, group):
+    _limiter.wait()
+    article = generate_kb_article(str(group['ticket_excerpt']))
+    with _lock:
+        job['completed'] += 1
+        _save(job)
+    return article
+
+
+def _dedup(articles):
+    """Keep (group, article) pairs whose content is not already in the KB or earlier in the batch."""
+    if not articles:
+        return [], []
+    existing = []
+    if os.path.exists(KB_PATH):
+        existing = pd.read_csv(KB_PATH)['content'].fillna('').astype(str).tolist()
+    new_texts = [a['content'] for _, a in articles]
+    try:
+        vec = TfidfVectorizer(ngram_range=(1, 2), stop_words='english')
+        m = vec.fit_transform(existing + new_texts)
+    except ValueError:
+        return articles, []
+    n_old = len(existing)
+    sims = cosine_similarity(m[n_old:], m)
+    kept_rows = list(range(n_old))   # existing KB rows + batch rows kept so far
+    keep, dups = [], []
+    for j, pair in enumerate(articles):
+        if kept_rows and sims[j, kept_rows].max() >= DEDUP_THRESHOLD:
+            dups.append(pair)
+        else:
+            keep.append(pair)
+            kept_rows.append(n_old + j)
+    return keep, dups
+
+
+def _run(job, groups):
+    try:
+        job['status'] = 'running'
+        _save(job)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            articles = list(pool.map(lambda g: _generate(job, g), groups))
+
+        generated = []
+        for group, article in zip(groups, articles):
+            if article:
+                generated.append((group, article))
+            else:
+                job['failed'].append(int(group['gap_id']))
+
+        kept, dups = _dedup(generated)
+        job['duplicates'] = [int(g['gap_id']) for g, _ in dups]
+
+        if kept:
+            # single append + single reindex for the whole batch
+            base_id = int(time() * 1000)
+            rows = pd.DataFrame([{
+                "article_id": f"KB{base_id + i}",
+                "title": a["title"],
+                "content": a["content"],
+                "link": "#"
+            } for i, (_, a) in enumerate(kept)])
+            if not os.path.exists(KB_PATH):
+                rows.to_csv(KB_PATH, index=False)
+            else:
+                rows.to_csv(KB_PATH, mode="a", header=False, index=False)
+            similarity.reload_kb_index()
+            content_gaps.remove_groups([g['gap_id'] for g, _ in kept])
+            job['created'] = rows['article_id'].tolist()
+
+        job['status'] = 'done'
+    except Exception as e:
+        job['status'] = 'failed'
+        job['error'] = str(e)
+    job['finished_at'] = datetime.now().isoformat()
+    with _lock:
+        _save(job)
@@ -0,0 +1,159 @@
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+# Seconds; covers sub-millisecond lookups up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_registry = {}   # name -> metric, in registration order
+
+
+def _key(labelnames, labels):
+    return tuple(str(labels.get(n, '')) for n in labelnames)
+
+
+def _fmt_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key)) + (extra or [])
+    if not pairs:
+        return ''
+    body = ",".join('{}="{}"'.format(n, str(v).replace('\\', '\\\\').replace('"', '\\"')) for n, v in pairs)
+    return '{' + body + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_key(self.labelnames, labels), 0)
+
+    def _lines(self):
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {v}" for k, v in sorted(self._values.items())]
+
+    def _snapshot(self):
+        return {",".join(k) or 'total': v for k, v in sorted(self._values.items())}
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with _lock:
+            self._values[_key(self.labelnames, labels)] = value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}   # key -> [bucket counts..., +Inf count], sum
+
+    def observe(self, value, **labels):
+        key = _key(self.labelnames, labels)
+        i = bisect_left(self.buckets, value)
+        with _lock:
+            counts, total = self._series.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[i] += 1
+            self._series[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - t0, **labels)
+
+    def _quantile(self, counts, q):
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        n = sum(counts)
+        if not n:
+            return 0.0
+        rank, seen, lower = q * n, 0, 0.0
+        for i, c in enumerate(counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+            if seen + c >= rank and c:
+                return lower + (upper - lower) * (rank - seen) / c
+            seen += c
+            lower = upper
+        return self.buckets[-1]
+
+    def _lines(self):
+        out = []
+        for key, (counts, total) in sorted(self._series.items()):
+            cum = 0
+            for b, c in zip(self.buckets, counts):
+                cum += c
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, [('le', b)])} {cum}")
+            cum += counts[-1]
+            out.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, [('le', '+Inf')])} {cum}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {total}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {cum}")
+        return out
+
+    def _snapshot(self):
+        snap = {}
+        for key, (counts, total) in sorted(self._series.items()):
+            n = sum(counts)
+            snap[",".join(key) or 'total'] = {
+                'count': n,
+                'mean_ms': total / n * 1000.0 if n else 0.0,
+                'p50_ms': self._quantile(counts, 0.50) * 1000.0,
+                'p95_ms': self._quantile(counts, 0.95) * 1000.0,
+                'p99_ms': self._quantile(counts, 0.99) * 1000.0,
+            }
+        return snap
+
+
+def _register(cls, name, help, labelnames, **kw):
+    with _lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, help, labelnames, **kw)
+        return metric
+
+
+def counter(name, help, labelnames=()):
+    return _register(Counter, name, help, labelnames)
+
+
+def gauge(name, help, labelnames=()):
+    return _register(Gauge, name, help, labelnames)
+
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, help, labelnames, buckets=buckets)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for m in list(_registry.values()):
+        lines.append(f"# HELP {m.name} {m.help}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        with _lock:
+            lines.extend(m._lines())
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    """Summary dict (histograms reduced to count/mean/quantiles) for the admin panel."""
+    with _lock:
+        return {name: m._snapshot() for name, m in _registry.items()}
+
+
+def ratio(hits, misses):
+    total = hits + misses
+    return hits / total if total else None
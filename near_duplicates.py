@@ -0,0 +1,196 @@
+"""
+MinHash near-duplicate clusters of analysed tickets (outage bursts).
+
+Clusters live in data/near_duplicates.db, so every web and job worker adds
+to the same clusters and /admin/api/clusters shows one global view;
+each cluster keeps the analysis of its first ticket for reuse by the next
+near-duplicates. Band keys are indexed in SQLite, so a lookup reads only the
+clusters that share a band with the ticket.
+"""
+import os
+import re
+import json
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+
+BASE_DIR = os.path.dirname(__file__)
+DATA_DIR = os.environ.get("TICKET_DATA_DIR", os.path.join(BASE_DIR, "data"))
+DB_PATH = os.path.join(DATA_DIR, "near_duplicates.db")
+
+# MinHash signature = BANDS * ROWS hash minima. With 16 bands of 4 rows two
+# tickets with Jaccard similarity 0.8 share at least one band ~99.9% of the time.
+BANDS = 16
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+SHINGLE_SIZE = 3
+
+# Estimated Jaccard similarity above which a ticket joins an existing cluster
+DUP_THRESHOLD = float(os.environ.get("NEAR_DUP_THRESHOLD", "0.8"))
+# Least recently hit clusters are dropped beyond this many
+MAX_CLUSTERS = int(os.environ.get("NEAR_DUP_MAX_CLUSTERS", "5000"))
+# A cluster's stored analysis is reused for at most this long, and only while
+# the KB/index version it was computed against is current
+RESULT_TTL_SECONDS = float(os.environ.get("NEAR_DUP_RESULT_TTL_SECONDS", "900"))
+
+_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, 2 ** 31, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 2 ** 31, size=NUM_PERM).astype(np.uint64)
+
+_local = threading.local()   # per-thread connection, reused across requests
+
+
+def _connect():
+    os.makedirs(DATA_DIR, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    # one write per analysed ticket; losing the last few after a power cut only shrinks a cluster
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS clusters (
+            cluster_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            size INTEGER NOT NULL,
+            first_seen TEXT,
+            last_seen TEXT,
+            excerpt TEXT,
+            signature BLOB NOT NULL,
+            result TEXT,
+            version TEXT,
+            result_at TEXT
+        )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS clusters_last_seen ON clusters(last_seen)")
+    conn.execute("CREATE TABLE IF NOT EXISTS bands (key BLOB NOT NULL, cluster_id INTEGER NOT NULL)")
+    conn.execute("CREATE INDEX IF NOT EXISTS bands_key ON bands(key)")
+    conn.execute("CREATE INDEX IF NOT EXISTS bands_cluster ON bands(cluster_id)")
+    return conn
+
+
+@contextmanager
+def _transaction():
+    """This thread's connection inside a write transaction (closing a connection per call checkpoints the WAL)."""
+    if getattr(_local, 'path', None) != DB_PATH:
+        _local.conn, _local.path = _connect(), DB_PATH
+    conn = _local.conn
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _shingles(text):
+    tokens = re.findall(r'[a-z0-9]+', (text or "").lower())
+    if len(tokens) < SHINGLE_SIZE:
+        grams = [" ".join(tokens)] if tokens else []
+    else:
+        grams = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    return np.fromiter({zlib.crc32(g.encode('utf-8')) for g in grams}, dtype=np.uint64)
+
+
+def signature(text):
+    """MinHash signature (NUM_PERM uint64 values) of the word 3-gram set."""
+    sh = _shingles(text)
+    if sh.size == 0:
+        return None
+    hashed = (sh[:, None] * _A[None, :] + _B[None, :]) % _PRIME
+    return hashed.min(axis=0)
+
+
+def _band_keys(sig):
+    # the band number is part of the key, so equal rows in different bands do not collide
+    return [bytes([b]) + sig[b * ROWS:(b + 1) * ROWS].tobytes() for b in range(BANDS)]
+
+
+def _public(row):
+    return {k: row[k] for k in ('cluster_id', 'size', 'first_seen', 'last_seen', 'excerpt')}
+
+
+def lookup(text, version=None):
+    """
+    Find the near-duplicate cluster for text.
+    Returns (cluster, result, sig): cluster is None when no cluster matches;
+    result is None as well when the cluster's analysis is older than
+    RESULT_TTL_SECONDS or was computed against another version. Pass sig (and
+    the cluster id, if any) to register() after running the full pipeline.
+    """
+    sig = signature(text)
+    if sig is None:
+        return None, None, None
+    keys = _band_keys(sig)
+    now = datetime.now()
+    try:
+        with _transaction() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM clusters WHERE cluster_id IN "
+                f"(SELECT cluster_id FROM bands WHERE key IN ({','.join('?' * len(keys))}))", keys).fetchall()
+            best, best_sim = None, 0.0
+            for row in rows:
+                sim = float(np.mean(np.frombuffer(row['signature'], dtype=np.uint64) == sig))
+                if sim > best_sim:
+                    best, best_sim = row, sim
+            if best is None or best_sim < DUP_THRESHOLD:
+                return None, None, sig
+            conn.execute("UPDATE clusters SET size = size + 1, last_seen = ? WHERE cluster_id = ?",
+                         (now.isoformat(), best['cluster_id']))
+    except Exception as e:
+        print("Near-duplicate lookup failed:", e)
+        return None, None, sig
+    cluster = dict(_public(best), size=best['size'] + 1, last_seen=now.isoformat())
+    fresh = (best['version'] == version and best['result_at'] is not None
+             and (now - datetime.fromisoformat(best['result_at'])).total_seconds() <= RESULT_TTL_SECONDS)
+    return cluster, json.loads(best['result']) if fresh else None, sig
+
+
+def register(sig, text, result, version=None, cluster_id=None):
+    """
+    Start a new cluster represented by this ticket and its analysis result,
+    or store a fresh result for cluster_id (returned by lookup with a stale result).
+    """
+    if sig is None:
+        return None
+    now = datetime.now().isoformat()
+    try:
+        payload = json.dumps(result)
+        with _transaction() as conn:
+            if cluster_id is not None and conn.execute(
+                    "UPDATE clusters SET result = ?, version = ?, result_at = ? WHERE cluster_id = ?",
+                    (payload, version, now, cluster_id)).rowcount:
+                return cluster_id
+            cid = conn.execute(
+                "INSERT INTO clusters (size, first_seen, last_seen, excerpt, signature, result, version, result_at) "
+                "VALUES (1, ?, ?, ?, ?, ?, ?, ?)",
+                (now, now, (text or "")[:200], sig.astype(np.uint64).tobytes(), payload, version, now)).lastrowid
+            conn.executemany("INSERT INTO bands (key, cluster_id) VALUES (?, ?)",
+                             [(k, cid) for k in _band_keys(sig)])
+            old = [r[0] for r in conn.execute(
+                "SELECT cluster_id FROM clusters ORDER BY last_seen DESC, cluster_id DESC LIMIT -1 OFFSET ?",
+                (MAX_CLUSTERS,))]
+            for old_id in old:
+                conn.execute("DELETE FROM bands WHERE cluster_id = ?", (old_id,))
+                conn.execute("DELETE FROM clusters WHERE cluster_id = ?", (old_id,))
+            return cid
+    except Exception as e:
+        print("Near-duplicate register failed:", e)
+        return None
+
+
+def clusters(min_size=1, limit=100):
+    """Clusters of all workers, largest first (a burst = a likely incident)."""
+    with _transaction() as conn:
+        rows = conn.execute(
+            "SELECT cluster_id, size, first_seen, last_seen, excerpt FROM clusters WHERE size >= ? "
+            "ORDER BY size DESC, last_seen DESC LIMIT ?", (min_size, limit)).fetchall()
+    return [_public(r) for r in rows]
+
+
+def clear():
+    with _transaction() as conn:
+        conn.execute("DELETE FROM bands")
+        return conn.execute("DELETE FROM clusters").rowcount
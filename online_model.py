@@ -0,0 +1,274 @@
+"""
+Local category/priority classifier learned online from agent feedback.
+
+Rows appended to feedback.csv (POST /feedback) are consumed incrementally:
+update() reads only the bytes added since the last run, hashes the ticket
+text (HashingVectorizer, no vocabulary to refit) and calls partial_fit on
+one SGDClassifier per target. The model is pickled to MODEL_PATH and every
+process reloads it when the file's mtime changes, so an update made by one
+worker is picked up by the others without a restart. classify_text uses it
+instead of the keyword rules when the LLM is unavailable.
+
+    python online_model.py --update      # learn new feedback rows
+    python online_model.py --rebuild     # relearn from the whole feedback log
+    python online_model.py --status
+"""
+import os
+import io
+import csv
+import json
+import pickle
+import argparse
+import threading
+from datetime import datetime
+from time import perf_counter
+
+import metrics
+from file_lock import file_lock
+
+
+BASE_DIR = os.path.dirname(__file__)
+DATA_DIR = os.environ.get("TICKET_DATA_DIR", os.path.join(BASE_DIR, "data"))
+FEEDBACK_CSV = os.path.join(DATA_DIR, "feedback.csv")
+MODEL_PATH = os.path.join(DATA_DIR, "online_model.pkl")
+
+# feedback column -> target; tags stay with the keyword rules
+TARGETS = {'final_category': 'category', 'final_priority': 'priority'}
+TEXT_COLUMN = 'original_text'
+
+# The model is only used after this many feedback rows ...
+MIN_FEEDBACK = int(os.environ.get("ONLINE_MIN_FEEDBACK", "20"))
+# ... and only for predictions at least this confident
+MIN_CONFIDENCE = float(os.environ.get("ONLINE_MIN_CONFIDENCE", "0.5"))
+# Hashed feature space; the pickled model holds one float per feature and class
+N_FEATURES = int(os.environ.get("ONLINE_N_FEATURES", str(2 ** 16)))
+
+UPDATES = metrics.counter('online_model_rows_learned_total', 'Feedback rows learned by the online model')
+UPDATE_SECONDS = metrics.histogram('online_model_update_seconds', 'Duration of online model updates')
+RELOADS = metrics.counter('online_model_reloads_total', 'Online model reloads after another process updated it')
+
+_lock = threading.Lock()
+_cache = (None, None)   # (mtime, model)
+_vectorizer = None
+_update_thread = None
+_update_again = False
+
+
+def _features(texts):
+    global _vectorizer
+    if _vectorizer is None:
+        from sklearn.feature_extraction.text import HashingVectorizer
+        _vectorizer = HashingVectorizer(n_features=N_FEATURES, ngram_range=(1, 2), stop_words='english',
+                                        alternate_sign=False)
+    return _vectorizer.transform(texts)
+
+
+def _norm_label(target, value):
+    value = "" if value is None else str(value).strip()
+    if target == 'priority':
+        return value.capitalize()
+    return value.lower()
+
+
+def _new_model():
+    return {'classifiers': {}, 'classes': {t: [] for t in TARGETS.values()},
+            'offset': 0, 'fieldnames': None, 'rows': 0, 'updated_at': None}
+
+
+# ------------------ persistence / hot swap ------------------ #
+
+def _save(model):
+    tmp = f"{MODEL_PATH}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, MODEL_PATH)
+
+
+def _read_model():
+    with open(MODEL_PATH, 'rb') as f:
+        return pickle.load(f)
+
+
+def get_model():
+    """The current model, reloaded when MODEL_PATH changed on disk; None if untrained."""
+    global _cache
+    try:
+        mtime = os.path.getmtime(MODEL_PATH)
+    except OSError:
+        return None
+    if mtime != _cache[0]:
+        with _lock:
+            if mtime != _cache[0]:
+                try:
+                    _cache = (mtime, _read_model())
+                    RELOADS.inc()
+                except Exception as e:
+                    print("Could not load online model:", e)
+                    return _cache[1]
+    return _cache[1]
+
+
+# ------------------ learning ------------------ #
+
+def _read_new_rows(model):
+    """Feedback rows appended after model['offset']; returns (rows, new offset, fieldnames)."""
+    with open(FEEDBACK_CSV, 'rb') as f:
+        f.seek(model['offset'])
+        data = f.read()
+    # leave a row that is still being written for the next update
+    from analytics_store import _complete
+    end = _complete(data)
+    data = data[:end]
+    reader = csv.reader(io.StringIO(data.decode('utf-8', errors='ignore'), newline=''))
+    fieldnames = model['fieldnames']
+    rows = []
+    for values in reader:
+        if fieldnames is None:
+            fieldnames = values
+            continue
+        rows.append(dict(zip(fieldnames, values)))
+    return rows, model['offset'] + end, fieldnames
+
+
+def _learn(model, rows):
+    """partial_fit each target on rows; a target that sees a new label is refit on the whole log."""
+    from sklearn.linear_model import SGDClassifier
+    texts = [r.get(TEXT_COLUMN, '') for r in rows]
+    X = None
+    for column, target in TARGETS.items():
+        labels = [_norm_label(target, r.get(column)) for r in rows]
+        keep = [i for i, (t, y) in enumerate(zip(texts, labels)) if t.strip() and y]
+        if not keep:
+            continue
+        classes = model['classes'][target]
+        new = sorted({labels[i] for i in keep} - set(classes))
+        if new:
+            # SGDClassifier cannot grow its class list; refit this target from scratch
+            model['classes'][target] = classes = sorted(set(classes) | set(new))
+            model['classifiers'].pop(target, None)
+            if model['rows']:
+                return False
+        if len(classes) < 2:
+            continue
+        clf = model['classifiers'].get(target)
+        if clf is None:
+            clf = model['classifiers'][target] = SGDClassifier(loss='modified_huber', alpha=1e-4, random_state=0)
+        if X is None:
+            X = _features(texts)
+        clf.partial_fit(X[keep], [labels[i] for i in keep], classes=classes)
+    return True
+
+
+def update(rebuild=False):
+    """Learn the feedback rows added since the last update; returns how many were read."""
+    if not os.path.exists(FEEDBACK_CSV):
+        return 0
+    with file_lock(MODEL_PATH):
+        model = None
+        if not rebuild and os.path.exists(MODEL_PATH):
+            try:
+                model = _read_model()
+            except Exception as e:
+                print("Online model unreadable, rebuilding:", e)
+        if model is None or os.path.getsize(FEEDBACK_CSV) < model['offset']:
+            model = _new_model()
+        t0 = perf_counter()
+        rows, offset, fieldnames = _read_new_rows(model)
+        if not rows and model['offset'] == offset:
+            return 0
+        if not _learn(model, rows):
+            # a new label appeared: relearn everything with the full class list
+            classes = model['classes']
+            model = _new_model()
+            model['classes'] = classes
+            rows, offset, fieldnames = _read_new_rows(model)
+            _learn(model, rows)
+        model.update({'offset': offset, 'fieldnames': fieldnames, 'rows': model['rows'] + len(rows),
+                      'updated_at': datetime.now().isoformat()})
+        _save(model)
+        UPDATE_SECONDS.observe(perf_counter() - t0)
+        UPDATES.inc(len(rows))
+        return len(rows)
+
+
+def schedule_update():
+    """Run update() on a background thread; calls made while one runs are coalesced into one more pass."""
+    global _update_thread, _update_again
+    with _lock:
+        if _update_thread is not None:
+            _update_again = True
+            return
+        _update_thread = threading.Thread(target=_update_loop, daemon=True)
+        _update_thread.start()
+
+
+def _update_loop():
+    global _update_thread, _update_again
+    while True:
+        try:
+            update()
+        except Exception as e:
+            print("Online model update failed:", e)
+        with _lock:
+            if not _update_again:
+                _update_thread = None
+                return
+            _update_again = False
+
+
+# ------------------ prediction ------------------ #
+
+def predict_many(texts, min_confidence=None):
+    """
+    Per text a dict with the confident predictions ('category',
+    'suggested_priority', 'confidence'), or None when the model is not
+    trained enough or not confident about the category.
+    """
+    model = get_model()
+    if model is None or model['rows'] < MIN_FEEDBACK or 'category' not in model['classifiers']:
+        return [None] * len(texts)
+    min_confidence = MIN_CONFIDENCE if min_confidence is None else min_confidence
+    X = _features([t or "" for t in texts])
+    out = [None] * len(texts)
+    cat = model['classifiers']['category']
+    proba = cat.predict_proba(X)
+    prio = model['classifiers'].get('priority')
+    prio_proba = prio.predict_proba(X) if prio is not None else None
+    for i, p in enumerate(proba):
+        j = p.argmax()
+        if p[j] < min_confidence:
+            continue
+        out[i] = {'category': str(cat.classes_[j]), 'confidence': float(p[j])}
+        if prio_proba is not None:
+            k = prio_proba[i].argmax()
+            if prio_proba[i][k] >= min_confidence:
+                out[i]['suggested_priority'] = str(prio.classes_[k])
+    return out
+
+
+def predict(text, min_confidence=None):
+    return predict_many([text], min_confidence)[0]
+
+
+def status():
+    model = get_model()
+    if model is None:
+        return {'trained': False}
+    return {
+        'trained': True,
+        'rows': model['rows'],
+        'updated_at': model['updated_at'],
+        'active': model['rows'] >= MIN_FEEDBACK and 'category' in model['classifiers'],
+        'classes': model['classes'],
+    }
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--update", action="store_true", help="learn feedback rows added since the last update")
+    ap.add_argument("--rebuild", action="store_true", help="relearn from the whole feedback log")
+    ap.add_argument("--status", action="store_true")
+    args = ap.parse_args()
+    if args.update or args.rebuild:
+        print("Learned", update(rebuild=args.rebuild), "feedback rows")
+    print(json.dumps(status(), indent=2))
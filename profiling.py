@@ -0,0 +1,154 @@
+import os
+import io
+import json
+import cProfile
+import pstats
+import random
+import threading
+import uuid
+from datetime import datetime
+from functools import wraps
+from time import perf_counter
+from flask import g, request
+from file_lock import file_lock
+
+
+BASE_DIR = os.path.dirname(__file__)
+DATA_DIR = os.environ.get("TICKET_DATA_DIR", os.path.join(BASE_DIR, "data"))
+PROFILE_DIR = os.path.join(DATA_DIR, "profiles")
+INDEX_PATH = os.path.join(PROFILE_DIR, "index.jsonl")
+# admin toggle; shared by all worker processes through the file
+SETTINGS_PATH = os.path.join(PROFILE_DIR, "settings.json")
+
+# Fraction of requests profiled when no admin setting exists (0 = off)
+DEFAULT_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+# Oldest profiles are deleted beyond this many
+MAX_PROFILES = int(os.environ.get("PROFILE_MAX_FILES", "200"))
+
+# cProfile cannot run in two threads at once; concurrent samples are skipped
+_active = threading.Lock()
+_index_lock = threading.Lock()
+_settings = (None, DEFAULT_SAMPLE_RATE)   # (mtime, rate)
+
+
+def get_sample_rate():
+    global _settings
+    try:
+        mtime = os.path.getmtime(SETTINGS_PATH)
+    except OSError:
+        return DEFAULT_SAMPLE_RATE
+    if mtime != _settings[0]:
+        try:
+            with open(SETTINGS_PATH, 'r', encoding='utf-8') as f:
+                _settings = (mtime, float(json.load(f).get('sample_rate', DEFAULT_SAMPLE_RATE)))
+        except Exception:
+            return DEFAULT_SAMPLE_RATE
+    return _settings[1]
+
+
+def set_sample_rate(rate):
+    rate = min(max(float(rate), 0.0), 1.0)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    tmp = f"{SETTINGS_PATH}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'sample_rate': rate, 'updated_at': datetime.now().isoformat()}, f)
+    os.replace(tmp, SETTINGS_PATH)
+    return rate
+
+
+def _top_functions(profiler, n=5):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for func, (cc, nc, tt, ct, callers) in sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:n]:
+        rows.append({'function': f"{os.path.basename(func[0])}:{func[1]}({func[2]})", 'cumulative_ms': ct * 1000.0})
+    return rows
+
+
+def _record(request_id, profiler, duration, status):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profiler.dump_stats(os.path.join(PROFILE_DIR, f"{request_id}.prof"))
+    entry = {
+        'request_id': request_id,
+        'timestamp': datetime.now().isoformat(),
+        'path': request.path,
+        'filename': getattr(request.files.get('file'), 'filename', None),
+        'status': status,
+        'duration_ms': duration * 1000.0,
+        'top': _top_functions(profiler)
+    }
+    with _index_lock, file_lock(INDEX_PATH):
+        entries = _read_index()
+        entries.append(entry)
+        for old in entries[:-MAX_PROFILES]:
+            try:
+                os.remove(os.path.join(PROFILE_DIR, f"{old['request_id']}.prof"))
+            except OSError:
+                pass
+        entries = entries[-MAX_PROFILES:]
+        tmp = f"{INDEX_PATH}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for e in entries:
+                f.write(json.dumps(e) + '\n')
+        os.replace(tmp, INDEX_PATH)
+
+
+def _read_index():
+    if not os.path.exists(INDEX_PATH):
+        return []
+    out = []
+    with open(INDEX_PATH, 'r', encoding='utf-8') as fh:
+        for line in fh:
+            try:
+                out.append(json.loads(line))
+            except Exception:
+                continue
+    return out
+
+
+def profiled(f):
+    """
+    Give the request an id (X-Request-ID header) and run a sampled fraction
+    of calls under cProfile, saving the profile to PROFILE_DIR.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        request_id = uuid.uuid4().hex[:16]
+        g.request_id = request_id
+        rate = get_sample_rate()
+        if rate <= 0 or random.random() >= rate or not _active.acquire(blocking=False):
+            resp = f(*args, **kwargs)
+        else:
+            profiler = cProfile.Profile()
+            t0 = perf_counter()
+            try:
+                resp = profiler.runcall(f, *args, **kwargs)
+            finally:
+                _active.release()
+            duration = perf_counter() - t0
+            status = resp[1] if isinstance(resp, tuple) else 200
+            try:
+                _record(request_id, profiler, duration, status)
+            except Exception as e:
+                print("Could not save profile:", e)
+        if isinstance(resp, tuple):
+            body, rest = resp[0], resp[1:]
+            body.headers['X-Request-ID'] = request_id
+            return (body,) + rest
+        resp.headers['X-Request-ID'] = request_id
+        return resp
+    return decorated
+
+
+def list_profiles(limit=20, order='slowest'):
+    entries = _read_index()
+    if order == 'slowest':
+        entries.sort(key=lambda e: e.get('duration_ms', 0), reverse=True)
+    else:
+        entries.reverse()
+    return entries[:limit]
+
+
+def profile_path(request_id):
+    safe = "".join(c for c in str(request_id) if c.isalnum())
+    path = os.path.join(PROFILE_DIR, f"{safe}.prof")
+    return path if safe and os.path.exists(path) else None
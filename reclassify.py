@@ -0,0 +1,293 @@
+"""
+Bulk re-classification of the historical corpus or past feedback.
+
+Streams the source CSV in chunks, classifies the chunks in a process pool
+and writes one columnar part file per chunk under
+data/reclassified/<run>/ (parquet when pyarrow/fastparquet is installed,
+CSV otherwise). Finished chunks are recorded in checkpoint.json, so an
+interrupted run picks up where it stopped when started again with the same
+--run name. The checkpoint also keeps running counts of the results
+(see report()), so the dashboard does not have to read the part files.
+
+    python reclassify.py --source history --mode rule --workers 4
+    python reclassify.py --source feedback --mode llm --workers 2 --run fb-llm
+    python reclassify.py --source history --mode local   # online model trained on feedback
+"""
+import os
+import json
+import argparse
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+import pandas as pd
+
+BASE_DIR = os.path.dirname(__file__)
+DATA_DIR = os.environ.get("TICKET_DATA_DIR", os.path.join(BASE_DIR, "data"))
+OUT_DIR = os.path.join(DATA_DIR, "reclassified")
+
+# source -> (csv file, text columns in order of preference, label column)
+SOURCES = {
+    'history': ("processed_tickets.csv", ('text', 'text_clean'), 'Category'),
+    'feedback': ("feedback.csv", ('original_text',), 'final_category'),
+}
+MODES = ('rule', 'local', 'llm')
+
+CHUNK_SIZE = int(os.environ.get("RECLASSIFY_CHUNK_SIZE", "500"))
+WORKERS = int(os.environ.get("RECLASSIFY_WORKERS", "2"))
+# Chunks submitted to the pool but not finished; bounds memory and, in llm
+# mode, together with --workers the number of concurrent OpenAI requests
+MAX_INFLIGHT = int(os.environ.get("RECLASSIFY_MAX_INFLIGHT", "4"))
+
+PARQUET = (importlib.util.find_spec("pyarrow") is not None
+           or importlib.util.find_spec("fastparquet") is not None)
+
+
+def _classify_chunk(chunk_id, rows, texts, labels, mode, model):
+    """Runs in a worker process; returns the chunk's result rows."""
+    import llm_classifier
+    texts = [str(t)[:4000] for t in texts]
+    if mode == 'llm':
+        results = llm_classifier.classify_batch(texts, model_name=model)
+    elif mode == 'local':
+        # feedback-trained online model, keyword rules where it is not confident
+        results = llm_classifier._fallback_many(texts)
+    else:
+        results = [llm_classifier._rule_based(t) for t in texts]
+    now = datetime.now().isoformat()
+    out = []
+    for row, label, res in zip(rows, labels, results):
+        res = res if isinstance(res, dict) else {}
+        out.append({
+            'row': row,
+            'label': label,
+            'category': res.get('category', ''),
+            'tags': ",".join(res.get('tags') or []),
+            'suggested_priority': res.get('suggested_priority', ''),
+            'confidence': res.get('confidence'),
+            'mode': mode,
+            'classified_at': now,
+        })
+    return chunk_id, out
+
+
+def _run_dir(run):
+    return os.path.join(OUT_DIR, run)
+
+
+def _load_checkpoint(run):
+    path = os.path.join(_run_dir(run), "checkpoint.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_checkpoint(run, state):
+    path = os.path.join(_run_dir(run), "checkpoint.json")
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _write_part(run, chunk_id, out):
+    df = pd.DataFrame(out)
+    ext = "parquet" if PARQUET else "csv"
+    path = os.path.join(_run_dir(run), f"part-{chunk_id:05d}.{ext}")
+    tmp = path + ".tmp"
+    if PARQUET:
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _aliases():
+    """Predicted category -> history label map used to compare predictions with labels."""
+    import similarity
+    return similarity.category_aliases()
+
+
+def _agrees(label, category, aliases):
+    """True if the predicted category and the original label name the same category."""
+    from similarity import _norm_category
+    return _norm_category(label, aliases) == _norm_category(category, aliases)
+
+
+def _new_summary(aliases=None):
+    # the aliases are fixed when a run starts, so resumed chunks are counted the same way
+    return {'rows': 0, 'labelled': 0, 'matches': 0, 'categories': {}, 'crosstab': {},
+            'aliases': _aliases() if aliases is None else aliases}
+
+
+def _tally(summary, out):
+    """Add result rows to a run's running counts; returns summary."""
+    for r in out:
+        label = _str(r.get('label'))
+        category = _str(r.get('category'))
+        summary['rows'] += 1
+        key = category or 'unknown'
+        summary['categories'][key] = summary['categories'].get(key, 0) + 1
+        row = summary['crosstab'].setdefault(label, {})
+        row[category] = row.get(category, 0) + 1
+        if label:
+            summary['labelled'] += 1
+            summary['matches'] += int(_agrees(label, category, summary['aliases']))
+    return summary
+
+
+def _str(value):
+    return "" if value is None or value != value else str(value).strip()
+
+
+def _chunks(source, chunk_size, limit=None):
+    """Yield (chunk_id, rows, texts, labels) from the source CSV without loading it whole."""
+    fname, text_cols, label_col = SOURCES[source]
+    path = os.path.join(DATA_DIR, fname)
+    start = 0
+    for chunk_id, df in enumerate(pd.read_csv(path, chunksize=chunk_size)):
+        if limit is not None and start >= limit:
+            return
+        if limit is not None:
+            df = df.head(limit - start)
+        col = next((c for c in text_cols if c in df.columns), None)
+        texts = df[col].fillna('').astype(str).tolist() if col else df.astype(str).apply(" ".join, axis=1).tolist()
+        labels = df[label_col].fillna('').astype(str).tolist() if label_col in df.columns else [''] * len(df)
+        yield chunk_id, list(range(start, start + len(df))), texts, labels
+        start += len(df)
+
+
+def run(source='history', mode='rule', run_name=None, chunk_size=CHUNK_SIZE, workers=WORKERS,
+        max_inflight=MAX_INFLIGHT, model="gpt-3.5-turbo", limit=None, restart=False):
+    """Classify the source corpus; returns the run's checkpoint state."""
+    run_name = run_name or f"{source}-{mode}"
+    os.makedirs(_run_dir(run_name), exist_ok=True)
+    config = {'source': source, 'mode': mode, 'chunk_size': chunk_size, 'limit': limit, 'model': model}
+    state = None if restart else _load_checkpoint(run_name)
+    if state is not None and state.get('config') != config:
+        raise SystemExit(f"Run '{run_name}' was started with {state.get('config')}; use --restart or another --run")
+    if state is None:
+        for f in os.listdir(_run_dir(run_name)):
+            if f.startswith("part-"):
+                os.remove(os.path.join(_run_dir(run_name), f))
+        state = {'config': config, 'done': [], 'rows': 0, 'started_at': datetime.now().isoformat()}
+    if 'aliases' not in state.get('summary', {}):
+        # checkpoints written before the running counts (or their aliases) existed
+        state['summary'] = _tally(_new_summary(), load_results(run_name).to_dict('records'))
+    done = set(state['done'])
+    if done:
+        print(f"Resuming '{run_name}': {len(done)} chunks ({state['rows']} rows) already done")
+
+    ctx = multiprocessing.get_context('spawn')
+    pending = set()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            for chunk_id, rows, texts, labels in _chunks(source, chunk_size, limit):
+                if chunk_id in done:
+                    continue
+                while len(pending) >= max_inflight:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    _collect(run_name, state, finished)
+                pending.add(pool.submit(_classify_chunk, chunk_id, rows, texts, labels, mode, model))
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _collect(run_name, state, finished)
+    except KeyboardInterrupt:
+        for f in pending:
+            f.cancel()
+        _save_checkpoint(run_name, state)
+        print(f"\nInterrupted; {len(state['done'])} chunks saved. Run again with --run {run_name} to resume.")
+        raise SystemExit(130)
+    state['finished_at'] = datetime.now().isoformat()
+    _save_checkpoint(run_name, state)
+    return state
+
+
+def _collect(run_name, state, finished):
+    for fut in finished:
+        chunk_id, out = fut.result()
+        _write_part(run_name, chunk_id, out)
+        state['done'].append(chunk_id)
+        state['rows'] += len(out)
+        _tally(state['summary'], out)
+        _save_checkpoint(run_name, state)
+        print(f"chunk {chunk_id}: {len(out)} rows (total {state['rows']})")
+
+
+def list_runs():
+    if not os.path.isdir(OUT_DIR):
+        return []
+    return sorted(d for d in os.listdir(OUT_DIR) if os.path.exists(os.path.join(OUT_DIR, d, "checkpoint.json")))
+
+
+def load_results(run_name):
+    """All part files of a run as one DataFrame ordered by source row."""
+    d = _run_dir(run_name)
+    if not os.path.isdir(d):
+        return pd.DataFrame()
+    parts = []
+    for f in sorted(os.listdir(d)):
+        if f.startswith("part-") and f.endswith(".parquet"):
+            parts.append(pd.read_parquet(os.path.join(d, f)))
+        elif f.startswith("part-") and f.endswith(".csv"):
+            parts.append(pd.read_csv(os.path.join(d, f)))
+    if not parts:
+        return pd.DataFrame()
+    return pd.concat(parts, ignore_index=True).sort_values('row').reset_index(drop=True)
+
+
+def report(run_name):
+    """evaluate() of a run plus its category counts and label x category crosstab, from the checkpoint."""
+    state = _load_checkpoint(run_name) or {}
+    summary = state.get('summary')
+    if summary is None or 'aliases' not in summary:
+        summary = _tally(_new_summary(), load_results(run_name).to_dict('records'))
+    return {
+        'rows': summary['rows'],
+        'labelled': summary['labelled'],
+        'accuracy': summary['matches'] / summary['labelled'] if summary['labelled'] else None,
+        'categories': summary['categories'],
+        'crosstab': summary['crosstab'],
+        'aliases': summary['aliases'],
+    }
+
+
+def evaluate(df, aliases=None):
+    """
+    Agreement of predicted with original categories (rows that have a label),
+    both mapped through the similarity index's category aliases.
+    """
+    if df.empty:
+        return {'rows': 0, 'labelled': 0, 'accuracy': None}
+    aliases = _aliases() if aliases is None else aliases
+    labelled = df[df['label'].fillna('').astype(str).str.strip() != '']
+    match = pd.Series([_agrees(label, _str(category), aliases)
+                       for label, category in zip(labelled['label'].astype(str), labelled['category'])],
+                      dtype=bool)
+    return {
+        'rows': len(df),
+        'labelled': len(labelled),
+        'accuracy': float(match.mean()) if len(labelled) else None,
+        'categories': df['category'].value_counts().to_dict(),
+    }
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--source", choices=sorted(SOURCES), default="history")
+    ap.add_argument("--mode", choices=MODES, default="rule")
+    ap.add_argument("--run", help="run name (default <source>-<mode>); reusing it resumes")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    ap.add_argument("--workers", type=int, default=WORKERS, help="worker processes")
+    ap.add_argument("--max-inflight", type=int, default=MAX_INFLIGHT, help="chunks queued or running at once")
+    ap.add_argument("--model", default="gpt-3.5-turbo")
+    ap.add_argument("--limit", type=int, help="classify only the first N rows")
+    ap.add_argument("--restart", action="store_true", help="discard the run's checkpoint and start over")
+    args = ap.parse_args()
+    run(args.source, args.mode, args.run, args.chunk_size, args.workers,
+                args.max_inflight, args.model, args.limit, args.restart)
+    name = args.run or f"{args.source}-{args.mode}"
+    result = report(name)
+    print(f"Run '{name}': {result['rows']} rows, {result['labelled']} labelled, "
+          f"accuracy {result['accuracy'] if result['accuracy'] is not None else 'n/a'}")
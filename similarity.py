@@ -1,92 +1,721 @@
 import os
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import csv
+import hashlib
+import mmap
+import struct
+import threading
+from array import array
+import time
+from datetime import datetime
+
+import metrics
+
+# numpy/pandas/scipy/scikit-learn are imported inside the functions that need
+# them, so importing this module (and app.py) stays cheap until the first lookup
 
 BASE_DIR = os.path.dirname(__file__)
-DATA_DIR = os.path.join(BASE_DIR, "data")
+DATA_DIR = os.environ.get("TICKET_DATA_DIR", os.path.join(BASE_DIR, "data"))
 
 HIST_PATH = os.path.join(DATA_DIR, "processed_tickets.csv")
 KB_PATH   = os.path.join(DATA_DIR, "knowledge_base.csv")
+# tickets appended at runtime (/analyze, /feedback); replayed on every (re)build
+LIVE_PATH = os.path.join(DATA_DIR, "live_tickets.csv")
+
+# Refit once the out-of-vocabulary rate of appended tickets exceeds the rate
+# measured on the training sample by this much, after enough appends.
+DRIFT_THRESHOLD = float(os.environ.get("SIMILARITY_DRIFT_THRESHOLD", "0.15"))
+DRIFT_MIN_DOCS = int(os.environ.get("SIMILARITY_DRIFT_MIN_DOCS", "200"))
+
+# Similar-ticket ranking fuses cosine with BM25 (scaled to the best BM25 score
+# among the candidates): score = (1 - w) * cosine + w * bm25 / max(bm25)
+BM25_WEIGHT = float(os.environ.get("SIMILARITY_BM25_WEIGHT", "0.5"))
+BM25_K1 = 1.2
+BM25_B = 0.75
+# The predicted category's shard answers alone when it has top_k tickets at
+# least this cosine-similar; otherwise every shard is searched
+SHARD_MIN_SIMILARITY = float(os.environ.get("SIMILARITY_SHARD_MIN_SIMILARITY", "0.2"))
+# Classifier categories -> the history's Category labels, so a prediction
+# selects (and a live ticket joins) the shard holding the matching history.
+# Derived from the history at build time (see _shard_labels); entries set
+# here, e.g. SIMILARITY_CATEGORY_ALIASES="authentication=account", win.
+CATEGORY_ALIASES = {
+    k.strip(): v.strip()
+    for k, _, v in (pair.lower().partition("=") for pair in os.environ.get(
+        "SIMILARITY_CATEGORY_ALIASES", "").split(","))
+    if v.strip()
+}
+# A rule category is aliased to the history label carried by at least this
+# share of the sampled history rows it predicts
+ALIAS_MIN_SHARE = float(os.environ.get("SIMILARITY_ALIAS_MIN_SHARE", "0.5"))
+ALIAS_SAMPLE = 2000
+# History without (more than one) real label is sharded by the keyword rules;
+# prepare_dataset.py writes 'unlabeled' when the dataset has no label column
+UNLABELED = {"", "unlabeled"}
+
+# Snippets of the indexed history are written here and memory-mapped, so the
+# pages are shared by all worker processes instead of living on each heap
+SNIPPETS_PATH = os.path.join(DATA_DIR, "ticket_snippets.bin")
+SNIPPETS_MMAP = os.environ.get("SIMILARITY_SNIPPETS_MMAP", "1") == "1"
+SNIPPET_CHARS = 400
+# Live tickets are matched by their first LIVE_KEY_CHARS characters (runs of
+# whitespace collapsed): feedback echoes /analyze's uploaded_ticket, cut at 1000
+LIVE_KEY_CHARS = 500
+
+# KB articles scoring below this cosine similarity are not recommended
+KB_MIN_SIMILARITY = float(os.environ.get("KB_MIN_SIMILARITY", "0.1"))
+# KB retrieval engine: "tfidf" (cosine over content) or "bm25" (bm25.py over
+# title + content); BM25 scores are unbounded, so it has its own cutoff
+KB_ENGINE = os.environ.get("KB_ENGINE", "tfidf").strip().lower()
+KB_MIN_BM25_SCORE = float(os.environ.get("KB_MIN_BM25_SCORE", "1.0"))
+KB_TITLE_WEIGHT = float(os.environ.get("KB_TITLE_WEIGHT", "2.0"))
+
+INDEX_ROWS = metrics.gauge('similarity_index_rows', 'Tickets in the similarity index')
+INDEX_BUILD_SECONDS = metrics.gauge('similarity_index_build_seconds', 'Duration of the last similarity index (re)build')
+INDEX_APPENDS = metrics.counter('similarity_index_appends_total', 'Tickets appended to the similarity index without refit')
+INDEX_REFITS = metrics.counter('similarity_index_refits_total', 'Full similarity index builds', ['reason'])
+INDEX_SHARDS = metrics.gauge('similarity_index_shards', 'Category shards in the similarity index')
+SEARCHES = metrics.counter('similarity_searches_total', 'Similar-ticket searches by scope', ['scope'])
+CANDIDATES = metrics.counter('similarity_candidates_scored_total', 'Tickets scored by similar-ticket searches')
+KB_ARTICLES = metrics.gauge('kb_index_articles', 'Articles in the KB index')
+KB_CACHE = metrics.counter('kb_index_cache_total', 'KB index cache lookups', ['result'])
+
+_vectorizer = None      # CountVectorizer; TF-IDF and BM25 rows are derived from its counts
+_tfidf = None
+_bm25_idf = None
+_bm25_avgdl = 1.0
+_shards = None          # category -> _Shard
+_n_rows = 0
+_derived_aliases = None        # rule category -> history label, from the last build
+_row_categories = array('H')   # category code of every indexed row, by row id
+_category_names = []           # category code -> name
+_snippets = None               # _SnippetStore over every indexed row
+
+_lock = threading.RLock()
+_limit_rows = 15000
+_pending_live = []      # (text, category, relabel) updates that arrived while a refit was running
+_live_rows = {}         # _live_key(text) -> row id of the latest live row with that text
+_refitting = False
+_baseline_oov = 0.0     # OOV rate of the training sample at fit time
+_drift_docs = 0
+_drift_tokens = 0
+_drift_oov = 0
+
+
+class _GrowableCSR:
+    """
+    Row-appendable CSR matrix. Backing arrays start at the matrix's size and
+    grow by GROWTH, so appending a row costs O(row nnz) amortised instead of
+    re-stacking the whole matrix.
+    """
+    GROWTH = 1.5
+
+    def __init__(self, matrix):
+        import numpy as np
+        import scipy.sparse as sp
+        m = sp.csr_matrix(matrix)
+        self.n_cols = m.shape[1]
+        self.n_rows = m.shape[0]
+        self.nnz = m.nnz
+        self._data = np.empty(max(m.nnz, 1024), dtype=m.data.dtype)
+        self._indices = np.empty(max(m.nnz, 1024), dtype=m.indices.dtype)
+        self._indptr = np.empty(max(self.n_rows, 64) + 1, dtype=m.indptr.dtype)
+        self._data[:m.nnz] = m.data
+        self._indices[:m.nnz] = m.indices
+        self._indptr[:self.n_rows + 1] = m.indptr
+        self._view = None
+
+    @property
+    def shape(self):
+        return (self.n_rows, self.n_cols)
+
+    def append(self, row):
+        import numpy as np
+        import scipy.sparse as sp
+        row = sp.csr_matrix(row)
+        k = row.nnz
+        if self.nnz + k > len(self._data):
+            cap = max(int(self.GROWTH * len(self._data)), self.nnz + k)
+            self._data = np.resize(self._data, cap)
+            self._indices = np.resize(self._indices, cap)
+        if self.n_rows + 2 > len(self._indptr):
+            self._indptr = np.resize(self._indptr, int(self.GROWTH * len(self._indptr)) + 1)
+        self._data[self.nnz:self.nnz + k] = row.data
+        self._indices[self.nnz:self.nnz + k] = row.indices
+        self.nnz += k
+        self.n_rows += 1
+        self._indptr[self.n_rows] = self.nnz
+        self._view = None
+
+    def pop(self, i):
+        """Remove row i and return it as a 1-row csr_matrix."""
+        import scipy.sparse as sp
+        start, end = int(self._indptr[i]), int(self._indptr[i + 1])
+        k = end - start
+        row = sp.csr_matrix((self._data[start:end].copy(), self._indices[start:end].copy(), [0, k]),
+                            shape=(1, self.n_cols))
+        self._data[start:self.nnz - k] = self._data[end:self.nnz]
+        self._indices[start:self.nnz - k] = self._indices[end:self.nnz]
+        self._indptr[i + 1:self.n_rows] = self._indptr[i + 2:self.n_rows + 1] - k
+        self.nnz -= k
+        self.n_rows -= 1
+        self._view = None
+        return row
+
+    def view(self):
+        """csr_matrix sharing the filled part of the buffers (no copy)."""
+        if self._view is None:
+            import scipy.sparse as sp
+            self._view = sp.csr_matrix(
+                (self._data[:self.nnz], self._indices[:self.nnz], self._indptr[:self.n_rows + 1]),
+                shape=self.shape, copy=False
+            )
+        return self._view
+
+
+class _SnippetStore:
+    """
+    Ticket snippets packed into one UTF-8 buffer plus an offset array; row i
+    is buf[off[i]:off[i + 1]]. The base part can be a read-only memory map
+    (see save/load); rows appended at runtime go to an in-memory tail.
+    """
+
+    def __init__(self, buf=b"", offsets=None):
+        self._buf = buf
+        self._off = offsets if offsets is not None else array('Q', [0])
+        self._n_base = len(self._off) - 1
+        self._tail = bytearray()
+        self._tail_off = array('Q', [0])
+
+    @classmethod
+    def build(cls, texts):
+        parts = [str(t)[:SNIPPET_CHARS].encode('utf-8') for t in texts]
+        offsets = array('Q', [0])
+        total = 0
+        for p in parts:
+            total += len(p)
+            offsets.append(total)
+        return cls(b"".join(parts), offsets)
+
+    def __len__(self):
+        return self._n_base + len(self._tail_off) - 1
+
+    @property
+    def nbytes(self):
+        return (len(self._buf) + len(self._off) * self._off.itemsize
+                + len(self._tail) + len(self._tail_off) * self._tail_off.itemsize)
+
+    def append(self, text):
+        self._tail += str(text)[:SNIPPET_CHARS].encode('utf-8')
+        self._tail_off.append(len(self._tail))
+
+    def get(self, i):
+        if i < self._n_base:
+            return str(memoryview(self._buf)[self._off[i]:self._off[i + 1]], 'utf-8')
+        i -= self._n_base
+        return str(memoryview(self._tail)[self._tail_off[i]:self._tail_off[i + 1]], 'utf-8')
+
+    def save(self, path, stamp=(0, 0, 0, 0)):
+        """Write the base part as [stamp][row count][offsets][buffer] (atomic replace)."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(struct.pack('<4QQ', *stamp, self._n_base))
+            f.write(array('Q', self._off).tobytes())
+            f.write(self._buf)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, stamp=None):
+        """Memory-map a file written by save(); None if it was saved with a different stamp."""
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        *saved, n = struct.unpack_from('<4QQ', mm, 0)
+        if stamp is not None and tuple(saved) != tuple(stamp):
+            mm.close()
+            return None
+        start = 40 + 8 * (n + 1)
+        view = memoryview(mm)
+        return cls(view[start:], view[40:start].cast('Q'))
+
+
+class SimilarTicket:
+    """One find_similar_tickets hit."""
+    __slots__ = ('id', 'similarity', 'score', 'category', 'snippet')
+
+    def __init__(self, id, similarity, score, category, snippet):
+        self.id = id
+        self.similarity = similarity
+        self.score = score
+        self.category = category
+        self.snippet = snippet
+
+    def to_dict(self):
+        return {'id': self.id, 'similarity': self.similarity, 'score': self.score,
+                'category': self.category, 'snippet': self.snippet}
+
+
+class _Shard:
+    """
+    The tickets of one category: raw term counts and their global row ids.
+    Cosine and BM25 are both computed from the counts at query time (with
+    each row's inverse TF-IDF norm and BM25 length factor), so a shard keeps
+    one sparse matrix.
+    """
+
+    def __init__(self, counts, inv_norms, lengths, rows, history=0):
+        import numpy as np
+        self.counts = _GrowableCSR(counts)
+        self.n = len(rows)
+        self.history = history   # rows from HIST_PATH (the rest are live tickets)
+        self._rows = np.empty(max(self.n, 64), dtype=np.int64)
+        self._inv_norms = np.empty(len(self._rows))
+        self._lengths = np.empty(len(self._rows))
+        self._rows[:self.n] = rows
+        self._inv_norms[:self.n] = inv_norms
+        self._lengths[:self.n] = lengths
+
+    def append(self, counts_row, inv_norm, length, row_id):
+        import numpy as np
+        self.counts.append(counts_row)
+        if self.n == len(self._rows):
+            cap = int(_GrowableCSR.GROWTH * self.n) + 1
+            self._rows, self._inv_norms, self._lengths = (
+                np.resize(a, cap) for a in (self._rows, self._inv_norms, self._lengths))
+        self._rows[self.n] = row_id
+        self._inv_norms[self.n] = inv_norm
+        self._lengths[self.n] = length
+        self.n += 1
+
+    def remove(self, row_id):
+        """Take row_id out of the shard; returns its (counts row, inverse norm, BM25 length factor), or None."""
+        import numpy as np
+        pos = np.flatnonzero(self._rows[:self.n] == row_id)
+        if not pos.size:
+            return None
+        i = int(pos[-1])
+        removed = self.counts.pop(i), float(self._inv_norms[i]), float(self._lengths[i])
+        for a in (self._rows, self._inv_norms, self._lengths):
+            a[i:self.n - 1] = a[i + 1:self.n]
+        self.n -= 1
+        return removed
+
+    def score(self, q_weights, q_cols, q_idf):
+        """(row ids, cosine, raw BM25) for a query from _query_vectors."""
+        import numpy as np
+        m = self.counts.view()
+        cos = (m @ q_weights) * self._inv_norms[:self.n]
+        # BM25 only needs the query's columns
+        sub = m[:, q_cols]
+        tf = sub.data
+        sub.data = tf * (BM25_K1 + 1) / (tf + np.repeat(self._lengths[:self.n], np.diff(sub.indptr)))
+        return self._rows[:self.n], cos, sub @ q_idf
+
+
+def _category_code(category):
+    """Code of a normalised category name in _category_names, adding it if new."""
+    try:
+        return _category_names.index(category)
+    except ValueError:
+        _category_names.append(category)
+        return len(_category_names) - 1
+
+
+def _live_key(text):
+    return hashlib.sha1(" ".join(str(text).split())[:LIVE_KEY_CHARS].encode('utf-8')).digest()
+
+
+def _clean_category(category):
+    category = "" if category is None else str(category).strip().lower()
+    category = "" if category == "nan" else category
+    return CATEGORY_ALIASES.get(category, category)
+
+
+def has_ticket(text):
+    """True if a live ticket with this text is in the index."""
+    with _lock:
+        return _live_key(text) in _live_rows
+
+
+def _norm_category(category, aliases=None):
+    """Shard name of a label or predicted category."""
+    category = _clean_category(category)
+    aliases = _derived_aliases if aliases is None else aliases
+    return aliases.get(category, category) if aliases else category
+
+
+def _shard_labels(texts, categories):
+    """
+    (shard label per history row, rule category -> history label aliases).
+    Unlabelled history is labelled with the keyword rules, so its shards are
+    keyed by the names predictions use; otherwise each rule category is
+    mapped to the label most of its (sampled) rows carry.
+    """
+    from collections import Counter
+    from llm_classifier import _rule_based
+    labels = set(categories)
+    if len(labels - UNLABELED) <= 1:
+        return [_clean_category(_rule_based(t)['category']) for t in texts], {}
+    votes = {}
+    for i in range(0, len(texts), max(len(texts) // ALIAS_SAMPLE, 1)):
+        votes.setdefault(_rule_based(texts[i])['category'], Counter())[categories[i]] += 1
+    aliases = {}
+    for predicted, counter in votes.items():
+        label, n = counter.most_common(1)[0]
+        if predicted not in labels and label not in UNLABELED and n >= ALIAS_MIN_SHARE * sum(counter.values()):
+            aliases[predicted] = label
+    return categories, aliases
+
+
+def category_aliases():
+    """Rule category -> history label in effect (derived from the history, then CATEGORY_ALIASES)."""
+    global _derived_aliases
+    if _derived_aliases is None and os.path.exists(HIST_PATH):
+        try:
+            import pandas as pd
+            df = pd.read_csv(HIST_PATH, nrows=ALIAS_SAMPLE)
+            texts, categories = _history_columns(df)
+            _derived_aliases = _shard_labels(texts, categories)[1]
+        except Exception as e:
+            print("Could not derive category aliases:", e)
+    return {**(_derived_aliases or {}), **CATEGORY_ALIASES}
+
+
+def _history_columns(df):
+    """(texts to index, cleaned Category labels) of a history DataFrame."""
+    if 'text_clean' in df.columns:
+        texts = df['text_clean'].fillna('').astype(str)
+    elif 'text' in df.columns:
+        texts = df['text'].fillna('').astype(str)
+    else:
+        texts = df.astype(str).apply(lambda r: " ".join(r.values), axis=1)
+    cat_col = 'Category' if 'Category' in df.columns else 'category' if 'category' in df.columns else None
+    categories = [_clean_category(c) for c in df[cat_col]] if cat_col else [""] * len(df)
+    return texts.tolist(), categories
+
 
-_vectorizer = None
-_matrix = None
-_history_df = None
+def _row_stats(counts, idf, avgdl):
+    """(inverse TF-IDF norm, BM25 length factor) of each row of raw counts."""
+    import numpy as np
+    w = counts.tocsr().astype(np.float64)
+    lengths = np.asarray(w.sum(axis=1)).ravel()
+    w.data = (w.data * idf[w.indices]) ** 2
+    norms = np.sqrt(np.asarray(w.sum(axis=1)).ravel())
+    inv_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return inv_norms, BM25_K1 * (1 - BM25_B + BM25_B * lengths / avgdl)
 
-def _build_index(limit_rows: int = 15000):
+
+def _query_vectors(text):
+    """(TF-IDF query weights per term, query term columns, their BM25 idf); caller holds _lock."""
+    counts = _vectorizer.transform([text])
+    q_weights = _tfidf.transform(counts).toarray().ravel() * _tfidf.idf_
+    q_cols = counts.indices
+    return q_weights, q_cols, _bm25_idf[q_cols]
+
+
+def _oov_counts(vectorizer, texts):
+    """Return (total tokens, tokens missing from the fitted vocabulary)."""
+    analyzer = vectorizer.build_analyzer()
+    vocab = vectorizer.vocabulary_
+    total = oov = 0
+    for t in texts:
+        for tok in analyzer(t):
+            total += 1
+            if tok not in vocab:
+                oov += 1
+    return total, oov
+
+
+def _build_index(limit_rows: int = 15000, reason="startup"):
     """
     Lazily build TF-IDF index on first use.
     limit_rows: cap rows for speed; increase later if you want.
+    Live tickets (LIVE_PATH) are refitted together with the history.
+    Rows are partitioned into one shard per category.
     """
-    global _vectorizer, _matrix, _history_df
+    global _vectorizer, _tfidf, _bm25_idf, _bm25_avgdl, _shards, _n_rows, _row_categories, _category_names
+    global _snippets, _limit_rows, _pending_live, _live_rows, _derived_aliases, _refitting
+    global _baseline_oov, _drift_docs, _drift_tokens, _drift_oov
+    _limit_rows = limit_rows
     if not os.path.exists(HIST_PATH):
         print("No historical tickets file found:", HIST_PATH)
         return
 
+    import numpy as np
+    import pandas as pd
+    from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
     try:
+        t0 = time.perf_counter()
+        st = os.stat(HIST_PATH)
+        # the snippet file is only rewritten when the history (or the row cap) changed
+        stamp = (st.st_mtime_ns, st.st_size, limit_rows, SNIPPET_CHARS)
         # Limit rows for faster startup; tune this number to your machine
-        df = pd.read_csv(HIST_PATH, nrows=limit_rows)
-        _history_df = df.reset_index(drop=True)
+        df = pd.read_csv(HIST_PATH, nrows=limit_rows).reset_index(drop=True)
+
+        texts, categories = _history_columns(df)
+        categories, aliases = _shard_labels(texts, categories)
+        n_hist = len(df)
+        snippets = None
+        if SNIPPETS_MMAP and os.path.exists(SNIPPETS_PATH):
+            try:
+                snippets = _SnippetStore.load(SNIPPETS_PATH, stamp)
+            except Exception as e:
+                print("Could not reuse ticket snippets:", e)
+            if snippets is not None and len(snippets) != n_hist:
+                snippets = None
+        if snippets is None:
+            # snippets prefer the original text; the DataFrame is not kept
+            shown = df['text'].astype(str) if 'text' in df.columns else texts
+            snippets = _SnippetStore.build(shown)
+            del shown
+            if SNIPPETS_MMAP:
+                try:
+                    snippets.save(SNIPPETS_PATH, stamp)
+                    snippets = _SnippetStore.load(SNIPPETS_PATH)
+                except Exception as e:
+                    print("Could not memory-map ticket snippets:", e)
+        del df
 
-        if 'text_clean' in df.columns:
-            texts = df['text_clean'].fillna('').astype(str)
-        elif 'text' in df.columns:
-            texts = df['text'].fillna('').astype(str)
-        else:
-            texts = _history_df.astype(str).apply(lambda r: " ".join(r.values), axis=1)
+        # Snapshot the live log under the lock; anything appended after this
+        # point is queued in _pending_live and replayed onto the new index.
+        with _lock:
+            live_texts, live_categories = [], []
+            if os.path.exists(LIVE_PATH):
+                live = pd.read_csv(LIVE_PATH)
+                live['text'] = live['text'].fillna('').astype(str)
+                # a ticket logged again keeps its first row, relabelled by the latest agent feedback
+                keys = live['text'].map(_live_key)
+                if 'Category' in live.columns:
+                    labels = live['Category']
+                    if 'source' in live.columns:
+                        labels = labels.where(~keys.duplicated() | (live['source'] == 'feedback'))
+                    live['Category'] = labels.groupby(keys).transform('last')
+                live = live[~keys.duplicated()].tail(limit_rows)
+                live_texts = live['text'].tolist()
+                live_categories = [_norm_category(c, aliases) for c in live.get('Category', [""] * len(live))]
+            _pending_live = []
+            _refitting = True
 
         # Faster, lighter TF-IDF config for large corpora
-        _vectorizer = TfidfVectorizer(
+        vectorizer = CountVectorizer(
             max_features=20000,
             ngram_range=(1, 2),
             stop_words='english',
             min_df=2,          # drop singletons
-            max_df=0.95        # drop super-common terms
+            max_df=0.95,       # drop super-common terms
+            dtype=np.float32
         )
-        _matrix = _vectorizer.fit_transform(texts)
-        print(f"Built TF-IDF index for {_matrix.shape[0]} historical tickets (limited).")
+        counts = vectorizer.fit_transform(texts + live_texts)
+        tfidf = TfidfTransformer().fit(counts)
+        n_docs = counts.shape[0]
+        doc_freq = np.bincount(counts.indices, minlength=counts.shape[1])
+        bm25_idf = np.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        bm25_avgdl = max(counts.sum() / max(n_docs, 1), 1.0)
+        inv_norms, lengths = _row_stats(counts, tfidf.idf_, bm25_avgdl)
+
+        row_categories = categories + live_categories
+        category_names = sorted(set(row_categories))
+        code_of = {c: i for i, c in enumerate(category_names)}
+        codes = np.fromiter((code_of[c] for c in row_categories), dtype=np.uint16, count=len(row_categories))
+        shards = {}
+        for code, cat in enumerate(category_names):
+            rows = np.flatnonzero(codes == code)
+            shards[cat] = _Shard(counts[rows], inv_norms[rows], lengths[rows], rows,
+                                 history=int(np.count_nonzero(rows < n_hist)))
+        del counts
+        for t in live_texts:
+            snippets.append(t)
+
+        sample = pd.Series(texts).sample(min(len(texts), 500), random_state=0)
+        total, oov = _oov_counts(vectorizer, sample)
+
+        with _lock:
+            _vectorizer, _tfidf = vectorizer, tfidf
+            _bm25_idf, _bm25_avgdl = bm25_idf, bm25_avgdl
+            _shards = shards
+            _n_rows = n_docs
+            _row_categories = array('H', codes.tobytes())
+            _category_names = category_names
+            _snippets = snippets
+            _live_rows = {_live_key(t): n_hist + i for i, t in enumerate(live_texts)}
+            _derived_aliases = aliases
+            _baseline_oov = oov / total if total else 0.0
+            _drift_docs = _drift_tokens = _drift_oov = 0
+            for t, c, relabel in _pending_live:
+                if relabel:
+                    _relabel_row(t, c)
+                else:
+                    _append_row(t, c)
+            _pending_live = []
+            _refitting = False
+        INDEX_BUILD_SECONDS.set(time.perf_counter() - t0)
+        INDEX_REFITS.inc(reason=reason)
+        print(f"Built TF-IDF index for {_n_rows} tickets "
+              f"({n_hist} historical, {_n_rows - n_hist} live, {len(shards)} category shards).")
+        if aliases:
+            print("Category aliases derived from the history:", aliases)
     except KeyboardInterrupt:
         # If you stop it mid-way, leave things unset
         _vectorizer = None
-        _matrix = None
-        _history_df = None
+        _shards = None
+        _snippets = None
+        _refitting = False
         print("TF-IDF build interrupted; index not ready.")
     except Exception as e:
         _vectorizer = None
-        _matrix = None
-        _history_df = None
+        _shards = None
+        _snippets = None
+        _refitting = False
         print("Could not build TF-IDF index:", e)
 
 
+# ------------------ INCREMENTAL APPEND ------------------ #
+
+def _append_row(text, category=None):
+    """Transform with the current vocabulary and append to the category's shard; caller holds _lock."""
+    global _n_rows, _drift_docs, _drift_tokens, _drift_oov
+    import scipy.sparse as sp
+    category = _norm_category(category)
+    counts = _vectorizer.transform([text])
+    shard = _shards.get(category)
+    if shard is None:
+        shard = _shards[category] = _Shard(sp.csr_matrix((0, counts.shape[1]), dtype=counts.dtype), [], [], [])
+    inv_norms, lengths = _row_stats(counts, _tfidf.idf_, _bm25_avgdl)
+    shard.append(counts, inv_norms[0], lengths[0], _n_rows)
+    _live_rows[_live_key(text)] = _n_rows
+    _n_rows += 1
+    _row_categories.append(_category_code(category))
+    _snippets.append(text)
+    total, oov = _oov_counts(_vectorizer, [text])
+    _drift_docs += 1
+    INDEX_APPENDS.inc()
+    _drift_tokens += total
+    _drift_oov += oov
+
+
+def _relabel_row(text, category=None):
+    """Move the live row logged for text to the category's shard (append it if unknown); caller holds _lock."""
+    import scipy.sparse as sp
+    row = _live_rows.get(_live_key(text))
+    if row is None:
+        _append_row(text, category)
+        return
+    category = _norm_category(category)
+    old = _category_names[_row_categories[row]]
+    if old == category:
+        return
+    counts_row, inv_norm, length = _shards[old].remove(row)
+    shard = _shards.get(category)
+    if shard is None:
+        shard = _shards[category] = _Shard(sp.csr_matrix((0, counts_row.shape[1]), dtype=counts_row.dtype),
+                                           [], [], [])
+    shard.append(counts_row, inv_norm, length, row)
+    _row_categories[row] = _category_code(category)
+
+
+def _drift_exceeded():
+    if _drift_docs < DRIFT_MIN_DOCS or not _drift_tokens:
+        return False
+    return (_drift_oov / _drift_tokens) - _baseline_oov > DRIFT_THRESHOLD
+
+
+def add_ticket(text, category=None, source="analyze", replace=False):
+    """
+    Append a new ticket to the similarity index without refitting.
+    The ticket is persisted to LIVE_PATH so rebuilds keep it; a full refit
+    runs in the background once vocabulary drift exceeds DRIFT_THRESHOLD.
+    With replace=True an already indexed live ticket with the same text is
+    relabelled instead of indexed twice (agent feedback on an analysed ticket).
+    """
+    global _refitting
+    text = (text or "").strip()
+    if not text:
+        return
+
+    refit = False
+    with _lock:
+        new_file = not os.path.exists(LIVE_PATH)
+        with open(LIVE_PATH, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(["timestamp", "source", "Category", "text"])
+            writer.writerow([datetime.now().isoformat(), source, category or "", text])
+
+        if _refitting:
+            _pending_live.append((text, category, replace))
+        elif _vectorizer is not None and _shards is not None:
+            try:
+                if replace:
+                    _relabel_row(text, category)
+                else:
+                    _append_row(text, category)
+            except Exception as e:
+                print("Could not append ticket to index:", e)
+                return
+            refit = _drift_exceeded()
+            if refit:
+                _refitting = True
+                _pending_live.clear()
+
+    if refit:
+        print("Vocabulary drift above threshold; refitting TF-IDF index.")
+        threading.Thread(target=_build_index, args=(_limit_rows, "drift"), daemon=True).start()
+
+
 # ------------------ FIND SIMILAR TICKETS ------------------ #
 
-def find_similar_tickets(text, top_k=3):
-    global _vectorizer, _matrix, _history_df
+def _fuse(cos, bm25):
+    top = bm25.max() if bm25.size else 0.0
+    if BM25_WEIGHT <= 0 or top <= 0:
+        return cos
+    return (1 - BM25_WEIGHT) * cos + BM25_WEIGHT * (bm25 / top)
+
+
+def find_similar_tickets(text, top_k=3, category=None):
+    """
+    Top-k similar historical tickets ranked by fused cosine + BM25 score.
+    With a (predicted) category, that category's shard (mapped through
+    CATEGORY_ALIASES) is searched first, provided it holds historical tickets,
+    and the search widens to all shards when it has fewer than top_k tickets
+    with cosine >= SHARD_MIN_SIMILARITY.
+    """
+    return [hit.to_dict() for hit in find_similar(text, top_k, category)]
+
 
+def find_similar(text, top_k=3, category=None):
+    """find_similar_tickets returning SimilarTicket records."""
     # Lazy build if not ready
-    if _vectorizer is None or _matrix is None or _history_df is None:
+    if _vectorizer is None or _shards is None or _snippets is None:
         _build_index(limit_rows=15000)  # tweak this number if needed
 
-    if _vectorizer is None or _matrix is None or _history_df is None:
+    if _vectorizer is None or _shards is None or _snippets is None:
         return []
 
+    import numpy as np
     try:
-        vec = _vectorizer.transform([text])
-        sims = cosine_similarity(vec, _matrix)[0]
-        idxs = sims.argsort()[::-1][:top_k]
-        results = []
-        for i in idxs:
-            if 'text' in _history_df.columns:
-                snippet = str(_history_df['text'].iloc[i])[:400]
-            elif 'text_clean' in _history_df.columns:
-                snippet = str(_history_df['text_clean'].iloc[i])[:400]
-            else:
-                snippet = " ".join(map(str, _history_df.iloc[i].values))[:400]
-            results.append({
-                'id': int(i),
-                'similarity': float(sims[i]),
-                'snippet': snippet
-            })
+        with _lock:
+            query = _query_vectors(text)
+
+            first = _shards.get(_norm_category(category)) if category else None
+            if first is not None and not first.history:
+                # a shard of live tickets only would hide the whole history
+                first = None
+            parts, scope = [], 'global'
+            if first is not None:
+                parts.append(first.score(*query))
+                scope = 'shard' if np.count_nonzero(parts[0][1] >= SHARD_MIN_SIMILARITY) >= top_k else 'fallback'
+            if scope != 'shard':
+                parts += [sh.score(*query) for sh in _shards.values() if sh is not first]
+
+            rows = np.concatenate([p[0] for p in parts])
+            cos = np.concatenate([p[1] for p in parts])
+            fused = _fuse(cos, np.concatenate([p[2] for p in parts]))
+            SEARCHES.inc(scope=scope)
+            CANDIDATES.inc(int(rows.size))
+            best = _top_k(fused, top_k, -np.inf)
+            hits = rows[best].tolist()
+            results = [
+                SimilarTicket(row, sim, score, _category_names[_row_categories[row]], _snippets.get(row))
+                for row, sim, score in zip(hits, cos[best].tolist(), fused[best].tolist())
+            ]
         return results
     except Exception:
         return []
@@ -94,21 +723,124 @@ def find_similar_tickets(text, top_k=3):
 
 # ------------------ RECOMMEND KNOWLEDGE BASE ARTICLES ------------------ #
 
-def recommend_articles(text, top_k=3):
+_kb_lock = threading.Lock()
+_kb_index = None   # (mtime, df, vectorizer, matrix), rebuilt when KB_PATH changes
+_kb_bm25 = None    # BM25Index kept across KB reloads and updated by diff (KB_ENGINE=bm25)
+
+
+def _load_kb_index():
+    """TF-IDF index over KB content, cached until the KB file changes."""
+    global _kb_index
     if not os.path.exists(KB_PATH):
-        return []
+        return None
+    mtime = os.path.getmtime(KB_PATH)
+    with _kb_lock:
+        if _kb_index is not None and _kb_index[0] == mtime:
+            KB_CACHE.inc(result='hit')
+            return _kb_index
+        KB_CACHE.inc(result='miss')
+        import pandas as pd
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        df = pd.read_csv(KB_PATH)
+        if KB_ENGINE == 'bm25':
+            _kb_index = (mtime,) + _sync_kb_bm25(df.reset_index(drop=True))
+            return _kb_index
+        if df.empty:
+            _kb_index = (mtime, df, None, None)
+            return _kb_index
+        kb_texts = df['content'].fillna('').astype(str)
+        # stop words would otherwise give unrelated articles a score above KB_MIN_SIMILARITY
+        kb_vectorizer = TfidfVectorizer(max_features=20000, ngram_range=(1, 2), stop_words='english')
+        try:
+            kb_matrix = kb_vectorizer.fit_transform(kb_texts)
+        except ValueError:
+            # only stop words / empty content
+            _kb_index = (mtime, df.reset_index(drop=True), None, None)
+            return _kb_index
+        _kb_index = (mtime, df.reset_index(drop=True), kb_vectorizer, kb_matrix)
+        return _kb_index
+
+
+def _sync_kb_bm25(df):
+    """
+    Bring the BM25 index in line with the KB rows: articles that appeared are
+    added and articles that disappeared are deleted, so appending a few
+    generated articles does not re-index the whole KB. Returns (df, index, rows)
+    where rows maps an index key to its df row.
+    """
+    global _kb_bm25
+    import bm25
+    if _kb_bm25 is None:
+        _kb_bm25 = bm25.BM25Index(fields=('title', 'content'), weights={'title': KB_TITLE_WEIGHT})
+    titles = df['title'].fillna('').astype(str).tolist() if 'title' in df.columns else [''] * len(df)
+    contents = df['content'].fillna('').astype(str).tolist()
+    rows = {}
+    for i, (aid, title, content) in enumerate(zip(df['article_id'].astype(str), titles, contents)):
+        rows.setdefault((aid, title, hash(content)), i)
+    for key in set(_kb_bm25.ids()) - rows.keys():
+        _kb_bm25.delete(key)
+    for key, i in rows.items():
+        if key not in _kb_bm25:
+            _kb_bm25.add(key, {'title': titles[i], 'content': contents[i]})
+    return df, _kb_bm25, rows
+
+
+def update_index_gauges():
+    """Refresh size gauges before metrics are rendered."""
+    INDEX_ROWS.set(_n_rows if _shards is not None else 0)
+    INDEX_SHARDS.set(len(_shards) if _shards is not None else 0)
+    KB_ARTICLES.set(len(_kb_index[1]) if _kb_index is not None else 0)
 
-    df = pd.read_csv(KB_PATH)
-    if df.empty:
-        return []
 
-    kb_texts = df['content'].fillna('').astype(str)
-    kb_vectorizer = TfidfVectorizer(max_features=20000, ngram_range=(1, 2))
-    kb_matrix = kb_vectorizer.fit_transform(kb_texts)
+def reload_kb_index():
+    """Drop the cached KB index so the next query rebuilds it (the BM25 index is diffed instead)."""
+    global _kb_index
+    with _kb_lock:
+        _kb_index = None
+
+
+def _top_k(scores, k, min_score):
+    """
+    Indices of the k best scores that reach min_score, best first.
+    Below-threshold scores are dropped before ranking and argpartition
+    selects the top k in O(n), so only k items get fully sorted.
+    """
+    import numpy as np
+    cand = np.flatnonzero(scores >= min_score)
+    if cand.size > k:
+        cand = cand[np.argpartition(scores[cand], -k)[-k:]]
+    return cand[np.argsort(scores[cand])[::-1]]
+
+
+def score_articles(text, top_k=3, min_similarity=None):
+    """
+    Score KB articles against text.
+    Returns (articles, stats): articles scoring below min_similarity
+    (default KB_MIN_SIMILARITY) are dropped, so an empty list means a real
+    content gap; stats summarises the score distribution of this query.
+    """
+    if min_similarity is None:
+        min_similarity = KB_MIN_BM25_SCORE if KB_ENGINE == 'bm25' else KB_MIN_SIMILARITY
+    stats = {'scored': 0, 'above_threshold': 0, 'max': 0.0, 'mean': 0.0, 'min_similarity': min_similarity}
+
+    index = _load_kb_index()
+    if index is None or index[2] is None:
+        return [], stats
+    if KB_ENGINE == 'bm25':
+        return _score_articles_bm25(text, top_k, min_similarity, index, stats)
+    _, df, kb_vectorizer, kb_matrix = index
+    import numpy as np
+    from sklearn.metrics.pairwise import cosine_similarity
 
     vec = kb_vectorizer.transform([text])
     sims = cosine_similarity(vec, kb_matrix)[0]
-    idxs = sims.argsort()[::-1][:top_k]
+    idxs = _top_k(sims, top_k, min_similarity)
+    stats.update({
+        'scored': int(sims.size),
+        'above_threshold': int(np.count_nonzero(sims >= min_similarity)),
+        'max': float(sims.max()),
+        'mean': float(sims.mean())
+    })
 
     results = []
     for i in idxs:
@@ -117,6 +849,38 @@ def recommend_articles(text, top_k=3):
             "title": df['title'].iloc[i],
             "link": df['link'].iloc[i],
             "similarity": float(sims[i]),
-            "summary": df['content'].iloc[i][:200]
+            "summary": str(df['content'].iloc[i])[:200]
         })
-    return results
+    return results, stats
+
+
+def _score_articles_bm25(text, top_k, min_similarity, index, stats):
+    """score_articles for KB_ENGINE=bm25 (scores are BM25, not cosine)."""
+    _, df, engine, rows = index
+    with _kb_lock:
+        hits, search = engine.search(text, k=top_k, min_score=min_similarity)
+    # candidates dropped by MaxScore pruning are never fully scored, so the
+    # counts cover the articles that were
+    stats.update({
+        'scored': search['candidates'],
+        'above_threshold': search['above_min'],
+        'max': hits[0][1] if hits else 0.0,
+        'mean': search['mean'],
+        'engine': 'bm25',
+        'postings_scored': search['postings']
+    })
+    results = []
+    for key, score in hits:
+        i = rows[key]
+        results.append({
+            "article_id": df['article_id'].iloc[i],
+            "title": df['title'].iloc[i],
+            "link": df['link'].iloc[i],
+            "similarity": float(score),
+            "summary": str(df['content'].iloc[i])[:200]
+        })
+    return results, stats
+
+
+def recommend_articles(text, top_k=3, min_similarity=None):
+    return score_articles(text, top_k=top_k, min_similarity=min_similarity)[0]
@@ -1,6 +1,11 @@
 document.addEventListener('DOMContentLoaded', function(){
   const logsDiv = document.getElementById('logs');
   const fbDiv = document.getElementById('feedback');
+  const clustersDiv = document.getElementById('clusters');
+  const metricsDiv = document.getElementById('metrics');
+  const profilesDiv = document.getElementById('profiles');
+  const breakerDiv = document.getElementById('breaker');
+  const profileRate = document.getElementById('profileRate');
 
   document.getElementById('loadLogs').addEventListener('click', async () => {
     logsDiv.innerHTML = 'Loading…';
@@ -42,6 +47,126 @@ document.addEventListener('DOMContentLoaded', function(){
     } catch(e){ fbDiv.innerHTML = `<em>Error: ${e.message}</em>`; }
   });
 
+  document.getElementById('loadClusters').addEventListener('click', async () => {
+    clustersDiv.innerHTML = 'Loading…';
+    try {
+      const res = await fetch('/admin/api/clusters', { credentials: 'include' });
+      if (res.status === 401) {
+        clustersDiv.innerHTML = '<em>Authentication required. Open <a href="/admin">/admin</a> in this browser and sign in, then try again.</em>';
+        return;
+      }
+      const data = await res.json();
+      if(!data || !data.length){ clustersDiv.innerHTML = '<em>No clusters yet</em>'; return; }
+      let trs = data.map(c => {
+        const flag = c.size > 1 ? ' style="font-weight:bold"' : '';
+        return `<tr${flag}><td>${c.cluster_id}</td><td>${c.size}</td><td>${escapeHtml(c.first_seen || '')}</td><td>${escapeHtml(c.last_seen || '')}</td><td>${escapeHtml(c.excerpt || '')}</td></tr>`;
+      }).join('');
+      clustersDiv.innerHTML = `<table><thead><tr><th>cluster</th><th>tickets</th><th>first seen</th><th>last seen</th><th>excerpt</th></tr></thead><tbody>${trs}</tbody></table>`;
+    } catch(e){ clustersDiv.innerHTML = `<em>Error: ${e.message}</em>`; }
+  });
+
+  document.getElementById('loadMetrics').addEventListener('click', async () => {
+    metricsDiv.innerHTML = 'Loading…';
+    try {
+      const res = await fetch('/admin/api/metrics', { credentials: 'include' });
+      if (res.status === 401) {
+        metricsDiv.innerHTML = '<em>Authentication required. Open <a href="/admin">/admin</a> in this browser and sign in, then try again.</em>';
+        return;
+      }
+      const data = await res.json();
+      const fmt = v => (v === null || v === undefined) ? '—' : (typeof v === 'number' ? (Number.isInteger(v) ? v : v.toFixed(3)) : escapeHtml(String(v)));
+      const pct = v => (v === null || v === undefined) ? '—' : (v * 100).toFixed(1) + '%';
+
+      const stages = data.ticket_analyze_stage_seconds || {};
+      let stageRows = Object.entries(stages).map(([stage, h]) =>
+        `<tr><td>${escapeHtml(stage)}</td><td>${h.count}</td><td>${fmt(h.mean_ms)}</td><td>${fmt(h.p50_ms)}</td><td>${fmt(h.p95_ms)}</td><td>${fmt(h.p99_ms)}</td></tr>`
+      ).join('');
+      const llm = data.llm_call_seconds || {};
+      stageRows += Object.entries(llm).map(([kind, h]) =>
+        `<tr><td>llm: ${escapeHtml(kind)}</td><td>${h.count}</td><td>${fmt(h.mean_ms)}</td><td>${fmt(h.p50_ms)}</td><td>${fmt(h.p95_ms)}</td><td>${fmt(h.p99_ms)}</td></tr>`
+      ).join('');
+
+      const d = data.derived || {};
+      const calls = Object.entries(data.llm_calls_total || {}).map(([k, v]) => `${escapeHtml(k)}: ${v}`).join(', ') || '—';
+      metricsDiv.innerHTML = `
+        <table><thead><tr><th>stage</th><th>count</th><th>mean ms</th><th>p50 ms</th><th>p95 ms</th><th>p99 ms</th></tr></thead>
+        <tbody>${stageRows || '<tr><td colspan="6"><em>No requests yet</em></td></tr>'}</tbody></table>
+        <p class="small">
+          Index: ${fmt((data.similarity_index_rows || {}).total)} tickets (last build ${fmt((data.similarity_index_build_seconds || {}).total)} s),
+          ${fmt((data.kb_index_articles || {}).total)} KB articles<br>
+          LLM calls: ${calls} — fallback rate ${pct(d.llm_fallback_rate)}<br>
+          Near-duplicate hit ratio ${pct(d.near_duplicate_hit_ratio)}, KB index cache hit ratio ${pct(d.kb_index_cache_hit_ratio)}
+        </p>
+        <p class="small">Raw Prometheus metrics: <a href="/metrics">/metrics</a> (per worker process)</p>`;
+    } catch(e){ metricsDiv.innerHTML = `<em>Error: ${e.message}</em>`; }
+  });
+
+  function renderBreaker(b){
+    const colors = {closed: '#06D6A0', half_open: '#FFD166', open: '#FF6B6B'};
+    const retry = b.retry_in_seconds === null ? '' : ` — probing again in ${b.retry_in_seconds.toFixed(0)} s`;
+    breakerDiv.innerHTML = `
+      <p><strong style="color:${colors[b.state] || '#999'}">${escapeHtml(b.state.toUpperCase())}</strong>${retry}</p>
+      <p class="small">
+        Last ${b.window_calls} calls: ${(b.error_rate * 100).toFixed(0)}% errors, ${(b.slow_rate * 100).toFixed(0)}% slow
+        (&ge; ${b.config.slow_call_seconds} s) — trips ${b.trips}, calls served by fallback while open ${b.rejected}<br>
+        Opens at ${(b.config.error_rate * 100).toFixed(0)}% errors or ${(b.config.slow_rate * 100).toFixed(0)}% slow calls
+        over ${b.config.window} calls (min ${b.config.min_calls}); stays open ${b.config.open_seconds} s.
+        Last change ${escapeHtml(b.last_change)}. State is per worker process.
+      </p>`;
+  }
+
+  async function loadBreaker(method){
+    breakerDiv.innerHTML = 'Loading…';
+    try {
+      const url = method === 'POST' ? '/admin/api/llm_breaker/reset' : '/admin/api/llm_breaker';
+      const res = await fetch(url, { method: method || 'GET', credentials: 'include' });
+      if (res.status === 401) {
+        breakerDiv.innerHTML = '<em>Authentication required. Open <a href="/admin">/admin</a> in this browser and sign in, then try again.</em>';
+        return;
+      }
+      renderBreaker(await res.json());
+    } catch(e){ breakerDiv.innerHTML = `<em>Error: ${e.message}</em>`; }
+  }
+
+  document.getElementById('loadBreaker').addEventListener('click', () => loadBreaker('GET'));
+  document.getElementById('resetBreaker').addEventListener('click', () => loadBreaker('POST'));
+
+  async function loadProfiles(){
+    profilesDiv.innerHTML = 'Loading…';
+    try {
+      const res = await fetch('/admin/api/profiles', { credentials: 'include' });
+      if (res.status === 401) {
+        profilesDiv.innerHTML = '<em>Authentication required. Open <a href="/admin">/admin</a> in this browser and sign in, then try again.</em>';
+        return;
+      }
+      const data = await res.json();
+      profileRate.value = data.sample_rate;
+      if(!data.profiles || !data.profiles.length){ profilesDiv.innerHTML = '<em>No profiles recorded</em>'; return; }
+      let trs = data.profiles.map(p => {
+        const top = (p.top || []).map(t => `${escapeHtml(t.function)} (${t.cumulative_ms.toFixed(1)} ms)`).join('<br>');
+        return `<tr><td><a href="/admin/profiles/${encodeURIComponent(p.request_id)}">${escapeHtml(p.request_id)}</a></td><td>${escapeHtml(p.timestamp || '')}</td><td>${p.duration_ms.toFixed(1)}</td><td>${escapeHtml(p.filename || '')}</td><td class="small">${top}</td></tr>`;
+      }).join('');
+      profilesDiv.innerHTML = `<table><thead><tr><th>request id (.prof)</th><th>time</th><th>duration ms</th><th>file</th><th>top functions</th></tr></thead><tbody>${trs}</tbody></table>`;
+    } catch(e){ profilesDiv.innerHTML = `<em>Error: ${e.message}</em>`; }
+  }
+
+  document.getElementById('loadProfiles').addEventListener('click', loadProfiles);
+
+  document.getElementById('saveProfileRate').addEventListener('click', async () => {
+    try {
+      const res = await fetch('/admin/api/profiling', {
+        method: 'POST',
+        credentials: 'include',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({sample_rate: parseFloat(profileRate.value || '0')})
+      });
+      const data = await res.json();
+      if (data.error) { alert(data.error); return; }
+      profileRate.value = data.sample_rate;
+      loadProfiles();
+    } catch(e){ profilesDiv.innerHTML = `<em>Error: ${e.message}</em>`; }
+  });
+
   document.getElementById('downloadLogs').addEventListener('click', () => {
     window.location = '/admin/download/llm_logs.jsonl';
   });
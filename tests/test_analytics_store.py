@@ -0,0 +1,84 @@
+"""analytics_store: offset-based incremental sync of the append-only CSVs."""
+import os
+
+import pytest
+
+import analytics_store
+
+HEADER = "timestamp,original_text,final_category,final_tags,final_priority,agent_note\n"
+
+
+def row(i, text=None, tags="login"):
+    return f'2025-06-{i % 28 + 1:02d}T10:00:00,"{text or f"ticket {i}"}",account,"{tags}",High,\n'
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_store, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(analytics_store, 'DB_PATH', str(tmp_path / "analytics.db"))
+    return analytics_store
+
+
+def feedback(store):
+    return os.path.join(store.DATA_DIR, "feedback.csv")
+
+
+def append(store, text):
+    with open(feedback(store), 'a', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+def test_appended_rows_are_read_from_the_last_offset(store):
+    append(store, HEADER + "".join(row(i) for i in range(3)))
+    assert store.sync()['feedback'] == 3
+    assert store.sync()['feedback'] == 0
+
+    append(store, row(3) + row(4))
+    assert store.sync()['feedback'] == 2
+    assert store.count('feedback') == 5
+    assert dict(store.tag_counts()) == {'login': 5}
+    assert [r['original_text'] for r in store.page('feedback', limit=2)] == ["ticket 4", "ticket 3"]
+
+
+def test_partial_trailing_record_waits_for_the_next_sync(store):
+    append(store, HEADER + row(0))
+    store.sync()
+    # a writer is half-way through a record, with a newline inside a quoted field
+    full = row(1, text="first line\nsecond line")
+    cut = full.index("\n") + 1
+    append(store, full[:cut])
+    assert store.sync()['feedback'] == 0
+    append(store, full[cut:-1])
+    assert store.sync()['feedback'] == 0
+    append(store, "\n")
+    assert store.sync()['feedback'] == 1
+    assert store.page('feedback', limit=1)[0]['original_text'] == "first line\nsecond line"
+    assert store.count('feedback') == 2
+
+
+def test_rewritten_or_truncated_file_is_reloaded(store):
+    append(store, HEADER + "".join(row(i) for i in range(4)))
+    store.sync()
+    # same size, different content: the head hash no longer matches
+    with open(feedback(store), 'w', encoding='utf-8', newline='') as f:
+        f.write(HEADER + "".join(row(i, text=f"other {i}") for i in range(4)))
+    assert store.sync()['feedback'] == 4
+    assert store.count('feedback') == 4
+    assert {r['original_text'] for r in store.page('feedback')} == {f"other {i}" for i in range(4)}
+
+    with open(feedback(store), 'w', encoding='utf-8', newline='') as f:
+        f.write(HEADER + row(9))
+    assert store.sync()['feedback'] == 1
+    assert store.count('feedback') == 1
+    assert store.count('feedback', '2025-06-10', '2025-06-10') == 1
+
+
+def test_rebuild_matches_incremental_sync(store):
+    append(store, HEADER)
+    for i in range(20):
+        append(store, row(i, tags="billing,urgent" if i % 2 else "login"))
+        store.sync()
+    incremental = (store.count('feedback'), store.timeline('feedback'), store.tag_counts())
+    store.sync(rebuild=True)
+    assert (store.count('feedback'), store.timeline('feedback'), store.tag_counts()) == incremental
+    assert incremental[0] == 20
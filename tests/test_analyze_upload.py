@@ -0,0 +1,66 @@
+"""Repeat uploads answered from the upload cache still count as tickets (gaps, duplicate clusters, index)."""
+import io
+
+import pandas as pd
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import app
+import content_gaps
+import near_duplicates
+import similarity
+import upload_cache
+
+TICKET = b"The printer on the third floor is jammed and shows a paper feed error again today"
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    pd.DataFrame([{'article_id': 'KB1', 'title': 'Reset your password',
+                   'content': 'Use the forgot password link on the login page', 'link': '#'}]).to_csv(
+        tmp_path / "knowledge_base.csv", index=False)
+    pd.DataFrame([{'text': f"cannot login after password reset {i}", 'Category': 'Account'} for i in range(10)]
+                 + [{'text': f"printer paper jam on floor {i}", 'Category': 'Technical'} for i in range(10)]).to_csv(
+        tmp_path / "processed_tickets.csv", index=False)
+    monkeypatch.setattr(similarity, 'KB_PATH', str(tmp_path / "knowledge_base.csv"))
+    monkeypatch.setattr(similarity, 'HIST_PATH', str(tmp_path / "processed_tickets.csv"))
+    monkeypatch.setattr(similarity, 'LIVE_PATH', str(tmp_path / "live_tickets.csv"))
+    monkeypatch.setattr(similarity, 'SNIPPETS_PATH', str(tmp_path / "ticket_snippets.bin"))
+    for name in ('_kb_index', '_vectorizer', '_tfidf', '_shards', '_snippets', '_derived_aliases'):
+        monkeypatch.setattr(similarity, name, None)
+    monkeypatch.setattr(similarity, '_pending_live', [])
+    monkeypatch.setattr(similarity, '_refitting', False)
+    monkeypatch.setattr(content_gaps, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(content_gaps, 'GAP_LOG', str(tmp_path / "content_gaps.csv"))
+    monkeypatch.setattr(content_gaps, '_groups', None)
+    monkeypatch.setattr(content_gaps, '_mtime', None)
+    monkeypatch.setattr(upload_cache, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(upload_cache, 'DB_PATH', str(tmp_path / "upload_cache.db"))
+    monkeypatch.setattr(upload_cache, 'ENABLED', True)
+    monkeypatch.setattr(near_duplicates, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(near_duplicates, 'DB_PATH', str(tmp_path / "near_duplicates.db"))
+    return tmp_path
+
+
+def upload(data):
+    return app.analyze_upload(FileStorage(stream=io.BytesIO(data), filename="ticket.txt"), data)
+
+
+def test_cache_hit_keeps_bookkeeping(pipeline):
+    first = upload(TICKET)
+    assert 'cache' not in first and first['recommended_articles'] == []
+    n_rows = similarity._n_rows
+
+    second = upload(TICKET)
+    assert second['cache']['hit']
+    assert second['llm_result'] == first['llm_result']
+    # the gap group and the duplicate cluster count both uploads
+    assert content_gaps.load_groups()['count'].tolist() == [2]
+    assert [c['size'] for c in near_duplicates.clusters()] == [2]
+    # the ticket is not indexed twice
+    assert similarity._n_rows == n_rows and similarity.has_ticket(TICKET.decode())
+
+
+def test_unreadable_upload(pipeline):
+    assert upload(b"   ") is None
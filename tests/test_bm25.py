@@ -0,0 +1,115 @@
+"""bm25: MaxScore pruning, skip-block lookups and delete/compaction against a brute-force BM25F."""
+import math
+import random
+
+import pytest
+
+import bm25
+
+WORDS = [f"w{i}" for i in range(40)]
+WEIGHTS = {'title': 2.0}
+
+
+def corpus(n, seed=0):
+    rng = random.Random(seed)
+    # a skewed vocabulary gives long postings for common words and short ones for rare words
+    pick = lambda m: " ".join(rng.choices(WORDS, weights=[1 / (i + 1) for i in range(len(WORDS))], k=m))
+    return {f"doc{i}": {'title': pick(rng.randint(1, 4)), 'content': pick(rng.randint(5, 30))} for i in range(n)}
+
+
+def build(docs):
+    index = bm25.BM25Index(weights=WEIGHTS)
+    for doc_id, fields in docs.items():
+        index.add(doc_id, fields)
+    return index
+
+
+def reference(docs, query, k, min_score=0.0, k1=1.2, b=0.75):
+    """BM25F computed directly from the documents."""
+    fields, weights = ('title', 'content'), (WEIGHTS['title'], 1.0)
+    tokens = {d: [bm25.tokenize(f[name]) for name in fields] for d, f in docs.items()}
+    n = len(docs)
+    avg = [sum(len(t[fi]) for t in tokens.values()) / n for fi in range(len(fields))]
+    scores = {}
+    for term in set(bm25.tokenize(query)):
+        df = sum(1 for t in tokens.values() if any(term in field for field in t))
+        if not df:
+            continue
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        for d, t in tokens.items():
+            wtf = sum(w * t[fi].count(term) / (1 - b + b * len(t[fi]) / avg[fi]) for fi, w in enumerate(weights))
+            if wtf:
+                scores[d] = scores.get(d, 0.0) + idf * wtf * (k1 + 1) / (wtf + k1)
+    top = sorted(((s, d) for d, s in scores.items() if s >= min_score), reverse=True)[:k]
+    return [(d, s) for s, d in top]
+
+
+def assert_same(got, expected):
+    assert [d for d, _ in got] == [d for d, _ in expected]
+    assert [s for _, s in got] == pytest.approx([s for _, s in expected])
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # several skip blocks per postings list on a test-sized corpus
+    monkeypatch.setattr(bm25, 'SKIP_INTERVAL', 4)
+
+
+QUERIES = ["w0 w1 w2", "w5 w30 w31", "w3 w17 w38 w39", "w0 w12", "w25 w26 w27 w28 w29", "w1 w2 w3 w4 w5 w6"]
+
+
+@pytest.mark.parametrize("k", [1, 3, 10])
+def test_pruned_search_matches_exhaustive_scoring(small_blocks, k):
+    docs = corpus(300)
+    index = build(docs)
+    pruned = 0
+    for query in QUERIES:
+        got, stats = index.search(query, k=k)
+        exhaustive, full = index.search(query, k=k, prune=False)
+        assert_same(got, reference(docs, query, k))
+        assert_same(exhaustive, got)
+        assert stats['postings'] <= full['postings']
+        pruned += stats['pruned']
+    assert pruned > 0
+
+
+def test_min_score(small_blocks):
+    docs = corpus(200)
+    index = build(docs)
+    top = reference(docs, "w0 w9 w33", 5)
+    threshold = (top[2][1] + top[3][1]) / 2
+    got, _ = index.search("w0 w9 w33", k=5, min_score=threshold)
+    assert_same(got, reference(docs, "w0 w9 w33", 5, min_score=threshold))
+    assert len(got) == 3
+
+
+def test_delete_and_compact(small_blocks, monkeypatch):
+    monkeypatch.setattr(bm25, 'COMPACT_RATIO', 0.2)
+    docs = corpus(100, seed=1)
+    index = build(docs)
+
+    # tombstoned documents stop scoring before compaction ...
+    for i in range(0, 30, 2):
+        assert index.delete(f"doc{i}")
+        del docs[f"doc{i}"]
+    assert index._deleted == 15 and len(index._ids) == 100
+    for query in QUERIES:
+        assert_same(index.search(query, k=5)[0], reference(docs, query, 5))
+
+    # ... and are dropped, with the postings renumbered, once COMPACT_RATIO of them pile up
+    for i in range(30, 42, 2):
+        index.delete(f"doc{i}")
+        del docs[f"doc{i}"]
+    assert index._deleted == 0 and len(index._ids) == len(index) == len(docs)
+    assert not index.delete("doc0") and "doc0" not in index
+    for query in QUERIES:
+        assert_same(index.search(query, k=5)[0], reference(docs, query, 5))
+
+    # updates after compaction keep the skip lists consistent
+    docs["doc1"] = {'title': "w39 w39", 'content': "w38"}
+    docs["new"] = {'title': "w37", 'content': "w39 w0"}
+    for doc_id in ("doc1", "new"):
+        index.add(doc_id, docs[doc_id])
+    assert len(index) == len(docs)
+    for query in QUERIES + ["w39 w37 w38"]:
+        assert_same(index.search(query, k=5)[0], reference(docs, query, 5))
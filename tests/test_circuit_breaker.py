@@ -0,0 +1,92 @@
+"""Circuit breaker around the OpenAI client, driven by a fault-injecting stub."""
+import pytest
+
+import circuit_breaker
+import llm_classifier
+import online_model
+from circuit_breaker import CircuitBreaker
+
+TICKET = "I was charged twice for my subscription"
+ANSWER = '{"category": "payment", "tags": ["billing"], "suggested_priority": "High", "solution": "Refund", "confidence": 0.9}'
+
+
+class StubOpenAI:
+    """Stands in for the openai module; fails while `failing` is set."""
+
+    def __init__(self):
+        self.failing = False
+        self.calls = 0
+        self.ChatCompletion = self
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.failing:
+            raise TimeoutError("stub: injected failure")
+        return {'choices': [{'message': {'content': ANSWER}}]}
+
+
+@pytest.fixture
+def llm(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(circuit_breaker, 'monotonic', lambda: clock[0])
+    breaker = CircuitBreaker("openai", window=4, min_calls=4, error_rate=0.5, open_seconds=30)
+    stub = StubOpenAI()
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(llm_classifier, 'OPENAI_AVAILABLE', True)
+    monkeypatch.setattr(llm_classifier, '_openai', stub)
+    monkeypatch.setattr(llm_classifier, 'LLM_BREAKER', breaker)
+    monkeypatch.setattr(llm_classifier, 'LLM_LOG_PATH', str(tmp_path / "llm_logs.jsonl"))
+    monkeypatch.setattr(online_model, 'MODEL_PATH', str(tmp_path / "online_model.pkl"))
+    stub.clock = clock
+    stub.breaker = breaker
+    return stub
+
+
+def test_trip_short_circuit_probe_and_recovery(llm):
+    breaker = llm.breaker
+    assert llm_classifier.classify_text(TICKET)['confidence'] == 0.9
+    assert breaker.state == circuit_breaker.CLOSED
+
+    # failures trip the breaker once half of the window failed
+    llm.failing = True
+    for _ in range(3):
+        llm_classifier.classify_text(TICKET)
+    assert breaker.state == circuit_breaker.OPEN and breaker.trips == 1
+    assert breaker.snapshot()['retry_in_seconds'] == 30
+
+    # while open, calls fall back without reaching the stub
+    calls = llm.calls
+    result = llm_classifier.classify_text(TICKET)
+    assert llm.calls == calls and breaker.rejected == 1
+    assert result['category'] == llm_classifier._rule_based(TICKET)['category']
+
+    # after open_seconds one probe goes through; a failed probe opens it again
+    llm.clock[0] += 30
+    assert breaker.state == breaker.snapshot()['state'] == circuit_breaker.HALF_OPEN
+    assert breaker.snapshot()['retry_in_seconds'] is None
+    llm_classifier.classify_text(TICKET)
+    assert llm.calls == calls + 1
+    assert breaker.state == circuit_breaker.OPEN and breaker.trips == 2
+
+    # a healthy probe closes it
+    llm.failing = False
+    llm.clock[0] += 30
+    assert llm_classifier.classify_text(TICKET)['confidence'] == 0.9
+    assert breaker.state == breaker.snapshot()['state'] == circuit_breaker.CLOSED
+
+
+def test_half_open_admits_only_the_probe():
+    breaker = CircuitBreaker("dep", window=2, min_calls=2, open_seconds=0)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()          # the probe
+    assert not breaker.allow()      # concurrent calls wait for its outcome
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+
+def test_slow_calls_trip_the_breaker():
+    breaker = CircuitBreaker("dep", window=4, min_calls=4, slow_call_seconds=1.0, slow_rate=0.5)
+    for latency in (0.1, 2.0, 0.1, 2.0):
+        breaker.record_success(latency)
+    assert breaker.snapshot()['state'] == circuit_breaker.OPEN
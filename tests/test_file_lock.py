@@ -0,0 +1,22 @@
+"""file_lock: the sidecar lock excludes other holders until released."""
+import threading
+
+from file_lock import file_lock
+
+
+def test_second_holder_waits(tmp_path):
+    path = str(tmp_path / "sub" / "shared.csv")
+    order = []
+
+    def other():
+        with file_lock(path):
+            order.append("other")
+
+    with file_lock(path):
+        thread = threading.Thread(target=other)
+        thread.start()
+        thread.join(0.3)
+        assert thread.is_alive()
+        order.append("first")
+    thread.join(5)
+    assert order == ["first", "other"]
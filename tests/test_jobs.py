@@ -0,0 +1,55 @@
+"""jobs: a running job is requeued only once its worker stops sending heartbeats."""
+import sqlite3
+import time
+
+import pytest
+
+import jobs
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'DB_PATH', str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(jobs, 'HEARTBEAT_SECONDS', 0.05)
+    monkeypatch.setattr(jobs, 'STALE_SECONDS', 0.3)
+    return jobs
+
+
+def claim(queue, worker):
+    conn = queue._connect()
+    try:
+        return queue._claim(conn, worker)
+    finally:
+        conn.close()
+
+
+def test_long_running_job_keeps_its_claim(queue):
+    job_id = queue.enqueue("ticket.txt", b"printer jammed")
+    assert claim(queue, "a")['id'] == job_id
+    with queue._heartbeat(job_id):
+        time.sleep(3 * queue.STALE_SECONDS)
+        assert claim(queue, "b") is None
+    assert queue.get(job_id)['status'] == 'running'
+
+
+def test_job_of_a_dead_worker_is_requeued(queue):
+    job_id = queue.enqueue("ticket.txt", b"printer jammed")
+    assert claim(queue, "a")['id'] == job_id
+    assert claim(queue, "b") is None
+    time.sleep(queue.STALE_SECONDS + 0.05)    # worker "a" died without a heartbeat
+    assert claim(queue, "b")['id'] == job_id
+    conn = queue._connect()
+    assert conn.execute("SELECT worker FROM jobs WHERE id = ?", (job_id,)).fetchone()[0] == "b"
+    conn.close()
+
+
+def test_database_from_before_heartbeats_is_migrated(queue):
+    conn = sqlite3.connect(queue.DB_PATH)
+    conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, filename TEXT, payload BLOB, "
+                 "result TEXT, error TEXT, worker TEXT, created_at TEXT, started_at TEXT, finished_at TEXT)")
+    conn.execute("INSERT INTO jobs (id, status, worker, created_at, started_at) "
+                 "VALUES ('old', 'running', 'a', '2025-01-01T00:00:00', '2025-01-01T00:00:00')")
+    conn.commit()
+    conn.close()
+    # a job started before the upgrade is judged by started_at
+    assert claim(queue, "b")['id'] == 'old'
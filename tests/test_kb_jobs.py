@@ -0,0 +1,46 @@
+"""KB batch jobs must not close gaps without a real (LLM-written) article."""
+import os
+
+import pandas as pd
+import pytest
+
+import content_gaps
+import kb_jobs
+import llm_classifier
+import similarity
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    kb_path = str(tmp_path / "knowledge_base.csv")
+    pd.DataFrame([{'article_id': 'KB1', 'title': 'Reset your password',
+                   'content': 'Use the forgot password link on the login page', 'link': '#'}]).to_csv(kb_path, index=False)
+    monkeypatch.setattr(content_gaps, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(content_gaps, 'GAP_LOG', str(tmp_path / "content_gaps.csv"))
+    monkeypatch.setattr(content_gaps, '_groups', None)
+    monkeypatch.setattr(content_gaps, '_mtime', None)
+    monkeypatch.setattr(kb_jobs, 'KB_PATH', kb_path)
+    monkeypatch.setattr(kb_jobs, 'JOBS_DIR', str(tmp_path / "kb_jobs"))
+    monkeypatch.setattr(similarity, 'KB_PATH', kb_path)
+    monkeypatch.setattr(similarity, '_kb_index', None)
+    return tmp_path
+
+
+def test_no_article_without_llm(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    assert llm_classifier.generate_kb_article("printer on the third floor is jammed") is None
+
+
+def test_gap_is_kept_when_generation_fails(data_dir):
+    row = content_gaps.log_gap("printer on the third floor is jammed")
+    kb_before = open(kb_jobs.KB_PATH).read()
+    groups = content_gaps.get_groups([row['gap_id']])
+    job = {'job_id': 'test', 'status': 'queued', 'total': 1, 'completed': 0,
+           'created': [], 'duplicates': [], 'failed': [], 'error': None}
+    kb_jobs._run(job, groups)
+    assert job['status'] == 'done'
+    assert job['failed'] == [int(row['gap_id'])] and job['created'] == []
+    assert open(kb_jobs.KB_PATH).read() == kb_before
+    assert list(content_gaps.load_groups()['gap_id'].astype(int)) == [int(row['gap_id'])]
+    assert os.path.exists(os.path.join(kb_jobs.JOBS_DIR, "test.json"))
@@ -0,0 +1,93 @@
+"""KB recommendation cutoff (KB_MIN_SIMILARITY), top-k selection and score stats."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import similarity
+
+KB = [
+    ("KB1", "Reset your password", "To reset your password use the forgot password link on the login page"),
+    ("KB2", "Refund policy", "Refunds for card payments are issued within 5 days of the billing request"),
+    ("KB3", "Server errors", "If the server returns an error or timeout, clear cache and retry"),
+]
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    """Point similarity at a small TF-IDF KB in tmp_path."""
+    def write(rows):
+        path = tmp_path / "knowledge_base.csv"
+        pd.DataFrame([{'article_id': a, 'title': t, 'content': c, 'link': '#'} for a, t, c in rows]).to_csv(
+            path, index=False)
+        monkeypatch.setattr(similarity, 'KB_PATH', str(path))
+        monkeypatch.setattr(similarity, 'KB_ENGINE', 'tfidf')
+        monkeypatch.setattr(similarity, '_kb_index', None)
+    write(KB)
+    return write
+
+
+@pytest.mark.parametrize("query", [
+    "the cat sat on the mat",
+    "my printer on the third floor is jammed",
+    "where is the office party this year",
+])
+def test_unrelated_query_is_a_gap(kb, query):
+    articles, stats = similarity.score_articles(query)
+    assert articles == []
+    assert stats['above_threshold'] == 0
+    assert stats['max'] < similarity.KB_MIN_SIMILARITY
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("I forgot my password and the login page rejects me", "KB1"),
+    ("my card payment was charged, I want a refund", "KB2"),
+    ("the server shows a timeout error", "KB3"),
+])
+def test_related_query_matches(kb, query, expected):
+    articles, stats = similarity.score_articles(query)
+    assert articles and articles[0]['article_id'] == expected
+    assert all(a['similarity'] >= similarity.KB_MIN_SIMILARITY for a in articles)
+    assert stats['above_threshold'] >= len(articles)
+
+
+def test_synthetic_kb_topics(kb):
+    topics = {
+        'password': "reset password login locked account sign in",
+        'refund': "refund card charged billing invoice payment",
+        'shipping': "delivery courier package tracking delayed order",
+    }
+    rows = [(f"KB{i}", f"{name} guide {i}", f"{words} {words.split()[i % 6]}")
+            for i, (name, words) in enumerate(list(topics.items()) * 10)]
+    kb(rows)
+    for name, words in topics.items():
+        articles, _ = similarity.score_articles(f"help, {' '.join(words.split()[:3])}", top_k=5)
+        assert len(articles) == 5
+        assert all(a['title'].startswith(name) for a in articles)
+    assert similarity.score_articles("the weather is nice on the beach today")[0] == []
+
+
+def test_stats_describe_all_scores(kb):
+    articles, stats = similarity.score_articles("reset password for the server", top_k=1, min_similarity=0.0)
+    assert stats['scored'] == len(KB)
+    assert stats['min_similarity'] == 0.0
+    assert stats['max'] == pytest.approx(articles[0]['similarity'])
+    assert 0.0 <= stats['mean'] <= stats['max']
+    assert stats['above_threshold'] == len(KB)
+    assert len(articles) == 1
+
+
+def test_stop_word_only_kb_has_no_index(kb):
+    kb([("KB1", "the", "the and of to")])
+    articles, stats = similarity.score_articles("the password")
+    assert articles == [] and stats['scored'] == 0
+
+
+@pytest.mark.parametrize("n, k, min_score", [(0, 3, 0.0), (2, 3, 0.0), (100, 3, 0.0), (100, 10, 0.5),
+                                             (1000, 5, 0.9), (50, 5, 2.0)])
+def test_top_k_matches_full_sort(n, k, min_score):
+    rng = np.random.RandomState(n + k)
+    scores = rng.rand(n)
+    expected = [i for i in np.argsort(-scores, kind='stable') if scores[i] >= min_score][:k]
+    got = similarity._top_k(scores, k, min_score)
+    assert list(scores[got]) == list(scores[expected])
+    assert list(scores[got]) == sorted(scores[got], reverse=True)
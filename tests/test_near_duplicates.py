@@ -0,0 +1,77 @@
+"""Near-duplicate clusters reuse an analysis only while it is fresh, and are shared by all workers."""
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+import near_duplicates
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TICKET = "VPN disconnects every five minutes since the update on my laptop, please help me fix it"
+DUPLICATE = TICKET + " thanks"
+
+
+@pytest.fixture(autouse=True)
+def clean(tmp_path, monkeypatch):
+    monkeypatch.setattr(near_duplicates, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(near_duplicates, 'DB_PATH', str(tmp_path / "near_duplicates.db"))
+
+
+def _register(version="v1", text=TICKET):
+    _, _, sig = near_duplicates.lookup(text, version)
+    return near_duplicates.register(sig, text, {'recommended_articles': []}, version=version)
+
+
+def test_duplicate_reuses_result_of_same_version():
+    cid = _register()
+    cluster, result, _ = near_duplicates.lookup(DUPLICATE, "v1")
+    assert cluster['cluster_id'] == cid and cluster['size'] == 2
+    assert result == {'recommended_articles': []}
+    assert 'version' not in cluster and 'result' not in cluster
+
+
+def test_version_change_is_a_miss_until_refreshed():
+    cid = _register("v1")
+    cluster, result, sig = near_duplicates.lookup(DUPLICATE, "v2")
+    assert cluster['cluster_id'] == cid and result is None
+    fresh = {'recommended_articles': [{'article_id': 'KB9'}]}
+    assert near_duplicates.register(sig, DUPLICATE, fresh, version="v2", cluster_id=cid) == cid
+    assert near_duplicates.lookup(DUPLICATE, "v2")[1] == fresh
+    assert len(near_duplicates.clusters()) == 1
+
+
+def test_expired_result_is_a_miss():
+    cid = _register()
+    conn = sqlite3.connect(near_duplicates.DB_PATH)
+    conn.execute("UPDATE clusters SET result_at = ?", (
+        (datetime.now() - timedelta(seconds=near_duplicates.RESULT_TTL_SECONDS + 1)).isoformat(),))
+    conn.commit()
+    conn.close()
+    cluster, result, _ = near_duplicates.lookup(DUPLICATE, "v1")
+    assert cluster['cluster_id'] == cid and result is None
+
+
+def test_least_recently_hit_clusters_are_dropped(monkeypatch):
+    monkeypatch.setattr(near_duplicates, 'MAX_CLUSTERS', 2)
+    first = _register(text=TICKET)
+    second = _register(text="Invoice 4411 was charged twice to my credit card this month, please refund one")
+    near_duplicates.lookup(DUPLICATE, "v1")      # first is now the most recently hit
+    _register(text="The mobile app crashes on startup after installing the latest version from the store")
+    ids = {c['cluster_id'] for c in near_duplicates.clusters()}
+    assert first in ids and second not in ids and len(ids) == 2
+    assert near_duplicates.lookup("Invoice 4411 was charged twice to my credit card this month, please refund one",
+                                  "v1")[0] is None
+
+
+def test_clusters_are_shared_across_processes(tmp_path):
+    cid = _register()
+    # another worker process with the same data directory joins the cluster
+    code = ("import near_duplicates; c, r, _ = near_duplicates.lookup(%r, 'v1'); print(c['cluster_id'], c['size'], r)"
+            % DUPLICATE)
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                          env=dict(os.environ, TICKET_DATA_DIR=str(tmp_path)))
+    assert proc.stdout.split(None, 2) == [str(cid), "2", "{'recommended_articles': []}\n"]
+    assert near_duplicates.clusters()[0]['size'] == 2
@@ -0,0 +1,85 @@
+"""online_model: incremental partial_fit on appended feedback rows."""
+import pytest
+
+import online_model
+
+HEADER = "timestamp,original_text,final_category,final_tags,final_priority,agent_note\n"
+EXAMPLES = {
+    'account': "cannot login, password reset link expired, account locked",
+    'billing': "charged twice on my card, please refund the invoice",
+}
+
+
+def row(category, i, priority="High", text=None):
+    return f'2025-06-01T10:00:00,"{text or EXAMPLES[category]} {i}",{category},,{priority},\n'
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    monkeypatch.setattr(online_model, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(online_model, 'FEEDBACK_CSV', str(tmp_path / "feedback.csv"))
+    monkeypatch.setattr(online_model, 'MODEL_PATH', str(tmp_path / "online_model.pkl"))
+    monkeypatch.setattr(online_model, 'MIN_FEEDBACK', 10)
+    monkeypatch.setattr(online_model, '_cache', (None, None))
+    return online_model
+
+
+def append(model, text):
+    with open(model.FEEDBACK_CSV, 'a', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+def test_appended_rows_are_partial_fit(model):
+    append(model, HEADER + "".join(row(c, i) for i in range(5) for c in EXAMPLES))
+    assert model.update() == 10
+    first = model._read_model()
+    assert first['rows'] == 10 and first['classes']['category'] == ['account', 'billing']
+    assert model.update() == 0
+
+    append(model, "".join(row(c, i) for i in range(5, 8) for c in EXAMPLES))
+    assert model.update() == 6
+    second = model._read_model()
+    assert second['rows'] == 16 and second['offset'] > first['offset']
+    cat, cat_before = second['classifiers']['category'], first['classifiers']['category']
+    # the same classifier was updated in place, not refit
+    assert cat.t_ == cat_before.t_ + 6
+    assert (cat.coef_ != cat_before.coef_).any()
+    assert model.predict(EXAMPLES['billing'])['category'] == "billing"
+
+
+def test_new_label_relearns_the_whole_log(model):
+    append(model, HEADER + "".join(row(c, i) for i in range(5) for c in EXAMPLES))
+    model.update()
+    append(model, "".join(row('shipping', i, "Low", text="parcel never arrived, tracking stuck") for i in range(4)))
+    assert model.update() == 14
+    relearned = model._read_model()
+    assert relearned['rows'] == 14
+    assert relearned['classes']['category'] == ['account', 'billing', 'shipping']
+    assert list(relearned['classifiers']['category'].classes_) == ['account', 'billing', 'shipping']
+    assert relearned['classes']['priority'] == ['High', 'Low']
+    assert model.predict("my parcel never arrived")['category'] == "shipping"
+
+
+def test_partial_trailing_record_waits_for_the_next_update(model):
+    append(model, HEADER + "".join(row(c, i) for i in range(5) for c in EXAMPLES))
+    model.update()
+    # a writer is half-way through a record, with a newline inside the quoted text
+    full = row('account', 9, text="locked out\nafter reset")
+    cut = full.index("\n") + 1
+    append(model, full[:cut])
+    assert model.update() == 0
+    append(model, full[cut:-1])
+    assert model.update() == 0
+    append(model, "\n")
+    assert model.update() == 1
+    assert model._read_model()['rows'] == 11
+
+
+def test_truncated_log_is_relearned(model):
+    append(model, HEADER + "".join(row(c, i) for i in range(5) for c in EXAMPLES))
+    model.update()
+    with open(model.FEEDBACK_CSV, 'w', encoding='utf-8', newline='') as f:
+        f.write(HEADER + row('billing', 0))
+    assert model.update() == 1
+    assert model._read_model()['rows'] == 1
+    assert model.predict(EXAMPLES['billing']) is None    # below MIN_FEEDBACK again
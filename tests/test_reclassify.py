@@ -0,0 +1,57 @@
+"""reclassify.report(): running counts in the checkpoint match the part files."""
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import reclassify
+import similarity
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    monkeypatch.setattr(reclassify, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(reclassify, 'OUT_DIR', str(tmp_path / "reclassified"))
+    monkeypatch.setattr(similarity, 'HIST_PATH', str(tmp_path / "processed_tickets.csv"))
+    monkeypatch.setattr(similarity, '_derived_aliases', None)
+    texts = ["I cannot login, password reset fails", "I was charged twice, refund please",
+             "server error 500 on upload", "dark mode would be nice", ""] * 7
+    labels = ["Account", "Billing", "Technical", "", "Technical"] * 7
+    pd.DataFrame({'text': texts, 'Category': labels}).to_csv(similarity.HIST_PATH, index=False)
+    return texts
+
+
+def test_agreement_maps_predictions_onto_the_labels(history):
+    reclassify.run('history', 'rule', 'test', chunk_size=10, workers=1)
+    report = reclassify.report('test')
+    assert report['aliases'] == {'authentication': 'account', 'payment': 'billing'}
+    # "authentication"/"payment"/"technical" predictions agree with Account/Billing/Technical;
+    # the empty ticket ("general") labelled Technical does not
+    assert report['labelled'] == 28
+    assert report['accuracy'] == 21 / 28
+    assert reclassify.evaluate(reclassify.load_results('test'))['accuracy'] == 21 / 28
+    # without aliases only the Technical rows agree
+    assert reclassify.evaluate(reclassify.load_results('test'), aliases={})['accuracy'] == 7 / 28
+
+
+def test_report_matches_results(tmp_path, history):
+    texts = history
+    reclassify.run('history', 'rule', 'test', chunk_size=10, workers=1)
+    report = reclassify.report('test')
+    df = reclassify.load_results('test')
+    expected = reclassify.evaluate(df)
+    assert report['rows'] == expected['rows'] == len(texts)
+    assert report['labelled'] == expected['labelled']
+    assert report['accuracy'] == expected['accuracy']
+    assert report['categories'] == df['category'].fillna('unknown').value_counts().to_dict()
+    assert pd.DataFrame(report['crosstab']).T.fillna(0).values.sum() == len(texts)
+
+    # a checkpoint written without the running counts is tallied from the parts on resume
+    path = tmp_path / "reclassified" / "test" / "checkpoint.json"
+    state = json.loads(path.read_text())
+    del state['summary']
+    path.write_text(json.dumps(state))
+    assert reclassify.report('test') == report
+    reclassify.run('history', 'rule', 'test', chunk_size=10, workers=1)
+    assert os.path.exists(path) and json.loads(path.read_text())['summary']['rows'] == len(texts)
@@ -0,0 +1,114 @@
+"""Category shards, live ticket relabelling and the memory-mapped snippet file."""
+import os
+
+import pandas as pd
+import pytest
+
+import similarity
+
+HISTORY = (
+    [("Account", f"cannot login after password reset, account {i} locked") for i in range(8)]
+    + [("Billing", f"card charged twice on invoice {i}, need a refund") for i in range(8)]
+    + [("Technical", f"server error {i} when uploading files, timeout") for i in range(8)]
+)
+
+
+@pytest.fixture
+def build(tmp_path, monkeypatch):
+    """Build a similarity index over [(category, text)] in tmp_path."""
+    monkeypatch.setattr(similarity, 'HIST_PATH', str(tmp_path / "processed_tickets.csv"))
+    monkeypatch.setattr(similarity, 'LIVE_PATH', str(tmp_path / "live_tickets.csv"))
+    monkeypatch.setattr(similarity, 'SNIPPETS_PATH', str(tmp_path / "ticket_snippets.bin"))
+    for name in ('_vectorizer', '_tfidf', '_shards', '_snippets', '_derived_aliases'):
+        monkeypatch.setattr(similarity, name, None)
+    monkeypatch.setattr(similarity, '_pending_live', [])
+    monkeypatch.setattr(similarity, '_refitting', False)
+
+    def build(history):
+        pd.DataFrame([{'text': t, 'Category': c} for c, t in history]).to_csv(similarity.HIST_PATH, index=False)
+        similarity._build_index(limit_rows=1000)
+        return similarity
+    return build
+
+
+@pytest.fixture
+def index(build):
+    """A similarity index over HISTORY."""
+    return build(HISTORY)
+
+
+def test_classifier_categories_map_to_history_labels(index, monkeypatch):
+    assert index._derived_aliases == {'authentication': 'account', 'payment': 'billing'}
+    assert index._norm_category("authentication") == "account"
+    assert index._norm_category(" Payment ") == "billing"
+    assert index._norm_category("Technical") == "technical"
+    # configured aliases win over derived ones
+    monkeypatch.setattr(index, 'CATEGORY_ALIASES', {'payment': 'account'})
+    assert index._norm_category("payment") == "account"
+    assert index.category_aliases()['payment'] == "account"
+
+
+def test_unlabeled_history_is_sharded_by_the_rules(build):
+    index = build([("unlabeled", t) for _, t in HISTORY])
+    assert index._derived_aliases == {}
+    assert {'authentication', 'payment', 'technical'} <= set(index._shards)
+    before = index.SEARCHES.value(scope='shard')
+    hits = index.find_similar_tickets("cannot login, password reset locked my account", top_k=3,
+                                      category="authentication")
+    assert index.SEARCHES.value(scope='shard') == before + 1
+    assert [h['category'] for h in hits] == ["authentication"] * 3
+
+
+def test_live_tickets_do_not_hide_history(index):
+    for i in range(3):
+        index.add_ticket(f"login password problem {i}", category="authentication")
+    hits = index.find_similar_tickets("cannot login, password reset locked my account", top_k=5,
+                                      category="authentication")
+    assert len(hits) == 5
+    assert all(h['category'] == "account" for h in hits)
+    assert any(h['id'] < len(HISTORY) for h in hits)
+
+
+def test_live_only_shard_falls_back_to_all_history(index):
+    for i in range(3):
+        index.add_ticket(f"feature request dark mode {i}", category="feature")
+    assert index._shards["feature"].history == 0
+    hits = index.find_similar_tickets("server error timeout when uploading", top_k=3, category="feature")
+    assert [h['category'] for h in hits] == ["technical"] * 3
+
+
+def test_feedback_relabels_the_analyzed_ticket(index):
+    text = "  The export button crashes the app\nwhenever I pick a date range  "
+    index.add_ticket(text, category="technical")
+    n_rows = index._n_rows
+    index.add_ticket(text.strip()[:1000], category="Feature", source="feedback", replace=True)
+    assert index._n_rows == n_rows
+    assert index._category_names[index._row_categories[n_rows - 1]] == "feature"
+    assert n_rows - 1 not in index._shards["technical"].score(*index._query_vectors(text))[0]
+    hits = index.find_similar_tickets(text, top_k=1)
+    assert hits[0]['id'] == n_rows - 1 and hits[0]['category'] == "feature"
+
+    # a rebuild keeps one row for the ticket, with the agent's label
+    index._build_index(limit_rows=1000)
+    assert index._n_rows == n_rows
+    assert index._category_names[index._row_categories[n_rows - 1]] == "feature"
+
+
+def test_feedback_on_unknown_ticket_is_appended(index):
+    n_rows = index._n_rows
+    index.add_ticket("printer on floor 3 is jammed again", category="technical", source="feedback", replace=True)
+    assert index._n_rows == n_rows + 1
+
+
+def test_snippet_file_is_reused_until_history_changes(index):
+    path = index.SNIPPETS_PATH
+    mtime = os.stat(path).st_mtime_ns
+    index._build_index(limit_rows=1000)
+    assert os.stat(path).st_mtime_ns == mtime
+    assert index._snippets.get(0) == HISTORY[0][1]
+
+    index._build_index(limit_rows=10)
+    assert len(index._SnippetStore.load(path)) == 10
+    pd.DataFrame([{'text': t.upper(), 'Category': c} for c, t in HISTORY]).to_csv(index.HIST_PATH, index=False)
+    index._build_index(limit_rows=1000)
+    assert index._snippets.get(0) == HISTORY[0][1].upper()
@@ -0,0 +1,84 @@
+"""upload_cache: version invalidation, TTL expiry and LRU eviction."""
+import sqlite3
+from datetime import datetime, timedelta
+from itertools import count
+
+import pytest
+
+import online_model
+import similarity
+import upload_cache
+
+RESPONSE = {'llm_result': {'category': 'payment'}, 'similar_tickets': [], 'recommended_articles': [],
+            'kb_match_stats': {}, 'text': "I was charged twice"}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    for module, attr, name in [(similarity, 'KB_PATH', "knowledge_base.csv"),
+                               (similarity, 'HIST_PATH', "processed_tickets.csv"),
+                               (online_model, 'MODEL_PATH', "online_model.pkl")]:
+        (tmp_path / name).write_text("v1")
+        monkeypatch.setattr(module, attr, str(tmp_path / name))
+    monkeypatch.setattr(upload_cache, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(upload_cache, 'DB_PATH', str(tmp_path / "upload_cache.db"))
+    monkeypatch.setattr(upload_cache, 'ENABLED', True)
+    clock = count(1000)
+    monkeypatch.setattr(upload_cache, 'time', lambda: next(clock))
+    return upload_cache
+
+
+def test_hit(cache):
+    key = cache.key(b"ticket bytes", "ticket.txt")
+    assert cache.get(key) is None
+    cache.put(key, RESPONSE)
+    hit = cache.get(key)
+    assert hit['cache']['hit'] and hit['text'] == RESPONSE['text']
+    assert cache.key(b"ticket bytes", "ticket.pdf") != key
+
+
+@pytest.mark.parametrize("changed", ['KB_PATH', 'HIST_PATH', 'MODEL_PATH', 'KB_ENGINE'])
+def test_version_change_invalidates(cache, monkeypatch, changed):
+    key = cache.key(b"ticket bytes", "ticket.txt")
+    cache.put(key, RESPONSE)
+    if changed == 'KB_ENGINE':
+        monkeypatch.setattr(similarity, 'KB_ENGINE', 'bm25')
+    else:
+        module = online_model if changed == 'MODEL_PATH' else similarity
+        with open(getattr(module, changed), 'a') as f:
+            f.write(" v2")
+    stale = cache.LOOKUPS.value(result='stale')
+    assert cache.get(key) is None
+    assert cache.LOOKUPS.value(result='stale') == stale + 1
+    assert cache.stats()['entries'] == 0
+
+
+def test_ttl_expiry(cache, monkeypatch):
+    monkeypatch.setattr(cache, 'TTL_HOURS', 1)
+    key = cache.key(b"ticket bytes", "ticket.txt")
+    cache.put(key, RESPONSE)
+    assert cache.get(key) is not None
+    conn = sqlite3.connect(cache.DB_PATH)
+    conn.execute("UPDATE uploads SET created_at = ?", ((datetime.now() - timedelta(hours=2)).isoformat(),))
+    conn.commit()
+    conn.close()
+    assert cache.get(key) is None
+
+
+def test_lru_eviction(cache, monkeypatch):
+    a, b, c = (cache.key(x, "t.txt") for x in (b"a", b"b", b"c"))
+    cache.put(a, RESPONSE)
+    size = cache.stats()['bytes']
+    monkeypatch.setattr(cache, 'MAX_BYTES', 2 * size)
+    cache.put(b, RESPONSE)
+    assert cache.get(a) is not None      # a is now more recently used than b
+    cache.put(c, RESPONSE)
+    assert cache.get(b) is None
+    assert cache.get(a) is not None and cache.get(c) is not None
+    assert cache.stats()['entries'] == 2
+
+
+def test_llm_errors_are_not_cached(cache):
+    key = cache.key(b"ticket bytes", "ticket.txt")
+    cache.put(key, dict(RESPONSE, llm_result={'error': 'LLM error: timeout'}))
+    assert cache.get(key) is None
@@ -0,0 +1,167 @@
+"""
+SQLite cache of /analyze results keyed by the uploaded file's content.
+
+The same ticket PDFs and CSV exports get uploaded again and again; a repeat
+upload reuses the extracted text and the classification/retrieval results
+stored here (app.analyze_upload still does the per-ticket bookkeeping).
+Entries are keyed by sha256 of the file bytes
+(plus its extension, which decides how the bytes are read) and stamped with
+the version of everything the answer depends on: the KB and history files,
+the KB engine and the feedback-trained online model. An entry whose version
+no longer matches is dropped on lookup. The cache lives in
+data/upload_cache.db, so it survives restarts and is shared by all workers;
+it is bounded by UPLOAD_CACHE_MAX_MB, least recently used entries first.
+
+    python upload_cache.py --stats
+    python upload_cache.py --clear
+"""
+import os
+import json
+import sqlite3
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+from time import time
+
+import metrics
+
+BASE_DIR = os.path.dirname(__file__)
+DATA_DIR = os.environ.get("TICKET_DATA_DIR", os.path.join(BASE_DIR, "data"))
+DB_PATH = os.path.join(DATA_DIR, "upload_cache.db")
+
+ENABLED = os.environ.get("UPLOAD_CACHE", "1") == "1"
+MAX_BYTES = int(float(os.environ.get("UPLOAD_CACHE_MAX_MB", "64")) * 1024 * 1024)
+# Entries older than this are recomputed even if nothing changed, so answers
+# given while the LLM was down do not stick around for good
+TTL_HOURS = float(os.environ.get("UPLOAD_CACHE_TTL_HOURS", "24"))
+
+LOOKUPS = metrics.counter('upload_cache_lookups_total', 'Upload cache lookups', ['result'])
+EVICTIONS = metrics.counter('upload_cache_evictions_total', 'Upload cache entries evicted to stay under the size limit')
+
+
+def _connect():
+    os.makedirs(DATA_DIR, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS uploads (
+            key TEXT PRIMARY KEY,
+            version TEXT NOT NULL,
+            response TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT,
+            last_used REAL
+        )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS uploads_last_used ON uploads(last_used)")
+    return conn
+
+
+def key(data, filename):
+    """Cache key of an upload: sha256 of its bytes and its extension."""
+    ext = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    return f"{hashlib.sha256(data).hexdigest()}.{ext}"
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+        return f"{st.st_mtime_ns}-{st.st_size}"
+    except OSError:
+        return "-"
+
+
+def version():
+    """Version of the indexes and models an /analyze answer depends on."""
+    import similarity
+    import online_model
+    return "|".join([similarity.KB_ENGINE, _stat(similarity.KB_PATH), _stat(similarity.HIST_PATH),
+                     _stat(online_model.MODEL_PATH)])
+
+
+def get(cache_key):
+    """The cached result for cache_key, or None on a miss or a stale entry."""
+    if not ENABLED:
+        return None
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute("SELECT version, response, created_at FROM uploads WHERE key = ?",
+                               (cache_key,)).fetchone()
+            if row is None:
+                LOOKUPS.inc(result='miss')
+                return None
+            expired = datetime.now() - datetime.fromisoformat(row[2]) > timedelta(hours=TTL_HOURS)
+            if row[0] != version() or expired:
+                conn.execute("DELETE FROM uploads WHERE key = ?", (cache_key,))
+                LOOKUPS.inc(result='stale')
+                return None
+            conn.execute("UPDATE uploads SET hits = hits + 1, last_used = ? WHERE key = ?", (time(), cache_key))
+        finally:
+            conn.close()
+    except Exception as e:
+        print("Upload cache lookup failed:", e)
+        return None
+    LOOKUPS.inc(result='hit')
+    response = json.loads(row[1])
+    response['cache'] = {'hit': True, 'cached_at': row[2]}
+    return response
+
+
+def put(cache_key, response):
+    """Store an /analyze result, evicting least recently used entries beyond MAX_BYTES."""
+    if not ENABLED or not isinstance(response, dict):
+        return
+    if isinstance(response.get('llm_result'), dict) and 'error' in response['llm_result']:
+        return
+    try:
+        payload = json.dumps(response)
+        conn = _connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO uploads (key, version, response, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key, version(), payload, len(payload), datetime.now().isoformat(), time()))
+            # newest first; everything past the size budget goes
+            evicted = conn.execute("""
+                DELETE FROM uploads WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY last_used DESC) AS running FROM uploads
+                    ) WHERE running > ?
+                )""", (MAX_BYTES,)).rowcount
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        if evicted > 0:
+            EVICTIONS.inc(evicted)
+    except Exception as e:
+        print("Upload cache store failed:", e)
+
+
+def stats():
+    conn = _connect()
+    try:
+        entries, size, hits = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM uploads").fetchone()
+    finally:
+        conn.close()
+    return {'entries': entries, 'bytes': size, 'max_bytes': MAX_BYTES, 'hits': hits, 'enabled': ENABLED}
+
+
+def clear():
+    conn = _connect()
+    try:
+        return conn.execute("DELETE FROM uploads").rowcount
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--stats", action="store_true")
+    ap.add_argument("--clear", action="store_true", help="drop all cached responses")
+    args = ap.parse_args()
+    if args.clear:
+        print("Removed", clear(), "cached responses")
+    print(json.dumps(stats(), indent=2))